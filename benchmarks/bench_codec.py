@@ -0,0 +1,88 @@
+#!/usr/bin/python3
+"""
+Module: bench_codec.py
+
+Compares the storage codecs on synthetic Place-like records:
+size of the file, time to write it and time to read it back.
+
+Usage:
+python3 benchmarks/bench_codec.py [number of records]
+"""
+
+import io
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.engine.codec import get_codec  # noqa: E402
+
+
+def make_records(count):
+    """
+    Returns count (key, value) pairs shaped like serialized places.
+    """
+    rand = random.Random(0)
+    start = datetime(2017, 1, 1)
+    records = []
+    for i in range(count):
+        obj_id = str(uuid.UUID(int=rand.getrandbits(128)))
+        created_at = start + timedelta(seconds=rand.randrange(10 ** 8),
+                                       microseconds=rand.randrange(10 ** 6))
+        records.append(("Place." + obj_id, {
+            "id": obj_id,
+            "created_at": created_at.isoformat(),
+            "updated_at": created_at.isoformat(),
+            "__class__": "Place",
+            "city_id": str(uuid.UUID(int=rand.getrandbits(128))),
+            "user_id": str(uuid.UUID(int=rand.getrandbits(128))),
+            "name": "Place {}".format(i),
+            "description": "A nice place to stay " * rand.randrange(1, 4),
+            "number_rooms": rand.randrange(1, 8),
+            "number_bathrooms": rand.randrange(1, 4),
+            "max_guest": rand.randrange(1, 12),
+            "price_by_night": rand.randrange(20, 500),
+            "latitude": rand.uniform(-90, 90),
+            "longitude": rand.uniform(-180, 180),
+            "amenity_ids": [str(uuid.UUID(int=rand.getrandbits(128)))
+                            for j in range(rand.randrange(5))],
+        }))
+    return records
+
+
+def bench(codec, records):
+    """
+    Writes and reads the records in memory with a codec.
+
+    Returns:
+        tuple: (size in bytes, encoding seconds, decoding seconds)
+    """
+    file = io.BytesIO()
+    begin = time.perf_counter()
+    with codec.writer(file) as writer:
+        for key, value in records:
+            writer.write(codec.encode(key, value))
+    encode_time = time.perf_counter() - begin
+
+    file.seek(0)
+    begin = time.perf_counter()
+    count = sum(1 for record in codec.iter_records(file))
+    decode_time = time.perf_counter() - begin
+    assert count == len(records)
+    return len(file.getvalue()), encode_time, decode_time
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    records = make_records(count)
+    print("{} records".format(count))
+    print("{:<8} {:>12} {:>12} {:>12}".format(
+        "codec", "bytes", "encode (s)", "decode (s)"))
+    for name in ("json", "binary"):
+        size, encode_time, decode_time = bench(get_codec(name), records)
+        print("{:<8} {:>12} {:>12.3f} {:>12.3f}".format(
+            name, size, encode_time, decode_time))
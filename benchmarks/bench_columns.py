@@ -0,0 +1,80 @@
+#!/usr/bin/python3
+"""
+Module: bench_columns.py
+
+Compares a report computed by going through Place instances
+with the same report on the columnar mirror: total and mean
+price, and mean price by city.
+
+Usage:
+python3 benchmarks/bench_columns.py [number of places]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_codec import make_records  # noqa: E402
+from models.engine import columns  # noqa: E402
+from models.engine.columns import COLUMNS, ColumnStore  # noqa: E402
+from models.place import Place  # noqa: E402
+
+
+def report_objects(places):
+    """
+    Computes the report by going through the instances.
+    """
+    total = 0
+    by_city = {}
+    for place in places:
+        total += place.price_by_night
+        group = by_city.setdefault(place.city_id, [0, 0])
+        group[0] += place.price_by_night
+        group[1] += 1
+    mean = total / len(places)
+    return total, mean, {city_id: price / count
+                         for city_id, (price, count) in by_city.items()}
+
+
+def report_columns(store):
+    """
+    Computes the report on the columns.
+    """
+    return (store.sum("price_by_night"), store.mean("price_by_night"),
+            store.group_by("city_id", "price_by_night", "mean"))
+
+
+def timed(function, *args, repeat=5):
+    """
+    Returns the best time of a few calls of a function.
+    """
+    best = None
+    for i in range(repeat):
+        begin = time.perf_counter()
+        function(*args)
+        elapsed = time.perf_counter() - begin
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    rand_cities = 100
+    places = []
+    for i, (key, value) in enumerate(make_records(count)):
+        place = Place(**value)
+        place.city_id = "city-{}".format(i % rand_cities)
+        places.append(place)
+    store = ColumnStore("Place", *COLUMNS["Place"])
+    for place in places:
+        store.add("Place." + place.id, place)
+
+    print("{} places, NumPy {}".format(
+        count, "installed" if columns.numpy is not None else "missing"))
+    print("{:<10} {:>10}".format("report", "seconds"))
+    print("{:<10} {:>10.4f}".format("objects",
+                                    timed(report_objects, places)))
+    print("{:<10} {:>10.4f}".format("columns",
+                                    timed(report_columns, store)))
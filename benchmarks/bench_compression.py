@@ -0,0 +1,64 @@
+#!/usr/bin/python3
+"""
+Module: bench_compression.py
+
+Compares the compression methods of the storage files on
+synthetic Place-like records: size of the snapshot, time to
+write it and time to stream it back.
+
+Usage:
+python3 benchmarks/bench_compression.py [number of records] [codec]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_codec import make_records  # noqa: E402
+from models.engine.codec import get_codec  # noqa: E402
+from models.engine.compression import get_compression  # noqa: E402
+
+
+def bench(codec, compression, records, path):
+    """
+    Writes and streams back the records with a codec and
+    a compression method.
+
+    Returns:
+        tuple: (size in bytes, writing seconds, reading seconds)
+    """
+    begin = time.perf_counter()
+    with compression.open(path, "wb") as file, \
+            codec.writer(file) as writer:
+        for key, value in records:
+            writer.write(codec.encode(key, value))
+    write_time = time.perf_counter() - begin
+
+    begin = time.perf_counter()
+    with compression.open(path, "rb") as file:
+        count = sum(1 for record in codec.iter_records(file))
+    read_time = time.perf_counter() - begin
+    assert count == len(records)
+    return os.path.getsize(path), write_time, read_time
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    codec = get_codec(sys.argv[2] if len(sys.argv) > 2 else "json")
+    records = make_records(count)
+    print("{} records, {} codec".format(count, codec.name))
+    print("{:<10} {:>12} {:>10} {:>10}".format(
+        "method", "bytes", "write (s)", "read (s)"))
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for name, level in (("none", None), ("zlib", 1), ("zlib", 6),
+                            ("bz2", 9), ("lzma", 0), ("lzma", 6)):
+            compression = get_compression(name, level)
+            size, write_time, read_time = bench(
+                codec, compression, records, os.path.join(tmp_dir, "file")
+            )
+            label = name if level is None else "{}-{}".format(name, level)
+            print("{:<10} {:>12} {:>10.3f} {:>10.3f}".format(
+                label, size, write_time, read_time))
@@ -0,0 +1,88 @@
+#!/usr/bin/python3
+"""
+Module: bench_durability.py
+
+Compares the durability levels of FileStorage: mean latency of
+a save that updates one place, one thread at a time, and the
+throughput of threads saving concurrently, where the "fsync"
+level groups the saves into fewer writes.
+
+Usage:
+python3 benchmarks/bench_durability.py [number of places] [saves] [threads]
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_codec import make_records  # noqa: E402
+from models import storage  # noqa: E402
+from models.engine.file_storage import FileStorage  # noqa: E402
+from models.place import Place  # noqa: E402
+
+
+def save_many(places, saves):
+    """
+    Updates a place and saves, saves times.
+    """
+    for i in range(saves):
+        place = places[i % len(places)]
+        place.price_by_night = i
+        place.save()
+
+
+def bench(level, places, saves, threads):
+    """
+    Times the saves at one durability level.
+
+    Returns:
+        tuple: (mean seconds per save in one thread, saves per
+        second in all threads, writes done by the threads)
+    """
+    FileStorage._FileStorage__durability = level
+    begin = time.perf_counter()
+    save_many(places, saves)
+    latency = (time.perf_counter() - begin) / saves
+
+    group = FileStorage._FileStorage__group
+    writes = group.writes
+    workers = [
+        threading.Thread(target=save_many,
+                         args=(places[i::threads], saves // threads))
+        for i in range(threads)
+    ]
+    begin = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    throughput = saves // threads * threads / (time.perf_counter() - begin)
+    return latency, throughput, group.writes - writes
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    saves = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    threads = int(sys.argv[3]) if len(sys.argv) > 3 else 8
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        FileStorage._FileStorage__file_path = os.path.join(tmp_dir,
+                                                           "file.json")
+        FileStorage._FileStorage__objects = {}
+        places = [Place(**value) for key, value in make_records(count)]
+        for place in places:
+            storage.new(place)
+        storage.save()
+
+        print("{} places, {} saves, {} threads".format(count, saves,
+                                                       threads))
+        print("{:<8} {:>14} {:>14} {:>8}".format(
+            "level", "latency (ms)", "saves/s", "writes"))
+        for level in ("none", "atomic", "fsync"):
+            latency, throughput, writes = bench(level, places, saves,
+                                                threads)
+            print("{:<8} {:>14.3f} {:>14.0f} {:>8}".format(
+                level, latency * 1000, throughput, writes))
@@ -0,0 +1,78 @@
+#!/usr/bin/python3
+"""
+Module: bench_threads.py
+
+Runs reader threads, which look places up by city and go through
+the snapshot of all the objects, next to a writer thread updating
+places, and prints the reads and writes done per second.
+
+Usage:
+python3 benchmarks/bench_threads.py [number of places] [readers] [seconds]
+"""
+
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_codec import make_records  # noqa: E402
+from models import storage  # noqa: E402
+from models.engine.file_storage import FileStorage  # noqa: E402
+from models.place import Place  # noqa: E402
+
+
+def read(places, stop, counts, slot):
+    """
+    Looks places up until stop is set.
+    """
+    done = 0
+    while not stop.is_set():
+        place = places[done % len(places)]
+        storage.lookup(Place, "city_id", place.city_id)
+        storage.all().get("Place." + place.id)
+        done += 1
+    counts[slot] = done
+
+
+def write(places, stop, counts, slot):
+    """
+    Updates places until stop is set.
+    """
+    done = 0
+    while not stop.is_set():
+        place = places[done % len(places)]
+        place.city_id = "city-{}".format(done % 100)
+        done += 1
+    counts[slot] = done
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    readers = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    seconds = float(sys.argv[3]) if len(sys.argv) > 3 else 2
+    FileStorage._FileStorage__objects = {}
+    places = []
+    for i, (key, value) in enumerate(make_records(count)):
+        value["city_id"] = "city-{}".format(i % 100)
+        places.append(Place(**value))
+
+    stop = threading.Event()
+    counts = [0] * (readers + 1)
+    threads = [threading.Thread(target=write,
+                                args=(places, stop, counts, readers))]
+    threads += [threading.Thread(target=read,
+                                 args=(places, stop, counts, i))
+                for i in range(readers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    print("{} places, {} readers, 1 writer".format(count, readers))
+    print("{:<8} {:>12}".format("", "per second"))
+    print("{:<8} {:>12.0f}".format("reads", sum(counts[:readers]) / seconds))
+    print("{:<8} {:>12.0f}".format("writes", counts[readers] / seconds))
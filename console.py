@@ -92,7 +92,8 @@ class HBNBCommand(cmd.Cmd):
             'show': self.do_show,
             'destroy': self.do_destroy,
             'update': self.do_update,
-            'count': self.do_count
+            'count': self.do_count,
+            'search': self.do_search
         }
 
         if command_md in cmd_args.keys():
@@ -160,25 +161,44 @@ class HBNBCommand(cmd.Cmd):
         Usage: count <class> or <class>.count()
         Returns the count of instances for a specified class.
         """
-        objcs = storage.all()
         command_prompts = shlex.split(arg)
 
         if arg:
             class_nm = command_prompts[0]
 
-        count = 0
-
         if command_prompts:
             if class_nm in self.classes:
-                for obj in objcs.values():
-                    if obj.__class__.__name__ == class_nm:
-                        count += 1
-                print(count)
+                print(storage.count(class_nm))
             else:
                 print("** invalid class name **")
         else:
             print("** class name missing **")
 
+    def do_search(self, arg):
+        """
+        Usage: search <class> <text> or <class>.search("<text>")
+        Displays the instances of a class whose text attributes
+        contain the words searched, the most relevant first.
+        Example: $ Place.search("ocean view")
+        """
+        command_prompts = shlex.split(arg)
+
+        if len(command_prompts) == 0:
+            print("** class name missing **")
+        elif command_prompts[0] not in self.classes:
+            print("** class doesn't exist **")
+        elif len(command_prompts) < 2:
+            print("** search text missing **")
+        else:
+            try:
+                query = storage.query(command_prompts[0]).search(
+                    " ".join(command_prompts[1:]))
+            except ValueError:
+                print("** class can't be searched **")
+                return
+            for value in query:
+                print(str(value))
+
     def do_update(self, arg):
         """
         Usage: update <class> <id> <attribute_name> <attribute_value> or
@@ -240,7 +260,11 @@ class HBNBCommand(cmd.Cmd):
                         attrib_value = eval(attrib_value)
                     except Exception:
                         pass
-                    setattr(obj, attrib_name, attrib_value)
+                    try:
+                        setattr(obj, attrib_name, attrib_value)
+                    except (AttributeError, TypeError):
+                        print("** attribute can't be set **")
+                        return
 
                 obj.save()
 
@@ -252,18 +276,16 @@ class HBNBCommand(cmd.Cmd):
         If no class is specified, it shows representations
         of all instantiated objects.
         """
-        objs = storage.all()
         command_prompts = shlex.split(arg)
 
         if len(command_prompts) == 0:
-            for key, value in objs.items():
+            for key, value in storage.all().items():
                 print(str(value))
         elif command_prompts[0] not in self.classes:
             print("** class doesn't exist **")
         else:
-            for key, value in objs.items():
-                if key.split('.')[0] == command_prompts[0]:
-                    print(str(value))
+            for value in storage.all(command_prompts[0]).values():
+                print(str(value))
 
     def do_destroy(self, arg):
         """
@@ -283,11 +305,52 @@ class HBNBCommand(cmd.Cmd):
             objs = storage.all()
             key = "{}.{}".format(command_prompts[0], command_prompts[1])
             if key in objs:
-                del objs[key]
+                storage.delete(objs[key])
                 storage.save()
             else:
                 print("** no instance found **")
 
+    def do_begin(self, arg):
+        """
+        Starts a transaction: the following changes are only saved
+        by commit, and rollback undoes them. Changes still in a
+        transaction when the console exits are lost.
+        Example: $ begin
+        """
+        if storage.in_transaction():
+            print("** transaction already in progress **")
+        else:
+            storage.begin()
+
+    def do_commit(self, arg):
+        """
+        Saves the changes of the transaction and ends it.
+        Example: $ commit
+        """
+        if not storage.in_transaction():
+            print("** no transaction in progress **")
+        else:
+            storage.commit()
+
+    def do_rollback(self, arg):
+        """
+        Undoes the changes of the transaction and ends it.
+        Example: $ rollback
+        """
+        if not storage.in_transaction():
+            print("** no transaction in progress **")
+        else:
+            storage.rollback()
+
+    def precmd(self, line):
+        """
+        Loads the changes other consoles saved to the storage
+        before each command, outside of a transaction.
+        """
+        if not storage.in_transaction() and storage.changed():
+            storage.refresh()
+        return line
+
     def emptyline(self):
         """
         Handles blank lines.
@@ -298,12 +361,14 @@ class HBNBCommand(cmd.Cmd):
         """
         Ctrl D - to kill the program or exit from cmd.
         """
+        storage.flush()
         return True
 
     def do_quit(self, arg):
         """
         Quit command to exit from cmd.
         """
+        storage.flush()
         return True
 
 
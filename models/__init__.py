@@ -1,9 +1,42 @@
 #!/usr/bin/python3
 """
-Makes a unique FileStorage instance
+Makes a unique storage instance, a DBStorage when
+HBNB_TYPE_STORAGE is "db" and a FileStorage otherwise.
+
+The storage is made and loaded the first time models.storage
+is used, not when the package is imported: importing a module
+of the package, such as a codec, or a worker process importing
+the function it runs, loads nothing.
 """
-from models.engine.file_storage import FileStorage
+import os
+import threading
+
+_lock = threading.Lock()
+
+
+def __getattr__(name):
+    """
+    Makes and loads the storage on first use.
 
+    Args:
+        name (str): Name of the missing attribute.
 
-storage = FileStorage()
-storage.reload()
+    Raises:
+        AttributeError: If the attribute is not "storage".
+    """
+    global storage
+    if name != "storage":
+        raise AttributeError(
+            "module {!r} has no attribute {!r}".format(__name__, name))
+    with _lock:
+        if "storage" not in globals():
+            if os.getenv("HBNB_TYPE_STORAGE") == "db":
+                from models.engine.db_storage import DBStorage
+                instance = DBStorage()
+            else:
+                from models.engine.file_storage import FileStorage
+                instance = FileStorage()
+            # Set first, the instances loaded use it
+            storage = instance
+            instance.reload()
+    return storage
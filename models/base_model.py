@@ -19,6 +19,8 @@ Attributes:
 Methods:
 - __init__(self, *args, **kwargs): BaseModel constructor.
 - __str__(self): Returns a string representation of the instance.
+- __setattr__(self, name, value): Sets an attribute and flags the
+instance as changed in the storage.
 - save(self): Updates the instance's updated_at attribute and saves.
 - to_dict(self): Returns a dictionary instance for serialization.
 
@@ -35,6 +37,20 @@ base_model_dict = base_model.to_dict()
 import models
 import uuid
 from datetime import datetime
+from functools import lru_cache
+
+
+@lru_cache(maxsize=None)
+def _read_only(cls):
+    """
+    Returns the names of the read-only properties of a class,
+    such as State.cities, which are computed from the storage.
+    """
+    return frozenset(
+        name for klass in cls.__mro__
+        for name, attr in vars(klass).items()
+        if isinstance(attr, property) and attr.fset is None
+    )
 
 
 class BaseModel:
@@ -57,6 +73,9 @@ class BaseModel:
             for key, value in kwargs.items():
                 if key == "__class__":
                     continue
+                elif key in _read_only(type(self)):
+                    # Stored by a version where it was an attribute
+                    continue
                 elif key == "created_at" or key == "updated_at":
                     setattr(self, key, datetime.strptime(value, t_format))
                 else:
@@ -72,6 +91,17 @@ class BaseModel:
         class_name = self.__class__.__name__
         return "[{}] ({}) {}".format(class_name, self.id, self.__dict__)
 
+    def __setattr__(self, name, value):
+        """
+        Sets an attribute and flags the instance as dirty so the
+        storage knows it has to be serialized again on the next save.
+        Within a storage transaction, the attributes are remembered
+        first, so that a rollback can restore them.
+        """
+        models.storage.remember(self)
+        super().__setattr__(name, value)
+        models.storage.touch(self, name)
+
     def save(self):
         """
         Updates the 'updated_at' to the current datetime.
@@ -8,7 +8,9 @@ The City class represents a city
 in the AirBnB clone project.
 """
 
+import models
 from models.base_model import BaseModel
+from models.place import Place
 
 
 class City(BaseModel):
@@ -19,6 +21,15 @@ class City(BaseModel):
     Attributes:
         state_id (str): ID of the State.
         name (str): Name of the city.
+        places (list): The places of the city, read-only.
     """
     state_id = ""
     name = ""
+
+    @property
+    def places(self):
+        """
+        Returns the Place instances whose city_id is the id
+        of the city, found through the storage index.
+        """
+        return list(models.storage.lookup(Place, "city_id", self.id).values())
@@ -0,0 +1,506 @@
+#!/usr/bin/python3
+"""
+Module: codec.py
+
+Serialization formats of the storage files.
+
+A codec turns the (key, to_dict()) pair of each object into
+an encoded record and back. FileStorage writes a file as a
+header, the records, and a footer, all given by the codec:
+
+- JSONCodec ("json"): The historical file.json format, one
+JSON object whose members are the records.
+- BinaryCodec ("binary"): Length-prefixed binary records,
+with datetimes stored as int64 microseconds and UUIDs as
+16 raw bytes.
+
+The binary files are about a quarter smaller than the JSON ones,
+but the binary codec is pure Python and the JSON one relies on
+the C parser of the json module: it encodes and decodes about
+three times slower. It saves space, not time.
+
+Classes:
+- JSONCodec: JSON object codec.
+- BinaryCodec: Compact binary codec.
+
+Functions:
+- get_codec(name): Returns the codec registered under a name.
+- detect_codec(path): Returns the codec a file was written with.
+- convert(src, dst, codec_name): Rewrites a file with another codec.
+
+Usage:
+python3 tools/convert.py <source> <destination> [json|binary]
+"""
+
+import io
+import json
+import struct
+from datetime import datetime, timedelta
+from models.engine.stream import MemberWriter, encode_member, iter_members
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+_U32 = struct.Struct(">I")
+_I64 = struct.Struct(">q")
+_F64 = struct.Struct(">d")
+_INT64_MIN = -(1 << 63)
+_INT64_MAX = (1 << 63) - 1
+
+
+class JSONCodec:
+    """
+    Codec of the JSON object format: {"<key>": {...}, ...}.
+    """
+
+    name = "json"
+    extension = ".json"
+
+    def encode(self, key, value):
+        """
+        Encodes one record.
+
+        Args:
+            key (str): Storage key of the object.
+            value (dict): Serialized object.
+
+        Returns:
+            bytes: The encoded record.
+        """
+        return encode_member(key, value)
+
+    def decode(self, record):
+        """
+        Decodes one record made by encode().
+
+        Args:
+            record (bytes): The encoded record.
+
+        Returns:
+            tuple: (key, value) of the record.
+        """
+        return next(iter(json.loads(b"{" + record + b"}").items()))
+
+    def writer(self, file):
+        """
+        Returns the context manager writing records to a binary file.
+        Its write(record) method returns the offset of the record.
+        """
+        return MemberWriter(file)
+
+    def iter_records(self, file, strict=False):
+        """
+        Yields the (key, value) records of a binary file one at a time,
+        skipping the malformed ones unless strict is True.
+        """
+        text = io.TextIOWrapper(file, encoding="utf-8")
+        try:
+            yield from iter_members(text, strict=strict)
+        finally:
+            text.detach()
+
+    def scan(self, file):
+        """
+        Returns the (start, end) byte range of each record of a
+        binary file by key.
+
+        The bytes are read as latin-1 so that character positions
+        are byte offsets, whatever the encoding of the strings.
+        """
+        file.seek(0)
+        text = io.TextIOWrapper(file, encoding="latin-1", newline="")
+        try:
+            return {
+                key: (start, end)
+                for key, value, start, end
+                in iter_members(text, offsets=True)
+            }
+        finally:
+            text.detach()
+
+
+class _RecordWriter:
+    """
+    Writes the header and the records of a binary file.
+    """
+
+    def __init__(self, file):
+        """
+        Initializes the writer.
+
+        Args:
+            file (file): Binary file opened for writing.
+        """
+        self.file = file
+        self.count = 0
+        self.offset = 0
+
+    def __enter__(self):
+        """
+        Writes the header.
+        """
+        self.offset += self.file.write(BinaryCodec.magic)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """
+        Nothing follows the last record.
+        """
+        return False
+
+    def write(self, record):
+        """
+        Writes one record.
+
+        Args:
+            record (bytes): Record made by BinaryCodec.encode().
+
+        Returns:
+            int: Offset of the record from the start of the file.
+        """
+        start = self.offset
+        self.offset += self.file.write(record)
+        self.count += 1
+        return start
+
+
+class BinaryCodec:
+    """
+    Codec of the binary format.
+
+    A file starts with the magic bytes and is followed by records:
+    a big-endian uint32 length, then the class name, the id and
+    the attributes of the object as tagged values.
+
+    Tags:
+    - N, T, F: None, True, False
+    - i: int64, I: bigger int as a decimal string
+    - d: float64
+    - s: uint32 length and UTF-8 bytes
+    - u: UUID string as 16 raw bytes
+    - t: ISO datetime string as int64 microseconds since the epoch
+    - l: uint32 count and values
+    - m: uint32 count and (string, value) pairs
+    """
+
+    name = "binary"
+    extension = ".bin"
+    magic = b"HBNB\x01"
+
+    def encode(self, key, value):
+        """
+        Encodes one record.
+
+        Args:
+            key (str): Storage key of the object.
+            value (dict): Serialized object.
+
+        Returns:
+            bytes: The encoded record.
+        """
+        class_name, _, obj_id = key.partition('.')
+        payload = bytearray()
+        _put_str(payload, class_name)
+        _put(payload, obj_id)
+        _put(payload, value)
+        return _U32.pack(len(payload)) + payload
+
+    def decode(self, record):
+        """
+        Decodes one record made by encode().
+
+        Args:
+            record (bytes): The encoded record.
+
+        Returns:
+            tuple: (key, value) of the record.
+
+        Raises:
+            ValueError: If the record is malformed.
+        """
+        try:
+            view = memoryview(record)
+            class_name, pos = _get_str(view, _U32.size)
+            obj_id, pos = _get(view, pos)
+            value, pos = _get(view, pos)
+        except (IndexError, KeyError, struct.error, UnicodeDecodeError):
+            raise ValueError("Malformed record")
+        if pos != len(record) or not isinstance(value, dict):
+            raise ValueError("Malformed record")
+        return "{}.{}".format(class_name, obj_id), value
+
+    def writer(self, file):
+        """
+        Returns the context manager writing records to a binary file.
+        Its write(record) method returns the offset of the record.
+        """
+        return _RecordWriter(file)
+
+    def iter_records(self, file, strict=False):
+        """
+        Yields the (key, value) records of a binary file one at a time,
+        skipping the malformed ones unless strict is True.
+
+        Raises:
+            ValueError: In strict mode, if the file is malformed.
+        """
+        for start, record in self.__records(file, strict):
+            try:
+                yield self.decode(record)
+            except ValueError:
+                if strict:
+                    raise
+
+    def scan(self, file):
+        """
+        Returns the (start, end) byte range of each record of a
+        binary file by key.
+        """
+        file.seek(0)
+        offsets = {}
+        for start, record in self.__records(file, False):
+            try:
+                key, value = self.decode(record)
+            except ValueError:
+                continue
+            offsets[key] = (start, start + len(record))
+        return offsets
+
+    def __records(self, file, strict):
+        """
+        Yields the offset and the bytes of each record of a file.
+        """
+        if file.read(len(self.magic)) != self.magic:
+            if strict:
+                raise ValueError("Not a binary storage file")
+            return
+        offset = len(self.magic)
+        while True:
+            header = file.read(_U32.size)
+            if not header:
+                return
+            payload = b""
+            if len(header) == _U32.size:
+                length = _U32.unpack(header)[0]
+                payload = file.read(length)
+            if len(header) < _U32.size or len(payload) < length:
+                if strict:
+                    raise ValueError("Truncated record")
+                return
+            yield offset, header + payload
+            offset += len(header) + length
+
+
+def _put_str(buf, text):
+    """
+    Appends a string without its tag.
+    """
+    data = text.encode("utf-8")
+    buf += _U32.pack(len(data))
+    buf += data
+
+
+def _put(buf, value):
+    """
+    Appends a tagged value.
+    """
+    if isinstance(value, str):
+        _put_text(buf, value)
+    elif value is None:
+        buf += b"N"
+    elif value is True:
+        buf += b"T"
+    elif value is False:
+        buf += b"F"
+    elif isinstance(value, int):
+        if _INT64_MIN <= value <= _INT64_MAX:
+            buf += b"i"
+            buf += _I64.pack(value)
+        else:
+            buf += b"I"
+            _put_str(buf, str(value))
+    elif isinstance(value, float):
+        buf += b"d"
+        buf += _F64.pack(value)
+    elif isinstance(value, (list, tuple)):
+        buf += b"l"
+        buf += _U32.pack(len(value))
+        for item in value:
+            _put(buf, item)
+    elif isinstance(value, dict):
+        buf += b"m"
+        buf += _U32.pack(len(value))
+        for name, item in value.items():
+            data = str(name).encode("utf-8")
+            buf += _U32.pack(len(data))
+            buf += data
+            _put(buf, item)
+    else:
+        raise TypeError(
+            "Object of type {} is not serializable".format(
+                type(value).__name__
+            )
+        )
+
+
+def _put_text(buf, text):
+    """
+    Appends a string, as a UUID or a datetime when it is the exact
+    text form of one.
+    """
+    if len(text) == 36 and text[8] == "-" and text[23] == "-":
+        try:
+            raw = bytes.fromhex(text.replace("-", ""))
+        except ValueError:
+            raw = b""
+        if len(raw) == 16 and _uuid_text(raw) == text:
+            buf += b"u"
+            buf += raw
+            return
+    elif len(text) in (19, 26) and text[10] == "T":
+        try:
+            value = datetime.fromisoformat(text)
+            if value.tzinfo is None and value.isoformat() == text:
+                buf += b"t"
+                buf += _I64.pack((value - _EPOCH) // _MICROSECOND)
+                return
+        except ValueError:
+            pass
+    buf += b"s"
+    _put_str(buf, text)
+
+
+def _uuid_text(raw):
+    """
+    Returns the text form of a UUID from its 16 bytes, as
+    str(uuid.UUID(bytes=raw)) does.
+    """
+    h = raw.hex()
+    return h[:8] + "-" + h[8:12] + "-" + h[12:16] + "-" + h[16:20] + \
+        "-" + h[20:]
+
+
+def _get_str(view, pos):
+    """
+    Reads a string without its tag.
+
+    Returns:
+        tuple: (string, position after it)
+    """
+    length = _U32.unpack_from(view, pos)[0]
+    pos += _U32.size
+    end = pos + length
+    if end > len(view):
+        raise IndexError("String out of record")
+    return str(view[pos:end], "utf-8"), end
+
+
+def _get(view, pos):
+    """
+    Reads a tagged value.
+
+    Returns:
+        tuple: (value, position after it)
+    """
+    tag = view[pos]
+    pos += 1
+    if tag == 0x73:  # s, the most common, read in place
+        end = pos + _U32.size + _U32.unpack_from(view, pos)[0]
+        if end > len(view):
+            raise IndexError("String out of record")
+        return str(view[pos + _U32.size:end], "utf-8"), end
+    if tag == 0x75:  # u
+        if pos + 16 > len(view):
+            raise IndexError("UUID out of record")
+        return _uuid_text(view[pos:pos + 16]), pos + 16
+    if tag == 0x74:  # t
+        micro = _I64.unpack_from(view, pos)[0]
+        return (_EPOCH + micro * _MICROSECOND).isoformat(), pos + _I64.size
+    if tag == 0x69:  # i
+        return _I64.unpack_from(view, pos)[0], pos + _I64.size
+    if tag == 0x64:  # d
+        return _F64.unpack_from(view, pos)[0], pos + _F64.size
+    if tag == 0x4e:  # N
+        return None, pos
+    if tag == 0x54:  # T
+        return True, pos
+    if tag == 0x46:  # F
+        return False, pos
+    if tag == 0x49:  # I
+        text, pos = _get_str(view, pos)
+        return int(text), pos
+    if tag == 0x6c:  # l
+        count = _U32.unpack_from(view, pos)[0]
+        pos += _U32.size
+        items = []
+        for i in range(count):
+            item, pos = _get(view, pos)
+            items.append(item)
+        return items, pos
+    if tag == 0x6d:  # m
+        count = _U32.unpack_from(view, pos)[0]
+        pos += _U32.size
+        items = {}
+        for i in range(count):
+            end = pos + _U32.size + _U32.unpack_from(view, pos)[0]
+            if end > len(view):
+                raise IndexError("String out of record")
+            name = str(view[pos + _U32.size:end], "utf-8")
+            items[name], pos = _get(view, end)
+        return items, pos
+    raise KeyError("Unknown tag {}".format(tag))
+
+
+_CODECS = {codec.name: codec for codec in (JSONCodec(), BinaryCodec())}
+
+
+def get_codec(name):
+    """
+    Returns the codec registered under a name.
+
+    Args:
+        name (str): "json" or "binary".
+
+    Raises:
+        ValueError: If there is no such codec.
+    """
+    try:
+        return _CODECS[name]
+    except KeyError:
+        raise ValueError("Unknown storage codec: {}".format(name))
+
+
+def detect_codec(path):
+    """
+    Returns the codec a file was written with, from its first bytes.
+
+    Args:
+        path (str): Path to the storage file.
+    """
+    with open(path, "rb") as file:
+        if file.read(len(BinaryCodec.magic)) == BinaryCodec.magic:
+            return _CODECS["binary"]
+    return _CODECS["json"]
+
+
+def convert(src, dst, codec_name=None):
+    """
+    Rewrites a storage file with another codec, one record at a time.
+
+    Args:
+        src (str): Path to the source file, in any format.
+        dst (str): Path to the destination file.
+        codec_name (str): Codec of the destination. Defaults to the
+        binary codec for a JSON source and the other way around.
+
+    Returns:
+        int: Number of records written.
+    """
+    source = detect_codec(src)
+    if codec_name is None:
+        codec_name = "json" if source.name == "binary" else "binary"
+    target = get_codec(codec_name)
+    with open(src, "rb") as src_file, open(dst, "wb") as dst_file:
+        with target.writer(dst_file) as writer:
+            for key, value in source.iter_records(src_file, strict=True):
+                writer.write(target.encode(key, value))
+    return writer.count
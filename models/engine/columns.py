@@ -0,0 +1,406 @@
+#!/usr/bin/python3
+"""
+Module: columns.py
+
+Columnar mirror of the numeric attributes of the objects of
+one class, for reports that aggregate many objects.
+
+Each numeric attribute is an array('d') holding one value per
+object, and each grouping attribute, such as city_id, an
+array('q') of codes. The store is kept up to date like the
+indexes of the storage, so a report reads the arrays instead
+of going through every instance.
+
+The aggregates run on copies of the arrays taken while no row
+is added or removed, since an array viewed by NumPy cannot
+grow, and so that the storage is not held while they run. When
+NumPy is installed, they run on NumPy views of the copies.
+Otherwise they run with the builtin functions.
+
+Classes:
+- ColumnStore: The columns of one class.
+
+Constants:
+- COLUMNS: Numeric and grouping attributes mirrored for each class.
+
+Usage:
+storage.columns(Place).group_by("city_id", "price_by_night", "mean")
+"""
+
+import math
+from array import array
+from contextlib import nullcontext
+from datetime import datetime
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+_EPOCH = datetime(1970, 1, 1)
+
+COLUMNS = {
+    "Place": (
+        ("price_by_night", "max_guest", "number_rooms", "number_bathrooms",
+         "latitude", "longitude", "created_at", "updated_at"),
+        ("city_id", "user_id"),
+    ),
+    "Review": (
+        ("created_at", "updated_at"),
+        ("place_id", "user_id"),
+    ),
+}
+
+_AGGREGATES = ("sum", "mean", "min", "max", "count")
+
+
+class ColumnStore:
+    """
+    Columns of the objects of one class, one row per object.
+
+    A missing or non-numeric value is stored as NaN and left out
+    of the aggregates. Datetimes are stored as seconds since the
+    epoch. A removed row is replaced by the last one, so that the
+    columns stay dense.
+    """
+
+    def __init__(self, class_name, numbers, categories=(),
+                 reading=nullcontext):
+        """
+        Initializes empty columns.
+
+        Args:
+            class_name (str): Name of the mirrored class.
+            numbers (tuple): Names of the numeric attributes.
+            categories (tuple): Names of the attributes to group by.
+            reading (callable): Returns a context manager during
+            which no row is added or removed, such as the reading()
+            of the storage.
+        """
+        self.class_name = class_name
+        self.reading = reading
+        self.numbers = tuple(numbers)
+        self.categories = tuple(categories)
+        self.attributes = self.numbers + self.categories
+        self.columns = {name: array("d") for name in self.numbers}
+        self.codes = {name: array("q") for name in self.categories}
+        self.labels = {name: [] for name in self.categories}
+        self.label_codes = {name: {} for name in self.categories}
+        self.keys = []
+        self.rows = {}
+
+    def __len__(self):
+        """
+        Returns the number of rows.
+        """
+        return len(self.keys)
+
+    def add(self, key, obj):
+        """
+        Writes the current values of an object in its row,
+        appending the row if the object is new.
+
+        Args:
+            key (str): Storage key of the object.
+            obj (BaseModel): The object.
+        """
+        row = self.rows.get(key)
+        if row is None:
+            row = len(self.keys)
+            self.keys.append(key)
+            self.rows[key] = row
+            for column in self.columns.values():
+                column.append(math.nan)
+            for codes in self.codes.values():
+                codes.append(-1)
+        for name, column in self.columns.items():
+            column[row] = _number(getattr(obj, name, None))
+        for name, codes in self.codes.items():
+            codes[row] = self.__code(name, getattr(obj, name, None))
+
+    def discard(self, key):
+        """
+        Removes the row of a key, nothing is done if it is missing.
+
+        Args:
+            key (str): Storage key of the object.
+        """
+        row = self.rows.pop(key, None)
+        if row is None:
+            return
+        last = len(self.keys) - 1
+        for column in list(self.columns.values()) + \
+                list(self.codes.values()):
+            column[row] = column[last]
+            column.pop()
+        moved = self.keys.pop()
+        if row != last:
+            self.keys[row] = moved
+            self.rows[moved] = row
+
+    def column(self, name):
+        """
+        Returns a copy of a numeric column, as a NumPy array when
+        NumPy is installed. A copy, since an array whose memory is
+        shared cannot grow anymore.
+
+        Args:
+            name (str): Name of the attribute.
+
+        Raises:
+            KeyError: If the attribute is not mirrored.
+        """
+        column, = self.__copy(self.columns[name])
+        if numpy is not None:
+            return numpy.frombuffer(column, dtype=numpy.float64)
+        return column
+
+    def sum(self, name):
+        """
+        Returns the sum of the values of a numeric attribute.
+        """
+        return self.aggregate(name, "sum")
+
+    def mean(self, name):
+        """
+        Returns the mean of the values of a numeric attribute,
+        or NaN if there are none.
+        """
+        return self.aggregate(name, "mean")
+
+    def min(self, name):
+        """
+        Returns the lowest value of a numeric attribute,
+        or NaN if there are none.
+        """
+        return self.aggregate(name, "min")
+
+    def max(self, name):
+        """
+        Returns the highest value of a numeric attribute,
+        or NaN if there are none.
+        """
+        return self.aggregate(name, "max")
+
+    def count(self, name):
+        """
+        Returns the number of objects with a value for a
+        numeric attribute.
+        """
+        return self.aggregate(name, "count")
+
+    def aggregate(self, name, function):
+        """
+        Aggregates the values of a numeric attribute.
+
+        Args:
+            name (str): Name of the attribute.
+            function (str): "sum", "mean", "min", "max" or "count".
+
+        Raises:
+            KeyError: If the attribute is not mirrored.
+            ValueError: If the function is unknown.
+        """
+        if function not in _AGGREGATES:
+            raise ValueError("Unknown aggregate: {}".format(function))
+        column, = self.__copy(self.columns[name])
+        if numpy is not None:
+            values = numpy.frombuffer(column, dtype=numpy.float64)
+            values = values[~numpy.isnan(values)]
+            count = len(values)
+            if function == "count":
+                return count
+            if function == "sum":
+                return float(values.sum())
+            if not count:
+                return math.nan
+            return float(getattr(values, function)())
+        values = column
+        total = sum(column)
+        if total != total:
+            # Some values are missing
+            values = [value for value in column if value == value]
+            total = sum(values)
+        if function == "count":
+            return len(values)
+        if function == "sum":
+            return float(total)
+        if not values:
+            return math.nan
+        if function == "mean":
+            return total / len(values)
+        return float((min if function == "min" else max)(values))
+
+    def histogram(self, name, bins=10, bounds=None):
+        """
+        Counts the values of a numeric attribute in equal width bins.
+
+        Args:
+            name (str): Name of the attribute.
+            bins (int): Number of bins.
+            bounds (tuple): (low, high) of the bins, the lowest and
+            the highest value by default. Values out of them are
+            not counted.
+
+        Returns:
+            tuple: The bins + 1 edges, and the count of each bin.
+            The last bin includes its upper edge.
+        """
+        if bounds is None:
+            bounds = (self.min(name), self.max(name))
+            if bounds[0] != bounds[0]:
+                bounds = (0.0, 1.0)
+        low, high = bounds
+        if low == high:
+            low, high = low - 0.5, high + 0.5
+        column, = self.__copy(self.columns[name])
+        if numpy is not None:
+            values = numpy.frombuffer(column, dtype=numpy.float64)
+            counts, edges = numpy.histogram(
+                values[~numpy.isnan(values)], bins=bins, range=(low, high))
+            return [float(edge) for edge in edges], \
+                [int(count) for count in counts]
+        width = (high - low) / bins
+        edges = [low + width * i for i in range(bins)] + [high]
+        counts = [0] * bins
+        for value in column:
+            if low <= value <= high:
+                counts[min(int((value - low) / width), bins - 1)] += 1
+        return edges, counts
+
+    def group_by(self, category, name=None, function="count"):
+        """
+        Aggregates the values of a numeric attribute by value of
+        a grouping attribute, such as the mean price by city.
+
+        Args:
+            category (str): Name of the grouping attribute.
+            name (str): Name of the numeric attribute, not needed
+            to count the objects of each group.
+            function (str): "sum", "mean", "min", "max" or "count".
+
+        Returns:
+            dict: The aggregate by value of the grouping attribute,
+            for the groups with at least one value.
+
+        Raises:
+            KeyError: If an attribute is not mirrored.
+            ValueError: If the function is unknown.
+        """
+        if function not in _AGGREGATES:
+            raise ValueError("Unknown aggregate: {}".format(function))
+        if name is None:
+            if function != "count":
+                raise ValueError("{} needs an attribute".format(function))
+            codes, labels = self.__copy(self.codes[category],
+                                        self.labels[category])
+            values = array("d", bytes(8 * len(codes)))
+        else:
+            codes, labels, values = self.__copy(
+                self.codes[category], self.labels[category],
+                self.columns[name])
+        if numpy is not None:
+            return self.__group_numpy(codes, labels, values, function)
+
+        size = len(labels)
+        counts = [0] * size
+        if function in ("min", "max"):
+            totals = [None] * size
+            better = min if function == "min" else max
+            for code, value in zip(codes, values):
+                if code >= 0 and value == value:
+                    counts[code] += 1
+                    total = totals[code]
+                    totals[code] = value if total is None else \
+                        better(total, value)
+        else:
+            totals = [0.0] * size
+            for code, value in zip(codes, values):
+                if code >= 0 and value == value:
+                    counts[code] += 1
+                    totals[code] += value
+        result = {}
+        for code, count in enumerate(counts):
+            if not count:
+                continue
+            if function == "count":
+                result[labels[code]] = count
+            elif function == "mean":
+                result[labels[code]] = totals[code] / count
+            else:
+                result[labels[code]] = totals[code]
+        return result
+
+    @staticmethod
+    def __group_numpy(codes, labels, values, function):
+        """
+        Aggregates by group with NumPy.
+        """
+        codes = numpy.frombuffer(codes, dtype=numpy.int64)
+        values = numpy.frombuffer(values, dtype=numpy.float64)
+        keep = (codes >= 0) & ~numpy.isnan(values)
+        codes = codes[keep]
+        values = values[keep]
+        size = len(labels)
+        counts = numpy.bincount(codes, minlength=size)
+        if function == "count":
+            totals = counts
+        elif function in ("sum", "mean"):
+            totals = numpy.bincount(codes, weights=values, minlength=size)
+            if function == "mean":
+                totals = totals / numpy.maximum(counts, 1)
+        else:
+            fill = math.inf if function == "min" else -math.inf
+            totals = numpy.full(size, fill)
+            ufunc = numpy.minimum if function == "min" else numpy.maximum
+            ufunc.at(totals, codes, values)
+        cast = int if function == "count" else float
+        return {
+            labels[code]: cast(totals[code])
+            for code in numpy.flatnonzero(counts)
+        }
+
+    def __copy(self, *columns):
+        """
+        Returns copies of columns, taken together while no row is
+        added or removed.
+        """
+        with self.reading():
+            return [column[:] for column in columns]
+
+    def __code(self, name, value):
+        """
+        Returns the code of a value of a grouping attribute,
+        giving it a new code the first time, or -1 if it
+        cannot be grouped on.
+        """
+        if value is None:
+            return -1
+        codes = self.label_codes[name]
+        try:
+            code = codes.get(value)
+        except TypeError:
+            return -1
+        if code is None:
+            code = len(self.labels[name])
+            codes[value] = code
+            self.labels[name].append(value)
+        return code
+
+
+def _number(value):
+    """
+    Returns the float stored for a value, NaN if it is not a number.
+    """
+    if isinstance(value, bool):
+        return math.nan
+    if isinstance(value, (int, float)):
+        try:
+            return float(value)
+        except OverflowError:
+            return math.nan
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            return value.timestamp()
+        return (value - _EPOCH).total_seconds()
+    return math.nan
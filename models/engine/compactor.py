@@ -0,0 +1,191 @@
+#!/usr/bin/python3
+"""
+Module: compactor.py
+
+Folds the sealed segment of the storage journal into
+the snapshot in a background thread.
+
+The fold only works on the files: it streams the snapshot,
+applies the sealed change records and writes the result
+to a temporary file that atomically replaces the snapshot.
+Only the sealed segment is held in memory.
+The console keeps reading and appending to the active log
+in the meantime.
+
+Processes sharing the files fold one at a time: the fold and
+the swap hold the files exclusively, and a sealed segment
+folded meanwhile by another process is left alone. The new
+snapshot is written to a file of its own, so that no other
+fold or save writes to it.
+
+Crash safety:
+- The new snapshot is fsynced before os.replace() swaps it in,
+so reload() sees either the old or the new snapshot.
+- The sealed segment is removed only after the swap. If the
+process dies in between, replaying it again on top of the new
+snapshot is harmless since every record holds a full object.
+- A fold still running when the process exits is waited for.
+
+Classes:
+- Compactor: Starts and tracks the background folds.
+"""
+
+import atexit
+import os
+import tempfile
+import threading
+from contextlib import nullcontext
+from models.engine.codec import get_codec
+from models.engine.compression import DECOMPRESSION_ERRORS, get_compression
+
+
+class Compactor:
+    """
+    Folds sealed journal segments into the snapshot.
+    """
+
+    def __init__(self, snapshot_path, journal, codec=None,
+                 compression=None, exclusive=nullcontext):
+        """
+        Initializes the compactor.
+
+        Args:
+            snapshot_path (str): Path to the snapshot.
+            journal (Journal): The journal to compact.
+            codec: Codec of the snapshot, JSON by default.
+            compression (Compression): Compression of the snapshot,
+            none by default.
+            exclusive (callable): Returns a context manager holding
+            the files against the other processes, nothing held by
+            default.
+        """
+        self.snapshot_path = snapshot_path
+        self.journal = journal
+        self.codec = codec if codec is not None else get_codec("json")
+        self.compression = compression or get_compression("none")
+        self.exclusive = exclusive
+        self.lock = threading.Lock()
+        self.__thread = None
+        atexit.register(self.wait)
+
+    def running(self):
+        """
+        Tells whether a fold is in progress.
+        """
+        return self.__thread is not None and self.__thread.is_alive()
+
+    def maybe_compact(self, max_bytes, max_records):
+        """
+        Starts a fold if the active log has grown past one of the
+        thresholds, or if a sealed segment was left by a crash.
+
+        Args:
+            max_bytes (int): Size of the log that triggers a fold.
+            max_records (int): Number of records that triggers a fold.
+
+        Returns:
+            bool: True if a fold was started.
+        """
+        if self.running():
+            return False
+        if not os.path.isfile(self.journal.sealed_path):
+            if self.journal.records < max_records and \
+                    self.journal.size() < max_bytes:
+                return False
+            if not self.journal.seal():
+                return False
+        self.__thread = threading.Thread(
+            target=self.fold, name="hbnb-compactor", daemon=True
+        )
+        self.__thread.start()
+        return True
+
+    def wait(self):
+        """
+        Blocks until the current fold, if any, is done.
+        """
+        thread = self.__thread
+        if thread is not None:
+            thread.join()
+
+    def fold(self):
+        """
+        Writes the snapshot with the sealed segment applied
+        and swaps it in place of the old one.
+
+        If the snapshot cannot be read the old snapshot and the
+        sealed segment are left untouched, reload() still replays
+        the segment and the next fold tries again. Nothing is done
+        if the segment was folded or saved over meanwhile.
+        """
+        sealed = self.journal.sealed_path
+        with self.exclusive():
+            if not os.path.isfile(sealed):
+                return
+            directory, name = os.path.split(self.snapshot_path)
+            fd, tmp_path = tempfile.mkstemp(
+                prefix=name + ".", suffix=".fold", dir=directory or "."
+            )
+            os.close(fd)
+            try:
+                self.__write(sealed, tmp_path)
+                with self.lock:
+                    os.replace(tmp_path, self.snapshot_path)
+                    os.remove(sealed)
+            except ValueError:
+                os.remove(tmp_path)
+            except BaseException:
+                if os.path.isfile(tmp_path):
+                    os.remove(tmp_path)
+                raise
+
+    def __write(self, sealed, tmp_path):
+        """
+        Writes the snapshot with the sealed segment applied to a
+        new file, flushed to the disk.
+
+        Args:
+            sealed (str): Path to the sealed segment.
+            tmp_path (str): Path to the new file.
+
+        Raises:
+            ValueError: If the snapshot cannot be read.
+        """
+        codec = self.codec
+        changes = {}
+        for op, key, value in self.journal.read(sealed):
+            changes[key] = value if op == "put" else None
+
+        with self.compression.open(tmp_path, "wb") as file:
+            with codec.writer(file) as writer:
+                for key, value in self.__snapshot_members():
+                    if key not in changes:
+                        writer.write(codec.encode(key, value))
+                for key, value in changes.items():
+                    if value is not None:
+                        writer.write(codec.encode(key, value))
+        # Files made by mkstemp are only readable by their owner
+        try:
+            mode = os.stat(self.snapshot_path).st_mode & 0o777
+        except FileNotFoundError:
+            mode = 0o644
+        os.chmod(tmp_path, mode)
+        # Compressed files only flush their trailer on close
+        with open(tmp_path, "rb") as file:
+            os.fsync(file.fileno())
+
+    def __snapshot_members(self):
+        """
+        Yields the records of the current snapshot one at a time.
+
+        Raises:
+            ValueError: If the snapshot is malformed or cannot be
+            decompressed.
+        """
+        if not os.path.isfile(self.snapshot_path):
+            return
+        with self.compression.open(self.snapshot_path, "rb") as file:
+            try:
+                yield from self.codec.iter_records(file, strict=True)
+            except DECOMPRESSION_ERRORS as error:
+                raise ValueError("Unreadable snapshot") from error
@@ -0,0 +1,101 @@
+#!/usr/bin/python3
+"""
+Module: compression.py
+
+Optional compression of the storage files with the standard
+library: zlib (gzip files), lzma (xz files) or bz2.
+
+The files are opened as streams, so a snapshot is compressed
+while it is written and decompressed while reload() decodes
+it, one buffer at a time, without the whole file in memory.
+
+Files opened in append mode get a new compressed stream
+after the previous ones, which the readers of all three
+formats decode as one continuous file.
+
+Classes:
+- Compression: Opens files with one compression method.
+
+Functions:
+- get_compression(name, level): Returns a compression method.
+"""
+
+import bz2
+import gzip
+import lzma
+import zlib
+from models.engine.stream import CHUNK_SIZE
+
+# Raised when a compressed file is truncated or corrupt
+DECOMPRESSION_ERRORS = (EOFError, OSError, lzma.LZMAError, zlib.error)
+
+_METHODS = {
+    "none": (None, ""),
+    "zlib": (gzip, ".gz"),
+    "lzma": (lzma, ".xz"),
+    "bz2": (bz2, ".bz2"),
+}
+
+
+class Compression:
+    """
+    Compression method of the storage files.
+    """
+
+    def __init__(self, name, level=None):
+        """
+        Initializes the method.
+
+        Args:
+            name (str): "none", "zlib", "lzma" or "bz2".
+            level (int): Compression level, the default of the
+            method when None.
+
+        Raises:
+            ValueError: If there is no such method.
+        """
+        if name not in _METHODS:
+            raise ValueError("Unknown storage compression: {}".format(name))
+        self.name = name
+        self.level = level
+        self.module, self.extension = _METHODS[name]
+
+    def open(self, path, mode):
+        """
+        Opens a file, compressing what is written and
+        decompressing what is read.
+
+        Args:
+            path (str): Path to the file.
+            mode (str): "rb", "wb" or "ab".
+
+        Returns:
+            file: A binary file object.
+        """
+        if self.module is None:
+            return open(path, mode, buffering=CHUNK_SIZE)
+        if "r" in mode or self.level is None:
+            return self.module.open(path, mode)
+        if self.module is lzma:
+            return lzma.open(path, mode, preset=self.level)
+        return self.module.open(path, mode, compresslevel=self.level)
+
+
+def get_compression(name, level=None):
+    """
+    Returns a compression method.
+
+    Args:
+        name (str): "none", "zlib", "lzma" or "bz2".
+        level (int or str): Compression level, the default
+        of the method when None or empty.
+
+    Raises:
+        ValueError: If there is no such method or the level
+        is not a number.
+    """
+    if level is not None and level != "":
+        level = int(level)
+    else:
+        level = None
+    return Compression(name, level)
@@ -0,0 +1,682 @@
+#!/usr/bin/python3
+"""
+Module: db_storage.py
+
+Manages the persistence of objects in a SQLite database,
+behind the same interface as FileStorage.
+
+Each object is one row of the "objects" table, keyed by
+"<class name>.<id>" and holding the JSON of to_dict().
+A save only upserts the rows of the objects changed since
+the last save and deletes the rows of the removed ones,
+all in one transaction, instead of rewriting every object.
+
+Each row written is stamped, by a trigger, with a number taken
+from the AUTOINCREMENT "stamps" table, which only grows. Loading
+the changes of other processes reads the rows stamped since the
+last one read, and the keys to tell the deleted rows.
+
+The database is in WAL mode: readers, in this or other
+processes, keep reading the last committed state while
+a save is being written.
+
+Class:
+- DBStorage: Handles storage and retrieval
+of instances to/from a SQLite database.
+
+Attributes:
+- __db_path (str): Path to the database (HBNB_DB_PATH).
+- __durability (str): "none", "atomic" or "fsync", mapped to the
+synchronous setting of SQLite (HBNB_STORAGE_DURABILITY).
+- __objects (dict): Dictionary to store instances
+by their class name and ID.
+- __indexes (IndexSet): Keys of the stored objects by class,
+and by value of the looked up attributes.
+- __dirty (set): Instances changed since the last save.
+- __transaction (UndoLog): Undo log of the open transaction, or None.
+- __deleted (set): Keys of the instances removed since the last save.
+- __data_version (int): Data version of the database when it was
+last read or written, changed by the commits of other connections.
+- __stamp (int): Stamp of the last row write read from the database,
+-1 before the first read.
+
+Methods:
+- all(self, cls=None): Returns the dictionary of stored objects,
+or of the objects of one class.
+- count(self, cls=None): Returns the number of stored objects,
+or of the objects of one class.
+- lookup(self, cls, attribute, value): Returns the objects of a class
+whose attribute has a value, such as the cities of a state.
+- index(self, cls, attribute, kind="hash"): Returns the hash, range,
+geo, text or bitmap index of an attribute.
+- query(self, cls): Starts a query over the objects of a class.
+- columns(self, cls): Returns the columnar mirror of a class.
+- new(self, obj): Adds an object to the storage.
+- delete(self, obj=None): Removes an object from the storage.
+- touch(self, obj, name=None): Flags an object as changed since the last save.
+- remember(self, obj): Records an object about to change in a transaction.
+- begin(self): Opens a transaction, deferring the saves.
+- commit(self): Closes the transaction and saves its changes.
+- rollback(self): Closes the transaction and undoes its changes.
+- in_transaction(self): Tells whether a transaction is open.
+- reading(self): Context manager for a block reading the objects.
+- batch(self): Context manager running a block in a transaction.
+- save(self): Writes the changed objects to the database.
+- flush(self): Does nothing, the saves are not deferred.
+- reload(self): Loads the objects of the database.
+- changed(self): Tells whether another process saved meanwhile.
+- refresh(self): Loads the changes other processes saved.
+- compact(self): Moves the WAL content into the database file.
+- close(self): Closes the database connection.
+
+Usage:
+HBNB_TYPE_STORAGE=db ./console.py
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from models.engine.index import AttributeIndex, BitmapIndex, GeoIndex, \
+    IndexSet, RangeIndex, TextIndex
+from models.engine.columns import COLUMNS, ColumnStore
+from models.engine.durability import get_durability
+from models.engine.query import Query
+from models.engine.transaction import UndoLog
+from models.base_model import BaseModel
+from models.user import User
+from models.amenity import Amenity
+from models.review import Review
+from models.state import State
+from models.city import City
+from models.place import Place
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS objects (
+    key TEXT PRIMARY KEY,
+    class TEXT NOT NULL,
+    id TEXT NOT NULL,
+    data TEXT NOT NULL,
+    stamp INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS objects_class ON objects (class);
+CREATE TABLE IF NOT EXISTS stamps (
+    stamp INTEGER PRIMARY KEY AUTOINCREMENT
+);
+"""
+
+_STAMPS = """
+CREATE INDEX IF NOT EXISTS objects_stamp ON objects (stamp);
+CREATE TRIGGER IF NOT EXISTS objects_inserted AFTER INSERT ON objects
+BEGIN
+    INSERT INTO stamps (stamp) VALUES (NULL);
+    DELETE FROM stamps WHERE stamp < last_insert_rowid();
+    UPDATE objects SET stamp = last_insert_rowid() WHERE key = NEW.key;
+END;
+CREATE TRIGGER IF NOT EXISTS objects_updated AFTER UPDATE OF data ON objects
+BEGIN
+    INSERT INTO stamps (stamp) VALUES (NULL);
+    DELETE FROM stamps WHERE stamp < last_insert_rowid();
+    UPDATE objects SET stamp = last_insert_rowid() WHERE key = NEW.key;
+END;
+"""
+
+_UPSERT = """
+INSERT INTO objects (key, class, id, data) VALUES (?, ?, ?, ?)
+ON CONFLICT (key) DO UPDATE SET data = excluded.data
+"""
+
+_LAST_STAMP = "SELECT COALESCE(MAX(stamp), 0) FROM stamps"
+
+_SYNCHRONOUS = {"none": "OFF", "atomic": "NORMAL", "fsync": "FULL"}
+
+
+class DBStorage:
+    """
+    DBStorage class manages persistence of instances in SQLite.
+    """
+
+    __db_path = os.getenv("HBNB_DB_PATH", "file.db")
+    __durability = get_durability(
+        os.getenv("HBNB_STORAGE_DURABILITY", "atomic"))
+    __objects = {}
+    __indexes = IndexSet()
+    __dirty = set()
+    __deleted = set()
+    __transaction = None
+    __connection = None
+    __connection_path = None
+    __data_version = None
+    __stamp = -1
+    __lock = threading.Lock()
+
+    def all(self, cls=None):
+        """
+        Returns the stored objects in a dictionary.
+
+        Args:
+            cls (type or str): Only returns the objects of this class,
+            found through the class index without looking at the
+            objects of the other classes.
+
+        Returns:
+            dict: A dictionary containing all stored objects,
+            or the objects of cls.
+        """
+        objs = DBStorage.__objects
+        if cls is None:
+            return objs
+        class_name = cls if isinstance(cls, str) else cls.__name__
+        return {
+            key: objs[key]
+            for key in self.__index_set().classes.keys(class_name)
+            if key in objs
+        }
+
+    def count(self, cls=None):
+        """
+        Returns the number of stored objects.
+
+        Args:
+            cls (type or str): Only counts the objects of this class.
+
+        Returns:
+            int: The number of objects.
+        """
+        if cls is None:
+            return len(DBStorage.__objects)
+        class_name = cls if isinstance(cls, str) else cls.__name__
+        return self.__index_set().classes.count(class_name)
+
+    def lookup(self, cls, attribute, value):
+        """
+        Returns the stored objects of a class whose attribute equals
+        a value, like lookup(City, "state_id", state.id) for the cities
+        of a state.
+
+        The objects are found through a hash index on the attribute,
+        built from the objects of the class on the first lookup and
+        kept up to date afterwards, so each lookup only costs the
+        size of its result. The result is cached until an object
+        gets in or out of it.
+
+        Args:
+            cls (type or str): The class of the objects.
+            attribute (str): Name of the attribute, usually a foreign
+            key such as state_id, city_id, user_id or place_id.
+            value: The value looked up.
+
+        Returns:
+            dict: The matching objects by key.
+        """
+        objs = DBStorage.__objects
+        index = self.index(cls, attribute)
+        found = index.cached(value)
+        if found is None:
+            found = {}
+            for key in index.keys(value):
+                obj = objs.get(key)
+                if obj is not None:
+                    found[key] = obj
+            index.cache(value, found)
+        return dict(found)
+
+    def index(self, cls, attribute, kind="hash"):
+        """
+        Returns an index of an attribute of a class, built from
+        the objects of the class the first time it is used.
+
+        Args:
+            cls (type or str): The class of the objects.
+            attribute (str): Name of the attribute, or the names of
+            the latitude and longitude attributes for a geo index,
+            or of the text attributes for a text index.
+            kind (str): "hash" for an AttributeIndex, "range" for
+            a sorted RangeIndex of a numeric attribute, "geo" for
+            a GeoIndex of coordinates, "text" for a full-text
+            TextIndex, "bitmap" for a BitmapIndex of a list.
+
+        Returns:
+            The index.
+
+        Raises:
+            ValueError: If the kind of index is unknown.
+        """
+        class_name = cls if isinstance(cls, str) else cls.__name__
+        if kind == "range":
+            return self.__index_set().get(
+                (class_name, attribute, kind),
+                lambda: RangeIndex(class_name, attribute),
+                DBStorage.__objects
+            )
+        if kind == "geo":
+            return self.__index_set().get(
+                (class_name, tuple(attribute), kind),
+                lambda: GeoIndex(class_name, *attribute),
+                DBStorage.__objects
+            )
+        if kind == "text":
+            return self.__index_set().get(
+                (class_name, tuple(attribute), kind),
+                lambda: TextIndex(class_name, attribute),
+                DBStorage.__objects
+            )
+        if kind == "bitmap":
+            return self.__index_set().get(
+                (class_name, attribute, kind),
+                lambda: BitmapIndex(class_name, attribute),
+                DBStorage.__objects
+            )
+        if kind != "hash":
+            raise ValueError("Unknown index kind: {}".format(kind))
+        return self.__index_set().get(
+            (class_name, attribute),
+            lambda: AttributeIndex(class_name, attribute), DBStorage.__objects
+        )
+
+    def query(self, cls):
+        """
+        Starts a query over the objects of a class, such as
+        query(Place).filter(city_id=city.id).order_by("name").
+
+        Args:
+            cls (type or str): The class of the objects.
+
+        Returns:
+            Query: The query matching every object of the class.
+        """
+        return Query(self, cls)
+
+    def columns(self, cls):
+        """
+        Returns the columns of the numeric attributes of a class,
+        built from its objects the first time and kept up to date
+        afterwards, such as columns(Place).mean("price_by_night").
+
+        Args:
+            cls (type or str): The class of the objects.
+
+        Returns:
+            ColumnStore: The columns.
+
+        Raises:
+            ValueError: If the class has no columns.
+        """
+        class_name = cls if isinstance(cls, str) else cls.__name__
+        if class_name not in COLUMNS:
+            raise ValueError("No columns for {}".format(class_name))
+        return self.__index_set().get(
+            (class_name, "columns"),
+            lambda: ColumnStore(class_name, *COLUMNS[class_name],
+                                reading=self.reading),
+            DBStorage.__objects
+        )
+
+    def new(self, obj):
+        """
+        Adds a new instance to the storage.
+
+        Args:
+            obj (BaseModel): The Added object into storage.
+        """
+        key = "{}.{}".format(obj.__class__.__name__, obj.id)
+        if DBStorage.__transaction is not None:
+            DBStorage.__transaction.new(key, DBStorage.__objects.get(key))
+        DBStorage.__objects[key] = obj
+        DBStorage.__indexes.add(key, obj)
+        DBStorage.__dirty.add(obj)
+        DBStorage.__deleted.discard(key)
+
+    def delete(self, obj=None):
+        """
+        Removes an instance from the storage.
+
+        Args:
+            obj (BaseModel): The object to remove, nothing is done if None.
+        """
+        if obj is None:
+            return
+        key = "{}.{}".format(obj.__class__.__name__, obj.id)
+        if DBStorage.__objects.get(key) is obj:
+            if DBStorage.__transaction is not None:
+                DBStorage.__transaction.delete(key, obj)
+            del DBStorage.__objects[key]
+            DBStorage.__indexes.discard(key)
+            DBStorage.__dirty.discard(obj)
+            DBStorage.__deleted.add(key)
+
+    def touch(self, obj, name=None):
+        """
+        Flags an instance as changed since the last save.
+
+        Args:
+            obj (BaseModel): The changed object.
+            name (str): Name of the attribute that was set, so that
+            the indexes on it are updated.
+        """
+        DBStorage.__dirty.add(obj)
+        if name is not None:
+            DBStorage.__indexes.touch(obj, name)
+
+    def remember(self, obj):
+        """
+        Records the attributes of a stored instance about to change,
+        so that a rollback restores them. Nothing is done outside of
+        a transaction.
+
+        Args:
+            obj (BaseModel): The object about to change.
+        """
+        transaction = DBStorage.__transaction
+        if transaction is None:
+            return
+        key = "{}.{}".format(obj.__class__.__name__,
+                             obj.__dict__.get("id"))
+        if dict.get(DBStorage.__objects, key) is obj:
+            transaction.touch(key, obj)
+
+    def begin(self):
+        """
+        Opens a transaction: saves are deferred to its commit,
+        and its changes are recorded so that a rollback undoes
+        them in memory. Opening a transaction within another one
+        joins it.
+        """
+        if DBStorage.__transaction is not None:
+            DBStorage.__transaction.depth += 1
+            return
+        DBStorage.__transaction = UndoLog(
+            DBStorage.__dirty, DBStorage.__deleted
+        )
+
+    def commit(self):
+        """
+        Closes the transaction and saves all of its changes at once.
+        The commit of a joined transaction only closes it.
+
+        Raises:
+            ValueError: If no transaction is open.
+        """
+        transaction = DBStorage.__transaction
+        if transaction is None:
+            raise ValueError("No transaction in progress")
+        transaction.depth -= 1
+        if transaction.depth:
+            return
+        DBStorage.__transaction = None
+        self.save()
+
+    def rollback(self):
+        """
+        Closes the transaction, joined ones included, and undoes
+        its creations, updates and deletions. Nothing is saved.
+
+        Raises:
+            ValueError: If no transaction is open.
+        """
+        transaction = DBStorage.__transaction
+        if transaction is None:
+            raise ValueError("No transaction in progress")
+        DBStorage.__transaction = None
+        transaction.undo(DBStorage.__objects, DBStorage.__indexes)
+        DBStorage.__dirty.clear()
+        DBStorage.__dirty.update(transaction.dirty)
+        DBStorage.__deleted.clear()
+        DBStorage.__deleted.update(transaction.deleted)
+
+    def in_transaction(self):
+        """
+        Tells whether a transaction is open.
+        """
+        return DBStorage.__transaction is not None
+
+    @contextmanager
+    def reading(self):
+        """
+        Runs a block reading the objects, given the dictionary of
+        the stored objects. Nothing is locked: unlike FileStorage,
+        DBStorage is meant for one thread at a time.
+        """
+        yield DBStorage.__objects
+
+    @contextmanager
+    def batch(self):
+        """
+        Runs a block in a transaction, saving once at its end,
+        or rolling it back if the block raises:
+
+            with storage.batch():
+                for place in places:
+                    place.price_by_night += 10
+                    place.save()
+        """
+        self.begin()
+        try:
+            yield self
+        except BaseException:
+            if DBStorage.__transaction is not None:
+                self.rollback()
+            raise
+        if DBStorage.__transaction is not None:
+            self.commit()
+
+    def save(self):
+        """
+        Upserts the rows of the instances changed since the last
+        save and deletes the rows of the removed ones, in a single
+        transaction. Nothing is written if it fails.
+        Within a transaction, nothing is written until its commit.
+        """
+        if DBStorage.__transaction is not None:
+            return
+        objs = DBStorage.__objects
+        rows = []
+        for obj in DBStorage.__dirty:
+            class_name = obj.__class__.__name__
+            key = "{}.{}".format(class_name, obj.id)
+            if objs.get(key) is obj:
+                rows.append(
+                    (key, class_name, obj.id, json.dumps(obj.to_dict()))
+                )
+        deletes = [(key,) for key in DBStorage.__deleted]
+        if not rows and not deletes:
+            return
+
+        with DBStorage.__lock:
+            connection = self.__connect()
+            with connection:
+                # No other process writes between the two reads
+                connection.execute("BEGIN IMMEDIATE")
+                stamp = connection.execute(_LAST_STAMP).fetchone()[0]
+                connection.executemany(
+                    "DELETE FROM objects WHERE key = ?", deletes
+                )
+                connection.executemany(_UPSERT, rows)
+                if stamp == DBStorage.__stamp:
+                    # Nothing written by others is skipped over
+                    DBStorage.__stamp = \
+                        connection.execute(_LAST_STAMP).fetchone()[0]
+        DBStorage.__dirty.clear()
+        DBStorage.__deleted.clear()
+
+    def flush(self):
+        """
+        Does nothing: the saves of the database are not deferred,
+        unlike the write-behind saves of FileStorage.
+        """
+
+    def reload(self):
+        """
+        Loads the instances stored in the database.
+        Rows that cannot be decoded or instantiated are skipped.
+        """
+        with DBStorage.__lock:
+            connection = self.__connect()
+            with connection:
+                # The rows and their last stamp are read at once
+                connection.execute("BEGIN")
+                DBStorage.__data_version = self.__version(connection)
+                DBStorage.__stamp = \
+                    connection.execute(_LAST_STAMP).fetchone()[0]
+                rows = connection.execute("SELECT key, data FROM objects")
+                for key, data in rows:
+                    try:
+                        self.__load(key, json.loads(data))
+                    except Exception:
+                        pass
+
+    def changed(self):
+        """
+        Tells whether another process committed to the database
+        since this one last read it. The commits of this process
+        do not count.
+        """
+        with DBStorage.__lock:
+            version = self.__version(self.__connect())
+        return version != DBStorage.__data_version
+
+    def refresh(self):
+        """
+        Loads the changes other processes committed since this one
+        last read the database: only the rows written since are
+        read, and decoded if they differ from the stored instances.
+        The instances whose row was deleted are removed, for which
+        only the keys of the rows are read. The instances changed
+        or deleted here since the last save are kept as they are.
+
+        Returns:
+            int: The number of instances created, updated or removed.
+        """
+        if not self.changed():
+            return 0
+        objs = DBStorage.__objects
+        local = {"{}.{}".format(obj.__class__.__name__, obj.id)
+                 for obj in DBStorage.__dirty}
+        local.update(DBStorage.__deleted)
+        changes = 0
+        with DBStorage.__lock:
+            connection = self.__connect()
+            with connection:
+                connection.execute("BEGIN")
+                DBStorage.__data_version = self.__version(connection)
+                stamp = connection.execute(_LAST_STAMP).fetchone()[0]
+                rows = connection.execute(
+                    "SELECT key, data FROM objects WHERE stamp > ?",
+                    (DBStorage.__stamp,)
+                )
+                for key, data in rows:
+                    obj = objs.get(key)
+                    # Rows this process wrote while behind come back
+                    if key in local or obj is not None and \
+                            json.dumps(obj.to_dict()) == data:
+                        continue
+                    try:
+                        self.__load(key, json.loads(data))
+                        changes += 1
+                    except Exception:
+                        pass
+                keys = {key for key, in
+                        connection.execute("SELECT key FROM objects")}
+            DBStorage.__stamp = stamp
+            gone = [key for key in objs
+                    if key not in keys and key not in local]
+            for key in gone:
+                del objs[key]
+                DBStorage.__indexes.discard(key)
+        return changes + len(gone)
+
+    def compact(self):
+        """
+        Copies the content of the write-ahead log into the
+        database file and truncates the log.
+        """
+        with DBStorage.__lock:
+            self.__connect().execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def close(self):
+        """
+        Closes the database connection, which is opened again
+        by the next save or reload.
+        """
+        with DBStorage.__lock:
+            if DBStorage.__connection is not None:
+                DBStorage.__connection.close()
+                DBStorage.__connection = None
+                DBStorage.__connection_path = None
+
+    def __connect(self):
+        """
+        Returns the connection to the database, opening it and
+        creating the schema if needed.
+        """
+        path = DBStorage.__db_path
+        if DBStorage.__connection is not None and \
+                DBStorage.__connection_path == path:
+            return DBStorage.__connection
+        if DBStorage.__connection is not None:
+            DBStorage.__connection.close()
+        connection = sqlite3.connect(path, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        # In WAL mode, NORMAL commits atomically but only syncs
+        # the log at checkpoints, FULL syncs it on every commit
+        connection.execute("PRAGMA synchronous={}".format(
+            _SYNCHRONOUS[DBStorage.__durability]))
+        connection.executescript(_SCHEMA)
+        columns = [row[1] for row in
+                   connection.execute("PRAGMA table_info(objects)")]
+        if "stamp" not in columns:
+            # A database written before the rows were stamped
+            connection.execute("ALTER TABLE objects ADD COLUMN "
+                               "stamp INTEGER NOT NULL DEFAULT 0")
+        connection.executescript(_STAMPS)
+        # Data versions of different connections do not compare,
+        # nor do the stamps of a database written over meanwhile
+        DBStorage.__data_version = None
+        DBStorage.__stamp = -1
+        DBStorage.__connection = connection
+        DBStorage.__connection_path = path
+        return connection
+
+    @staticmethod
+    def __version(connection):
+        """
+        Returns the data version of the database.
+
+        Args:
+            connection (Connection): The connection to the database.
+        """
+        return connection.execute("PRAGMA data_version").fetchone()[0]
+
+    def __index_set(self):
+        """
+        Returns the indexes, with the class index rebuilt and the
+        attribute indexes dropped if the dictionary of objects was
+        replaced or changed behind the storage's back.
+        """
+        DBStorage.__indexes.check(DBStorage.__objects)
+        return DBStorage.__indexes
+
+    def __load(self, key, value):
+        """
+        Builds an instance from its serialized form and stores it
+        as a clean (already persisted) object.
+
+        Args:
+            key (str): Storage key of the object.
+            value (dict): Dictionary made by to_dict().
+
+        Returns:
+            BaseModel: The new instance.
+        """
+        class_name, obj_id = key.split('.')
+
+        cls = eval(class_name)
+
+        instance = cls(**value)
+
+        DBStorage.__objects[key] = instance
+        DBStorage.__indexes.add(key, instance)
+        DBStorage.__dirty.discard(instance)
+        return instance
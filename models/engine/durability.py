@@ -0,0 +1,153 @@
+#!/usr/bin/python3
+"""
+Module: durability.py
+
+Durability levels of the storage files.
+
+- none: the data file is rewritten in place. A crash in the
+middle of a save leaves it truncated.
+- atomic: the data file is written aside, then swapped in with
+os.replace(), so it always holds one complete save. A crash of
+the machine can still lose the last saves, which may be in the
+page cache only.
+- fsync: as atomic, and the new file and its directory are
+flushed to the disk before save() returns. Concurrent saves
+are grouped, one write and fsync covering all of them.
+
+Classes:
+- GroupCommit: Runs one write for the saves requested meanwhile.
+
+Functions:
+- get_durability(name): Checks the name of a durability level.
+- sync_file(path): Flushes a file to the disk.
+- sync_dir(path): Flushes the directory entry of a file to the disk.
+- replace_file(tmp_path, path, level): Swaps a written file in.
+"""
+
+import os
+import threading
+
+LEVELS = ("none", "atomic", "fsync")
+
+
+def get_durability(name):
+    """
+    Returns the name of a durability level, once checked.
+
+    Args:
+        name (str): "none", "atomic" or "fsync".
+
+    Raises:
+        ValueError: If there is no such level.
+    """
+    if name not in LEVELS:
+        raise ValueError("Unknown storage durability: {}".format(name))
+    return name
+
+
+def sync_file(path):
+    """
+    Flushes the content of a file to the disk. The file is
+    opened again, since compressed files only write their
+    trailer when they are closed.
+
+    Args:
+        path (str): Path of the file.
+    """
+    with open(path, "rb") as file:
+        os.fsync(file.fileno())
+
+
+def sync_dir(path):
+    """
+    Flushes to the disk the directory holding a file, so that
+    a file renamed into it survives a crash. Nothing is done
+    where directories cannot be opened, as on Windows.
+
+    Args:
+        path (str): Path of the file.
+    """
+    try:
+        fd = os.open(os.path.dirname(path) or ".", os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def replace_file(tmp_path, path, level):
+    """
+    Swaps a file written aside in place of another one.
+
+    Args:
+        tmp_path (str): Path of the new file.
+        path (str): Path of the file it replaces.
+        level (str): Durability level, the new file and the
+        directory are flushed to the disk at "fsync".
+    """
+    if level == "fsync":
+        sync_file(tmp_path)
+    os.replace(tmp_path, path)
+    if level == "fsync":
+        sync_dir(path)
+
+
+class GroupCommit:
+    """
+    Coalesces concurrent saves.
+
+    A save that starts while a write is running waits for it to
+    end, then runs one write for itself and every save that
+    queued up meanwhile: since each write covers the changes
+    made until it starts, n concurrent saves cost two writes
+    and two fsyncs rather than n.
+    """
+
+    def __init__(self):
+        """
+        Initializes the group commit, with no write running.
+        """
+        self.condition = threading.Condition()
+        self.requested = 0
+        self.done = 0
+        self.running = False
+        self.writes = 0
+
+    def run(self, write):
+        """
+        Returns once a write started after the call has ended,
+        running it in the calling thread if no other thread does.
+
+        Args:
+            write (callable): Writes every change made until then.
+
+        Raises:
+            Exception: What write raised, in the thread that ran it.
+            The saves it covered run another write.
+        """
+        with self.condition:
+            self.requested += 1
+            ticket = self.requested
+            # A write that started after the call may end meanwhile
+            while self.running and self.done < ticket:
+                self.condition.wait()
+            if self.done >= ticket:
+                return
+            self.running = True
+            covered = self.requested
+        try:
+            write()
+        except BaseException:
+            with self.condition:
+                self.running = False
+                self.condition.notify_all()
+            raise
+        with self.condition:
+            self.running = False
+            self.done = covered
+            self.writes += 1
+            self.condition.notify_all()
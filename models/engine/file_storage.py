@@ -13,12 +13,79 @@ Attributes:
 - __file_path (str): Path to the JSON file.
 - __objects (dict): Dictionary to store instances
 by their class name and ID.
+- __journal (bool): Appends changes to a log instead of
+rewriting the JSON file (HBNB_STORAGE_JOURNAL=1).
+- __compact_bytes (int): Log size that triggers a background
+compaction (HBNB_STORAGE_COMPACT_BYTES).
+- __compact_records (int): Number of log records that triggers
+a background compaction (HBNB_STORAGE_COMPACT_RECORDS).
+- __shards (int): Number of files per class in the sharded
+layout, 0 to keep one shared JSON file (HBNB_STORAGE_SHARDS).
+- __lazy (bool): Decodes each object of the JSON file the first
+time it is looked up (HBNB_STORAGE_LAZY=1).
+- __mmap_bytes (int): Size from which the JSON file is memory-mapped
+in lazy mode (HBNB_STORAGE_MMAP_BYTES).
+- __codec: Format of the data files, "json" or "binary"
+(HBNB_STORAGE_CODEC). Binary data goes to file.bin.
+- __compression: Compression of the data files and the change log,
+"none", "zlib", "lzma" or "bz2" (HBNB_STORAGE_COMPRESSION), at the
+level given by HBNB_STORAGE_COMPRESSION_LEVEL.
+- __indexes (IndexSet): Keys of the stored objects by class,
+and by value of the looked up attributes.
+- __dirty (set): Instances changed since the last save.
+- __durability (str): "none" rewrites the data files in place,
+"atomic" writes them aside and swaps them in, "fsync" also flushes
+them to the disk, grouping concurrent saves (HBNB_STORAGE_DURABILITY).
+- __write_behind (bool): Defers the saves to a background thread
+that writes a burst of them at once (HBNB_STORAGE_WRITE_BEHIND=1).
+- __flush_interval (float): Longest time, in seconds, a deferred
+save waits (HBNB_STORAGE_FLUSH_MS, in milliseconds).
+- __flush_changes (int): Number of pending changes that triggers
+a deferred save without waiting (HBNB_STORAGE_FLUSH_CHANGES).
+- __lock (RWLock): Held by the threads reading the objects, or by
+the one changing them.
+- __mutex (RLock): Held while changing what the readers do not look
+at: decoding a stub, building an index or saving.
+- __dirty_lock (Lock): Held while the set of changed instances is
+changed or copied, so that flagging a change does not wait for a
+save writing the files.
+- __loading (local): Set while the thread builds a loaded instance,
+which its constructor must not add to the storage.
+- __view (dict): Copy of the objects returned by all(), shared until
+the next change.
+- __transaction (UndoLog): Undo log of the open transaction, or None.
+- __fragments (dict): Encoded record of each clean instance by key.
+- __file_lock (FileLock): Lock of the data files shared with the
+other processes, and number of saves they made.
 
 Methods:
-- all(self): Returns the dictionary of stored objects.
+- all(self, cls=None): Returns a snapshot of the stored objects,
+or of the objects of one class.
+- count(self, cls=None): Returns the number of stored objects,
+or of the objects of one class.
+- lookup(self, cls, attribute, value): Returns the objects of a class
+whose attribute has a value, such as the cities of a state.
+- index(self, cls, attribute, kind="hash"): Returns the hash, range,
+geo, text or bitmap index of an attribute.
+- query(self, cls): Starts a query over the objects of a class.
+- columns(self, cls): Returns the columnar mirror of a class.
 - new(self, obj): Adds an object to the storage.
+- delete(self, obj=None): Removes an object from the storage.
+- touch(self, obj, name=None): Flags an object as changed since the last save.
+- remember(self, obj): Records an object about to change in a transaction.
+- begin(self): Opens a transaction, deferring the saves.
+- commit(self): Closes the transaction and saves its changes.
+- rollback(self): Closes the transaction and undoes its changes.
+- in_transaction(self): Tells whether a transaction is open.
+- reading(self): Context manager holding the objects still.
+- batch(self): Context manager running a block in a transaction.
 - save(self): Serializes the objects and saves to the JSON file.
+- flush(self): Writes the pending write-behind saves.
 - reload(self): Deserializes the JSON file and loads objects.
+- changed(self): Tells whether another process saved meanwhile.
+- refresh(self): Loads the changes other processes saved.
+- close(self): Closes the lock file shared with the other processes.
+- compact(self): Folds the change log into the JSON file.
 
 Usage:
 from models.engine.file_storage import FileStorage
@@ -33,9 +100,27 @@ storage.reload()
 # Call storage.save() after each operation to persist changes
 """
 
-import json
 import os
+import threading
+from contextlib import contextmanager
 
+from models.engine.codec import get_codec
+from models.engine.compression import DECOMPRESSION_ERRORS, get_compression
+from models.engine.compactor import Compactor
+from models.engine.durability import GroupCommit, get_durability, \
+    replace_file
+from models.engine.filelock import FileLock
+from models.engine.flusher import Flusher
+from models.engine.index import AttributeIndex, BitmapIndex, GeoIndex, \
+    IndexSet, RangeIndex, TextIndex
+from models.engine.columns import COLUMNS, ColumnStore
+from models.engine.query import Query
+from models.engine.rwlock import RWLock
+from models.engine.transaction import UndoLog
+from models.engine.journal import Journal
+from models.engine.lazy import LazyObjects, Snapshot, Stub
+from models.engine.lazy import read_index, write_index
+from models.engine.shards import shard_name, read_shards
 from models.base_model import BaseModel
 from models.user import User
 from models.amenity import Amenity
@@ -45,6 +130,14 @@ from models.city import City
 from models.place import Place
 
 
+class _Loading(threading.local):
+    """
+    Whether the current thread is building a loaded instance.
+    """
+
+    active = False
+
+
 class FileStorage:
     """
     Manages the serialization and deserialization
@@ -53,15 +146,205 @@ class FileStorage:
 
     __file_path = "file.json"
     __objects = {}
+    __journal = os.getenv("HBNB_STORAGE_JOURNAL") == "1"
+    __compact_bytes = int(os.getenv("HBNB_STORAGE_COMPACT_BYTES", 1 << 22))
+    __compact_records = int(os.getenv("HBNB_STORAGE_COMPACT_RECORDS", 10000))
+    __shards = int(os.getenv("HBNB_STORAGE_SHARDS", 0))
+    __lazy = os.getenv("HBNB_STORAGE_LAZY") == "1"
+    __mmap_bytes = int(os.getenv("HBNB_STORAGE_MMAP_BYTES", 1 << 20))
+    __codec = get_codec(os.getenv("HBNB_STORAGE_CODEC", "json"))
+    __compression = get_compression(
+        os.getenv("HBNB_STORAGE_COMPRESSION", "none"),
+        os.getenv("HBNB_STORAGE_COMPRESSION_LEVEL")
+    )
+    __durability = get_durability(
+        os.getenv("HBNB_STORAGE_DURABILITY", "atomic"))
+    __group = GroupCommit()
+    __write_behind = os.getenv("HBNB_STORAGE_WRITE_BEHIND") == "1"
+    __flush_interval = int(os.getenv("HBNB_STORAGE_FLUSH_MS", 1000)) / 1000
+    __flush_changes = int(os.getenv("HBNB_STORAGE_FLUSH_CHANGES", 1000))
+    __flusher = None
+    __lock = RWLock()
+    __mutex = threading.RLock()
+    __dirty_lock = threading.Lock()
+    __loading = _Loading()
+    __view = None
+    __view_of = None
+    __snapshot = None
+    __journal_log = None
+    __compactor = None
+    __indexes = IndexSet()
+    __dirty = set()
+    __deleted = set()
+    __transaction = None
+    __fragments = {}
+    __fragments_codec = None
+    __file_lock = None
 
-    def all(self):
+    def all(self, cls=None):
         """
         Returns the stored objects in a dictionary.
 
+        The dictionary is a snapshot: other threads can change the
+        storage while it is iterated. Without cls, the same copy is
+        returned until the next change, and must not be modified.
+
+        Args:
+            cls (type or str): Only returns the objects of this class,
+            found through the class index without looking at the
+            objects of the other classes.
+
+        Returns:
+            dict: A dictionary containing all stored objects,
+            or the objects of cls.
+        """
+        if cls is None:
+            return self.__objects_view()
+        class_name = cls if isinstance(cls, str) else cls.__name__
+        indexes = self.__index_set()
+        class_objs = {}
+        with FileStorage.__lock.read():
+            objs = FileStorage.__objects
+            for key in indexes.classes.keys(class_name):
+                obj = objs.get(key)
+                if obj is not None:
+                    class_objs[key] = obj
+        return class_objs
+
+    def count(self, cls=None):
+        """
+        Returns the number of stored objects.
+
+        Args:
+            cls (type or str): Only counts the objects of this class.
+
+        Returns:
+            int: The number of objects.
+        """
+        if cls is None:
+            return len(FileStorage.__objects)
+        class_name = cls if isinstance(cls, str) else cls.__name__
+        return self.__index_set().classes.count(class_name)
+
+    def lookup(self, cls, attribute, value):
+        """
+        Returns the stored objects of a class whose attribute equals
+        a value, like lookup(City, "state_id", state.id) for the cities
+        of a state.
+
+        The objects are found through a hash index on the attribute,
+        built from the objects of the class on the first lookup and
+        kept up to date afterwards, so each lookup only costs the
+        size of its result. The result is cached until an object
+        gets in or out of it.
+
+        Args:
+            cls (type or str): The class of the objects.
+            attribute (str): Name of the attribute, usually a foreign
+            key such as state_id, city_id, user_id or place_id.
+            value: The value looked up.
+
+        Returns:
+            dict: The matching objects by key.
+        """
+        index = self.index(cls, attribute)
+        with FileStorage.__lock.read():
+            objs = FileStorage.__objects
+            found = index.cached(value)
+            if found is None:
+                found = {}
+                for key in index.keys(value):
+                    obj = objs.get(key)
+                    if obj is not None:
+                        found[key] = obj
+                index.cache(value, found)
+            return dict(found)
+
+    def index(self, cls, attribute, kind="hash"):
+        """
+        Returns an index of an attribute of a class, built from
+        the objects of the class the first time it is used.
+
+        Args:
+            cls (type or str): The class of the objects.
+            attribute (str): Name of the attribute, or the names of
+            the latitude and longitude attributes for a geo index,
+            or of the text attributes for a text index.
+            kind (str): "hash" for an AttributeIndex, "range" for
+            a sorted RangeIndex of a numeric attribute, "geo" for
+            a GeoIndex of coordinates, "text" for a full-text
+            TextIndex, "bitmap" for a BitmapIndex of a list.
+
+        Returns:
+            The index.
+
+        Raises:
+            ValueError: If the kind of index is unknown.
+        """
+        class_name = cls if isinstance(cls, str) else cls.__name__
+        if kind == "range":
+            return self.__index(
+                (class_name, attribute, kind),
+                lambda: RangeIndex(class_name, attribute)
+            )
+        if kind == "geo":
+            return self.__index(
+                (class_name, tuple(attribute), kind),
+                lambda: GeoIndex(class_name, *attribute)
+            )
+        if kind == "text":
+            return self.__index(
+                (class_name, tuple(attribute), kind),
+                lambda: TextIndex(class_name, attribute)
+            )
+        if kind == "bitmap":
+            return self.__index(
+                (class_name, attribute, kind),
+                lambda: BitmapIndex(class_name, attribute)
+            )
+        if kind != "hash":
+            raise ValueError("Unknown index kind: {}".format(kind))
+        return self.__index(
+            (class_name, attribute),
+            lambda: AttributeIndex(class_name, attribute)
+        )
+
+    def query(self, cls):
+        """
+        Starts a query over the objects of a class, such as
+        query(Place).filter(city_id=city.id).order_by("name").
+
+        Args:
+            cls (type or str): The class of the objects.
+
         Returns:
-            dict: A dictionary containing all stored objects.
+            Query: The query matching every object of the class.
         """
-        return FileStorage.__objects
+        return Query(self, cls)
+
+    def columns(self, cls):
+        """
+        Returns the columns of the numeric attributes of a class,
+        built from its objects the first time and kept up to date
+        afterwards, such as columns(Place).mean("price_by_night").
+
+        Args:
+            cls (type or str): The class of the objects.
+
+        Returns:
+            ColumnStore: The columns.
+
+        Raises:
+            ValueError: If the class has no columns.
+        """
+        class_name = cls if isinstance(cls, str) else cls.__name__
+        if class_name not in COLUMNS:
+            raise ValueError("No columns for {}".format(class_name))
+        return self.__index(
+            (class_name, "columns"),
+            lambda: ColumnStore(class_name, *COLUMNS[class_name],
+                                reading=self.reading)
+        )
 
     def new(self, obj):
         """
@@ -70,39 +353,1033 @@ class FileStorage:
         Args:
             obj (BaseModel): The Added object into storage.
         """
+        if FileStorage.__loading.active:
+            return
         obj_class_name = obj.__class__.__name__
         key = "{}.{}".format(obj_class_name, obj.id)
-        FileStorage.__objects[key] = obj
+        with FileStorage.__lock.write():
+            FileStorage.__view = None
+            if FileStorage.__transaction is not None:
+                # dict.get, not to decode the stub of a replaced object
+                FileStorage.__transaction.new(
+                    key, dict.get(FileStorage.__objects, key))
+            FileStorage.__objects[key] = obj
+            FileStorage.__indexes.add(key, obj)
+            FileStorage.__dirty.add(obj)
+            FileStorage.__deleted.discard(key)
+
+    def delete(self, obj=None):
+        """
+        Removes an instance from the storage.
+
+        Args:
+            obj (BaseModel): The object to remove, nothing is done if None.
+        """
+        if obj is None:
+            return
+        key = "{}.{}".format(obj.__class__.__name__, obj.id)
+        with FileStorage.__lock.write():
+            if FileStorage.__objects.get(key) is not obj:
+                return
+            FileStorage.__view = None
+            if FileStorage.__transaction is not None:
+                FileStorage.__transaction.delete(key, obj)
+            del FileStorage.__objects[key]
+            FileStorage.__indexes.discard(key)
+            FileStorage.__dirty.discard(obj)
+            FileStorage.__deleted.add(key)
+            FileStorage.__fragments.pop(key, None)
+
+    def touch(self, obj, name=None):
+        """
+        Flags an instance as changed since the last save.
+
+        Args:
+            obj (BaseModel): The changed object.
+            name (str): Name of the attribute that was set, so that
+            the indexes on it are updated.
+        """
+        if FileStorage.__loading.active:
+            return
+        # A save takes a copy of the changed objects, so the change
+        # is flagged while it writes
+        with FileStorage.__dirty_lock:
+            FileStorage.__dirty.add(obj)
+        indexes = FileStorage.__indexes.by_class.get(obj.__class__.__name__)
+        if name is not None and indexes and \
+                any(name in index.attributes for index in indexes):
+            with FileStorage.__lock.write():
+                FileStorage.__indexes.touch(obj, name)
+
+    def remember(self, obj):
+        """
+        Records the attributes of a stored instance about to change,
+        so that a rollback restores them. Nothing is done outside of
+        a transaction.
+
+        Args:
+            obj (BaseModel): The object about to change.
+        """
+        transaction = FileStorage.__transaction
+        if transaction is None or \
+                FileStorage.__loading.active:
+            return
+        key = "{}.{}".format(obj.__class__.__name__,
+                             obj.__dict__.get("id"))
+        with FileStorage.__lock.write():
+            if dict.get(FileStorage.__objects, key) is obj:
+                transaction.touch(key, obj)
+
+    def begin(self):
+        """
+        Opens a transaction: saves are deferred to its commit,
+        and its changes are recorded so that a rollback undoes
+        them in memory. Opening a transaction within another one
+        joins it.
+        """
+        with FileStorage.__lock.write():
+            if FileStorage.__transaction is not None:
+                FileStorage.__transaction.depth += 1
+                return
+            FileStorage.__transaction = UndoLog(
+                FileStorage.__dirty, FileStorage.__deleted
+            )
+
+    def commit(self):
+        """
+        Closes the transaction and saves all of its changes at once.
+        The commit of a joined transaction only closes it.
+
+        Raises:
+            ValueError: If no transaction is open.
+        """
+        with FileStorage.__lock.write():
+            transaction = FileStorage.__transaction
+            if transaction is None:
+                raise ValueError("No transaction in progress")
+            transaction.depth -= 1
+            if transaction.depth:
+                return
+            FileStorage.__transaction = None
+        self.save()
+
+    def rollback(self):
+        """
+        Closes the transaction, joined ones included, and undoes
+        its creations, updates and deletions. Nothing is saved.
+
+        Raises:
+            ValueError: If no transaction is open.
+        """
+        transaction = FileStorage.__transaction
+        if transaction is None:
+            raise ValueError("No transaction in progress")
+        with FileStorage.__lock.write():
+            FileStorage.__view = None
+            FileStorage.__transaction = None
+            transaction.undo(FileStorage.__objects, FileStorage.__indexes)
+            FileStorage.__dirty.clear()
+            FileStorage.__dirty.update(transaction.dirty)
+            FileStorage.__deleted.clear()
+            FileStorage.__deleted.update(transaction.deleted)
+        changes = len(FileStorage.__dirty) + len(FileStorage.__deleted)
+        if FileStorage.__flusher is not None and changes:
+            # The write-behind saves skipped during the transaction
+            FileStorage.__flusher.request(changes)
+
+    def in_transaction(self):
+        """
+        Tells whether a transaction is open.
+        """
+        return FileStorage.__transaction is not None
+
+    @contextmanager
+    def reading(self):
+        """
+        Runs a block while no other thread changes the objects,
+        other readers going on meanwhile. The block can look
+        objects up but must not change them:
+
+            with storage.reading():
+                total = sum(place.price_by_night for place in places)
+
+        It is given the dictionary of the stored objects itself,
+        not the copy all() makes after a change, to look objects
+        up by key. It must not be kept past the block.
+        """
+        with FileStorage.__lock.read():
+            yield FileStorage.__objects
+
+    @contextmanager
+    def batch(self):
+        """
+        Runs a block in a transaction, saving once at its end,
+        or rolling it back if the block raises:
+
+            with storage.batch():
+                for place in places:
+                    place.price_by_night += 10
+                    place.save()
+        """
+        self.begin()
+        try:
+            yield self
+        except BaseException:
+            if FileStorage.__transaction is not None:
+                self.rollback()
+            raise
+        if FileStorage.__transaction is not None:
+            self.commit()
 
     def save(self):
         """
         Serializes stored instance to the JSON file.
+
+        Only the instances changed since the last save are encoded,
+        the cached JSON of the other ones is written as is.
+        In the sharded layout only the shards holding a changed object
+        are rewritten, which takes precedence over journal mode.
+        In journal mode only the objects created, updated or
+        deleted since the last save are appended to the log.
+        Within a transaction, nothing is written until its commit.
+        In write-behind mode, the save is left to a background
+        thread, which writes every change made until then at once.
+        Saves made while another one is written are grouped into
+        a single write.
+        Other processes using the same files wait for the end of
+        the write, and the changes they saved since this process
+        last read or wrote the files are merged in first, so that
+        they are not written over.
         """
-        objs = FileStorage.__objects
-        obj_dict = {}
+        if FileStorage.__transaction is not None:
+            return
+        if FileStorage.__write_behind:
+            flusher = FileStorage.__flusher
+            if flusher is None:
+                flusher = Flusher(self.__save,
+                                  FileStorage.__flush_interval,
+                                  FileStorage.__flush_changes)
+                FileStorage.__flusher = flusher
+            flusher.request(
+                len(FileStorage.__dirty) + len(FileStorage.__deleted))
+            return
+        FileStorage.__group.run(self.__save)
 
-        for obj in objs.keys():
-            obj_dict[obj] = objs[obj].to_dict()
+    def flush(self):
+        """
+        Writes at once the changes whose write-behind save is still
+        pending, as the console does before it exits. Nothing is
+        done when none is.
+        """
+        if FileStorage.__flusher is not None:
+            FileStorage.__flusher.flush_now()
 
-        with open(FileStorage.__file_path, "w", encoding="utf-8") as file:
-            json.dump(obj_dict, file)
+    def __save(self):
+        """
+        Writes the changes, holding the files against the other
+        processes. The lock is held as a reader, so other threads
+        keep reading while changes wait for the end of the write.
+        The changed instances are taken out of the set of changes
+        before the write: an instance changed meanwhile is flagged
+        again, to be written by the next save, without waiting.
+        Nothing is done if a transaction was opened since the save
+        was requested: its commit saves again.
+        """
+        if FileStorage.__transaction is not None:
+            return
+        journal = FileStorage.__journal and not FileStorage.__shards
+        file_lock = self.__lock_file()
+        with file_lock.exclusive():
+            seen = file_lock.seen
+            behind = file_lock.changed()
+            if behind and not journal:
+                # Appends to the log cannot overwrite anything,
+                # rewrites of the data files can
+                with FileStorage.__lock.write(), FileStorage.__mutex:
+                    self.__merge()
+                behind = False
+            with FileStorage.__lock.read(), FileStorage.__mutex:
+                if FileStorage.__transaction is not None:
+                    return
+                with FileStorage.__dirty_lock:
+                    dirty = set(FileStorage.__dirty)
+                    FileStorage.__dirty.clear()
+                try:
+                    if journal:
+                        self.__append_changes(dirty)
+                    else:
+                        self.__write_changes(dirty)
+                except BaseException:
+                    with FileStorage.__dirty_lock:
+                        FileStorage.__dirty.update(dirty)
+                    raise
+                if journal:
+                    self.__compaction().maybe_compact(
+                        FileStorage.__compact_bytes,
+                        FileStorage.__compact_records
+                    )
+            file_lock.bump()
+            if behind:
+                # The appends of the other process are still to load
+                file_lock.seen = seen
+
+    def __write_changes(self, dirty):
+        """
+        Rewrites the data files, or the shards holding a change.
+
+        Args:
+            dirty (set): The instances changed since the last save.
+        """
+        # A fold holds the files as this save does: it is either
+        # done or finds its sealed segment removed below
+        if FileStorage.__shards:
+            self.__save_shards(dirty)
+        elif FileStorage.__compression.name == "none" and \
+                (FileStorage.__lazy or
+                 isinstance(FileStorage.__objects, LazyObjects)):
+            self.__save_lazy(dirty)
+        else:
+            self.__write(self.__data_path(),
+                         FileStorage.__objects.items(), dirty)
+
+        # The snapshot now holds everything the log had
+        self.__log().remove()
+        FileStorage.__deleted.clear()
 
     def reload(self):
         """
-        Deserializes the JSON file to the stored instance.
+        Deserializes the JSON file to the stored instance,
+        then replays the change log on top of it.
         """
-        if os.path.isfile(FileStorage.__file_path):
-            with open(FileStorage.__file_path, "r", encoding="utf-8") as file:
-                try:
-                    obj_dict = json.load(file)
+        compactor = self.__compaction()
+        # The snapshot and the sealed segment must come from
+        # the same side of a compaction swap
+        with self.__reading_files(), FileStorage.__lock.write(), \
+                compactor.lock:
+            FileStorage.__view = None
+            if FileStorage.__shards and os.path.isdir(self.__shard_dir()):
+                self.__reload_shards()
+            elif FileStorage.__lazy and not FileStorage.__shards and \
+                    FileStorage.__compression.name == "none":
+                self.__reload_lazy()
+            else:
+                self.__reload_snapshot()
+            self.__replay(self.__log())
 
-                    for key, value in obj_dict.items():
-                        class_name, obj_id = key.split('.')
+        if FileStorage.__journal:
+            compactor.maybe_compact(
+                FileStorage.__compact_bytes, FileStorage.__compact_records
+            )
 
-                        cls = eval(class_name)
+    def changed(self):
+        """
+        Tells whether another process saved to the files since this
+        one last read or wrote them. Only the generation number of
+        the lock file is read.
+        """
+        file_lock = self.__lock_file(create=False)
+        return file_lock is not None and file_lock.changed()
+
+    def refresh(self):
+        """
+        Loads the changes other processes saved since this one last
+        read or wrote the files, instead of reloading everything:
+        only the records that differ from the stored instances are
+        decoded, and the instances they deleted are removed. The
+        instances changed or deleted here since the last save are
+        kept as they are.
 
-                        instance = cls(**value)
+        Returns:
+            int: The number of instances created, updated or removed.
+        """
+        if not self.changed():
+            return 0
+        with self.__reading_files(), FileStorage.__lock.write(), \
+                FileStorage.__mutex, self.__compaction().lock:
+            return self.__merge()
+
+    def close(self):
+        """
+        Closes the lock file, which is opened again by the next
+        save or reload, and the data file of lazy mode. The objects
+        not decoded yet are decoded first, since they are read from
+        that file; those that cannot be are dropped.
+        """
+        file_lock = FileStorage.__file_lock
+        if file_lock is not None:
+            FileStorage.__file_lock = None
+            file_lock.close()
+        if FileStorage.__snapshot is None:
+            return
+        objs = FileStorage.__objects
+        if isinstance(objs, LazyObjects):
+            for key in list(dict.keys(objs)):
+                if type(dict.get(objs, key)) is Stub:
+                    objs.get(key)
+        with FileStorage.__lock.write():
+            FileStorage.__snapshot.close()
+            FileStorage.__snapshot = None
+
+    def compact(self):
+        """
+        Folds the whole change log into the JSON file and waits
+        for the fold to be done.
+        """
+        compactor = self.__compaction()
+        compactor.wait()
+        compactor.maybe_compact(0, 0)
+        compactor.wait()
+
+    def __reload_snapshot(self):
+        """
+        Loads the instances of the data file one record at a time,
+        decompressing it on the fly. Records that cannot be decoded
+        or instantiated are skipped, as is the end of a truncated
+        compressed file.
+        """
+        path = self.__data_path()
+        if not os.path.isfile(path):
+            return
+        with FileStorage.__compression.open(path, "rb") as file:
+            try:
+                for key, value in FileStorage.__codec.iter_records(file):
+                    try:
+                        self.__load(key, value)
+                    except Exception:
+                        pass
+            except DECOMPRESSION_ERRORS:
+                pass
+
+    def __data_path(self):
+        """
+        Returns the path of the data file, whose extension
+        depends on the codec and the compression.
+        """
+        codec = FileStorage.__codec
+        path = FileStorage.__file_path
+        if codec.name != "json":
+            path = os.path.splitext(path)[0] + codec.extension
+        return path + FileStorage.__compression.extension
+
+    def __reload_lazy(self):
+        """
+        Indexes where each object lies in the JSON file without
+        decoding it. The offsets come from the index written by the
+        last save, or from a scan of the file if it is out of date.
+        """
+        if not os.path.isfile(self.__data_path()):
+            return
+        self.__open_snapshot()
+        file = FileStorage.__snapshot.file
+        offsets = read_index(self.__index_path(), file)
+        if offsets is None:
+            offsets = FileStorage.__codec.scan(file)
+
+        objs = FileStorage.__objects
+        if not isinstance(objs, LazyObjects):
+            objs = LazyObjects(self.__materialize, objs)
+            FileStorage.__objects = objs
+        for key, (start, end) in offsets.items():
+            dict.__setitem__(objs, key, Stub(start, end))
+            FileStorage.__indexes.add(key)
+            FileStorage.__fragments.pop(key, None)
+
+    def __open_snapshot(self):
+        """
+        Opens, and maps if it is big enough, the JSON file the stubs
+        point into. The stubs stay valid even if the file is replaced
+        on disk.
+        """
+        if FileStorage.__snapshot is not None:
+            FileStorage.__snapshot.close()
+        FileStorage.__snapshot = Snapshot(
+            self.__data_path(), FileStorage.__mmap_bytes
+        )
+
+    def __index_path(self):
+        """
+        Returns the path of the offset index of the data file.
+        """
+        return self.__data_path() + ".idx"
+
+    def __read_member(self, stub):
+        """
+        Reads the encoded record of a stub from the data file.
+
+        Args:
+            stub (Stub): Byte range of the record.
+
+        Returns:
+            bytes: The encoded record.
+        """
+        return FileStorage.__snapshot.read(stub.start, stub.end)
 
-                        FileStorage.__objects[key] = instance
+    def __materialize(self, key, stub):
+        """
+        Decodes the object of a stub and stores it in its place.
+
+        Only the value of the key changes, so it is done as a
+        reader, one thread at a time. A stub decoded by another
+        thread meanwhile is not decoded again.
+
+        Args:
+            key (str): Storage key of the object.
+            stub (Stub): Byte range of the object in the data file.
+
+        Returns:
+            BaseModel: The decoded instance.
+
+        Raises:
+            KeyError: If the object cannot be decoded, in which
+            case it is dropped from the storage.
+        """
+        with FileStorage.__lock.read(), FileStorage.__mutex:
+            current = dict.get(FileStorage.__objects, key)
+            if current is None:
+                raise KeyError(key)
+            if type(current) is not Stub:
+                return current
+            member = self.__read_member(current)
+            try:
+                value = FileStorage.__codec.decode(member)[1]
+                instance = self.__load(key, value)
+            except Exception:
+                dict.pop(FileStorage.__objects, key, None)
+                FileStorage.__indexes.discard(key)
+                raise KeyError(key)
+            # The record read from the file is the cached encoding
+            self.__fragment_cache()[key] = (instance, member)
+            return instance
+
+    def __save_lazy(self, dirty):
+        """
+        Writes the data file in lazy mode, where some objects
+        can still be stubs.
+
+        The stubs are copied byte for byte from the current file,
+        so the new file is written aside and swapped in. The stubs
+        and the offset index are then updated to the new file.
+
+        Args:
+            dirty (set): The instances changed since the last save.
+        """
+        path = self.__data_path()
+        objs = FileStorage.__objects
+        offsets = {}
+        self.__write(path, dict.items(objs), dirty, offsets, True)
+
+        self.__open_snapshot()
+        for key, (start, end) in offsets.items():
+            value = dict.get(objs, key)
+            if type(value) is Stub:
+                value.start, value.end = start, end
+        write_index(
+            self.__index_path(), FileStorage.__snapshot.file, offsets
+        )
+
+    def __reload_shards(self):
+        """
+        Loads the instances of every shard file, decoding the
+        shards in parallel.
+        """
+        shard_dir = self.__shard_dir()
+        codec = FileStorage.__codec
+        compression = FileStorage.__compression
+        paths = [
+            os.path.join(shard_dir, name)
+            for name in sorted(os.listdir(shard_dir))
+            if name.endswith(codec.extension + compression.extension)
+        ]
+        for path, obj_dict in read_shards(paths, codec.name,
+                                          compression.name):
+            if obj_dict is None:
+                continue
+            for key, value in obj_dict.items():
+                try:
+                    self.__load(key, value)
                 except Exception:
                     pass
+
+    def __shard_dir(self):
+        """
+        Returns the directory holding the shard files.
+        """
+        return FileStorage.__file_path + ".d"
+
+    def __save_shards(self, dirty):
+        """
+        Rewrites the shard files holding a changed or deleted object.
+        When there are no shard files yet, all of them are written.
+
+        Args:
+            dirty (set): The instances changed since the last save.
+        """
+        shard_dir = self.__shard_dir()
+        partitions = FileStorage.__shards
+        extension = FileStorage.__codec.extension + \
+            FileStorage.__compression.extension
+        changed = None
+        if os.path.isdir(shard_dir):
+            changed = {shard_name(key, partitions, extension)
+                       for key in FileStorage.__deleted}
+            for obj in dirty:
+                key = "{}.{}".format(obj.__class__.__name__, obj.id)
+                changed.add(shard_name(key, partitions, extension))
+            if not changed:
+                return
+        else:
+            os.makedirs(shard_dir)
+
+        members = {name: [] for name in changed or ()}
+        for key, obj in FileStorage.__objects.items():
+            name = shard_name(key, partitions, extension)
+            if changed is None:
+                members.setdefault(name, [])
+            if name in members:
+                members[name].append((key, obj))
+
+        for name, items in members.items():
+            path = os.path.join(shard_dir, name)
+            if items:
+                self.__write(path, items, dirty)
+            else:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+    def __write(self, path, items, dirty, offsets=None, atomic=False):
+        """
+        Writes objects to a data file one at a time, encoding only
+        the ones changed since they were last written.
+
+        Unless the durability level is "none", the file is written
+        aside and swapped in once complete.
+
+        Args:
+            path (str): Path to the data file.
+            items (iterable): (key, object or Stub) pairs to write.
+            dirty (set): The instances changed since the last save,
+            encoded again.
+            offsets (dict): Filled with the [start, end] byte range
+            of each record when given.
+            atomic (bool): Writes the file aside whatever the level.
+        """
+        codec = FileStorage.__codec
+        fragments = self.__fragment_cache()
+        level = FileStorage.__durability
+        atomic = atomic or level != "none"
+        tmp_path = path + ".tmp" if atomic else path
+
+        with FileStorage.__compression.open(tmp_path, "wb") as file, \
+                codec.writer(file) as writer:
+            for key, obj in items:
+                if type(obj) is Stub:
+                    member = self.__read_member(obj)
+                else:
+                    cached = fragments.get(key)
+                    if cached is None or cached[0] is not obj or \
+                            obj in dirty or obj in FileStorage.__dirty:
+                        cached = (obj, self.__encode(key, obj))
+                        fragments[key] = cached
+                    member = cached[1]
+                start = writer.write(member)
+                if offsets is not None:
+                    offsets[key] = [start, start + len(member)]
+        if atomic:
+            replace_file(tmp_path, path, level)
+
+    def __replay(self, log):
+        """
+        Applies the change records of the log to the stored instances.
+
+        Args:
+            log (Journal): The change log to replay.
+        """
+        for op, key, value in log.replay():
+            try:
+                if op == "del":
+                    obj = FileStorage.__objects.pop(key, None)
+                    FileStorage.__indexes.discard(key)
+                    FileStorage.__dirty.discard(obj)
+                    FileStorage.__fragments.pop(key, None)
+                else:
+                    self.__load(key, value)
+            except Exception:
+                pass
+
+    def __log(self):
+        """
+        Returns the change log that goes with the data file,
+        along with its compactor.
+        """
+        compression = FileStorage.__compression
+        path = FileStorage.__file_path + ".log" + compression.extension
+        log = FileStorage.__journal_log
+        compactor = FileStorage.__compactor
+        if log is None or log.path != path or \
+                compactor.codec is not FileStorage.__codec or \
+                compactor.compression is not compression:
+            log = Journal(path, compression)
+            FileStorage.__journal_log = log
+            FileStorage.__compactor = Compactor(
+                self.__data_path(), log, FileStorage.__codec, compression,
+                self.__hold_files
+            )
+        return log
+
+    def __compaction(self):
+        """
+        Returns the compactor of the change log.
+        """
+        self.__log()
+        return FileStorage.__compactor
+
+    def __lock_file(self, create=True):
+        """
+        Returns the lock shared with the other processes, kept in
+        a .lock file next to the data files.
+
+        Args:
+            create (bool): Creates the lock file if missing. The
+            first save creates it, so that nothing is left behind
+            by the processes that only read.
+
+        Returns:
+            FileLock: The lock, or None if there is no lock file
+            and create is False.
+        """
+        path = FileStorage.__file_path + ".lock"
+        file_lock = FileStorage.__file_lock
+        if file_lock is None or file_lock.path != path:
+            self.close()
+            if not create and not os.path.isfile(path):
+                return None
+            file_lock = FileLock(path)
+            # Until the files are read, any save made by
+            # another process is one still to load
+            file_lock.seen = 0
+            FileStorage.__file_lock = file_lock
+        return file_lock
+
+    def __hold_files(self):
+        """
+        Returns the context manager holding the data files against
+        the other processes while the compactor rewrites them.
+        """
+        return self.__lock_file().exclusive()
+
+    @contextmanager
+    def __reading_files(self):
+        """
+        Holds the lock file shared while the data files are read,
+        and marks its generation as seen. Without a lock file, no
+        process saved the files since they have been locked, and
+        none is created.
+        """
+        file_lock = self.__lock_file(create=False)
+        if file_lock is None:
+            yield
+            return
+        with file_lock.shared():
+            file_lock.seen = file_lock.generation()
+            yield
+
+    def __saved_paths(self):
+        """
+        Returns the paths of the data files as last saved, the
+        shard files in the sharded layout.
+        """
+        codec = FileStorage.__codec
+        compression = FileStorage.__compression
+        shard_dir = self.__shard_dir()
+        if FileStorage.__shards and os.path.isdir(shard_dir):
+            return [
+                os.path.join(shard_dir, name)
+                for name in sorted(os.listdir(shard_dir))
+                if name.endswith(codec.extension + compression.extension)
+            ]
+        return [self.__data_path()]
+
+    def __iter_saved(self, paths):
+        """
+        Yields the records of data files one at a time, decompressing
+        them on the fly, so that no file is held whole in memory.
+
+        Args:
+            paths (list): Paths to the data files.
+
+        Yields:
+            tuple: (key, value) of each record.
+        """
+        for path in paths:
+            if not os.path.isfile(path):
+                continue
+            with FileStorage.__compression.open(path, "rb") as file:
+                try:
+                    yield from FileStorage.__codec.iter_records(file)
+                except DECOMPRESSION_ERRORS:
+                    pass
+
+    def __merge(self):
+        """
+        Applies the changes saved by other processes to the stored
+        instances: the records that differ from the clean instances
+        are decoded, new stubs point into the data file in lazy
+        mode, and the clean instances no longer saved are removed.
+        The instances changed or deleted since the last save are
+        left alone, so the next save writes them over.
+
+        The data files are read one record at a time. Only the keys
+        seen are kept, and the records of the change log, which
+        override the ones of the data files.
+
+        Returns:
+            int: The number of instances created, updated or removed.
+        """
+        objs = FileStorage.__objects
+        with FileStorage.__dirty_lock:
+            dirty = list(FileStorage.__dirty)
+        local = {"{}.{}".format(obj.__class__.__name__, obj.id)
+                 for obj in dirty}
+        local.update(FileStorage.__deleted)
+        logged = {}
+        for op, key, value in self.__log().replay():
+            logged[key] = None if op == "del" else value
+        FileStorage.__view = None
+        changes = 0
+
+        paths = self.__saved_paths()
+        snapshot = None
+        offsets = {}
+        if len(paths) == 1 and os.path.isfile(paths[0]) and \
+                FileStorage.__compression.name == "none" and \
+                isinstance(objs, LazyObjects):
+            # The stubs are pointed into the new data file
+            snapshot = Snapshot(paths[0], FileStorage.__mmap_bytes)
+            offsets = FileStorage.__codec.scan(snapshot.file)
+            records = ((key, None, snapshot.read(*span), span)
+                       for key, span in offsets.items())
+        else:
+            records = ((key, value, None, None)
+                       for key, value in self.__iter_saved(paths))
+
+        seen = set()
+        for key, value, member, span in records:
+            if key in logged:
+                continue
+            seen.add(key)
+            if key not in local:
+                changes += self.__merge_record(key, value, member, span)
+        for key, value in logged.items():
+            if value is None:
+                continue
+            seen.add(key)
+            if key not in local:
+                changes += self.__merge_record(key, value, None, None)
+
+        gone = [key for key in dict.keys(objs)
+                if key not in seen and key not in local]
+        for key in gone:
+            dict.pop(objs, key)
+            FileStorage.__indexes.discard(key)
+            FileStorage.__fragments.pop(key, None)
+        changes += len(gone)
+
+        if snapshot is not None:
+            if FileStorage.__snapshot is not None:
+                FileStorage.__snapshot.close()
+            FileStorage.__snapshot = snapshot
+            for key, (start, end) in offsets.items():
+                value = dict.get(objs, key)
+                if type(value) is Stub:
+                    value.start, value.end = start, end
+        return changes
+
+    def __merge_record(self, key, value, member, span):
+        """
+        Applies one saved record to the stored instance of its key,
+        which is left alone when it encodes to the same record.
+
+        Args:
+            key (str): Storage key of the record.
+            value (dict): Decoded record, or None if not decoded.
+            member (bytes): Encoded record, or None if not encoded.
+            span (tuple): Byte range of the record in the new data
+            file when a stub can point into it, or None.
+
+        Returns:
+            int: 1 if the instance was created or updated, else 0.
+        """
+        objs = FileStorage.__objects
+        fragments = self.__fragment_cache()
+        if member is None:
+            member = FileStorage.__codec.encode(key, value)
+        current = dict.get(objs, key)
+        if type(current) is Stub:
+            old = self.__read_member(current)
+        elif current is not None:
+            cached = fragments.get(key)
+            if cached is None or cached[0] is not current:
+                cached = (current, self.__encode(key, current))
+                fragments[key] = cached
+            old = cached[1]
+        else:
+            old = None
+        changed = int(old != member)
+        if not changed and (type(current) is not Stub or span is not None):
+            return 0
+        if span is not None and (current is None or type(current) is Stub):
+            # Pointed into the new data file once it is read
+            if current is None:
+                dict.__setitem__(objs, key, Stub(*span))
+            FileStorage.__indexes.add(key)
+            fragments.pop(key, None)
+            return changed
+        try:
+            if value is None:
+                value = FileStorage.__codec.decode(member)[1]
+            instance = self.__load(key, value)
+        except Exception:
+            return 0
+        fragments[key] = (instance, member)
+        return changed
+
+    def __load(self, key, value):
+        """
+        Builds an instance from its serialized form and stores it
+        as a clean (already persisted) object.
+
+        Args:
+            key (str): Storage key of the object.
+            value (dict): Dictionary made by to_dict().
+
+        Returns:
+            BaseModel: The new instance.
+        """
+        class_name, obj_id = key.split('.')
+
+        cls = eval(class_name)
+
+        # The constructor must not add the instance: it would take
+        # the lock as a writer, which a decoding reader cannot
+        loading = FileStorage.__loading
+        loading.active = True
+        try:
+            instance = cls(**value)
+        finally:
+            loading.active = False
+
+        FileStorage.__objects[key] = instance
+        FileStorage.__indexes.add(key, instance)
+        FileStorage.__deleted.discard(key)
+        FileStorage.__fragments.pop(key, None)
+        return instance
+
+    def __index_set(self):
+        """
+        Returns the indexes, with the class index rebuilt and the
+        attribute indexes dropped if the dictionary of objects was
+        replaced or changed behind the storage's back.
+        """
+        indexes = FileStorage.__indexes
+        if not indexes.classes.valid(FileStorage.__objects):
+            with FileStorage.__lock.read(), FileStorage.__mutex:
+                indexes.check(FileStorage.__objects)
+        return indexes
+
+    def __index(self, name, factory):
+        """
+        Returns an attribute index, building it the first time.
+        Readers can go on meanwhile, since the build only decodes
+        objects and adds the index.
+
+        Args:
+            name (tuple): Identifies the index.
+            factory (callable): Returns a new empty index.
+        """
+        indexes = self.__index_set()
+        index = indexes.indexes.get(name)
+        if index is None:
+            with FileStorage.__lock.read(), FileStorage.__mutex:
+                index = indexes.get(name, factory, FileStorage.__objects)
+        return index
+
+    def __objects_view(self):
+        """
+        Returns the copy of the objects shared by the readers,
+        copying them again if they changed since. Stubs are copied
+        as they are, and decoded when the copy is looked up.
+        """
+        view = FileStorage.__view
+        if view is not None and FileStorage.__view_of is \
+                FileStorage.__objects and \
+                len(view) == len(FileStorage.__objects):
+            return view
+        with FileStorage.__lock.read():
+            objs = FileStorage.__objects
+            if isinstance(objs, LazyObjects):
+                view = LazyObjects(None, dict.items(objs))
+                view.loader = self.__view_loader(view)
+            else:
+                view = dict.copy(objs)
+            FileStorage.__view = view
+            FileStorage.__view_of = objs
+        return view
+
+    def __view_loader(self, view):
+        """
+        Returns the loader of a copy of the objects, which decodes
+        a stub like the storage does and keeps the instance.
+        """
+        def loader(key, stub):
+            instance = self.__materialize(key, stub)
+            dict.__setitem__(view, key, instance)
+            return instance
+        return loader
+
+    @staticmethod
+    def __fragment_cache():
+        """
+        Returns the cache of encoded records, emptied if they
+        were encoded with another codec.
+        """
+        if FileStorage.__fragments_codec is not FileStorage.__codec:
+            FileStorage.__fragments.clear()
+            FileStorage.__fragments_codec = FileStorage.__codec
+        return FileStorage.__fragments
+
+    @staticmethod
+    def __encode(key, obj):
+        """
+        Encodes the record of an object in the data file.
+
+        Args:
+            key (str): Storage key of the object.
+            obj (BaseModel): The object to encode.
+
+        Returns:
+            bytes: The encoded record.
+        """
+        return FileStorage.__codec.encode(key, obj.to_dict())
+
+    def __append_changes(self, dirty):
+        """
+        Appends the pending creations, updates and deletions to the log.
+
+        Args:
+            dirty (set): The instances changed since the last save.
+        """
+        puts = {}
+        objs = FileStorage.__objects
+        for obj in dirty:
+            key = "{}.{}".format(obj.__class__.__name__, obj.id)
+            # An instance changed after its deletion stays deleted
+            if dict.get(objs, key) is not obj:
+                continue
+            puts[key] = obj.to_dict()
+            FileStorage.__fragments.pop(key, None)
+
+        self.__log().append(puts, FileStorage.__deleted,
+                            FileStorage.__durability == "fsync")
+        FileStorage.__deleted.clear()
@@ -0,0 +1,135 @@
+#!/usr/bin/python3
+"""
+Module: filelock.py
+
+Lock shared by the processes using the same storage files.
+
+Processes running the console on the same file.json would
+otherwise each write the objects they hold, the last save
+dropping the changes of the others. The lock file next to
+the data file is locked with flock(): shared while a process
+reads the data files, exclusive while it writes them.
+
+The lock file also holds a generation number, bumped by every
+save. A process compares it with the last one it read or wrote
+to tell, without reading the data files, whether another
+process saved since.
+
+Where fcntl is missing, as on Windows, nothing is locked but
+the generation number still tells the changes apart.
+
+Classes:
+- FileLock: The lock and generation number of a data file.
+"""
+
+import os
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+class FileLock:
+    """
+    Advisory lock of the storage files, held by one process
+    at a time for writing, by many for reading.
+
+    The threads of a process share the lock file: they take
+    the lock one at a time, and a thread holding it can take
+    it again, either way, without waiting.
+    """
+
+    def __init__(self, path):
+        """
+        Opens the lock file, created if missing. The generation
+        read from it is taken as already seen.
+
+        Args:
+            path (str): Path of the lock file.
+        """
+        self.path = path
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        self.mutex = threading.RLock()
+        self.depth = 0
+        self.seen = self.generation()
+
+    @contextmanager
+    def shared(self):
+        """
+        Holds the lock while the data files are read. Other
+        processes can read them meanwhile.
+        """
+        with self.__hold(fcntl and fcntl.LOCK_SH):
+            yield self
+
+    @contextmanager
+    def exclusive(self):
+        """
+        Holds the lock while the data files are written. Other
+        processes neither read nor write them meanwhile.
+        """
+        with self.__hold(fcntl and fcntl.LOCK_EX):
+            yield self
+
+    def generation(self):
+        """
+        Returns the number of saves done to the data files,
+        0 for a new lock file.
+        """
+        os.lseek(self.fd, 0, os.SEEK_SET)
+        data = os.read(self.fd, 32).strip()
+        try:
+            return int(data) if data else 0
+        except ValueError:
+            return 0
+
+    def bump(self):
+        """
+        Counts a save in the lock file, which must be held
+        exclusively, and marks the new generation as seen.
+
+        Returns:
+            int: The new generation.
+        """
+        generation = self.generation() + 1
+        # The number only grows, so no shorter one is left behind
+        os.lseek(self.fd, 0, os.SEEK_SET)
+        os.write(self.fd, str(generation).encode())
+        self.seen = generation
+        return generation
+
+    def changed(self):
+        """
+        Tells whether another process saved since the generation
+        was last seen.
+        """
+        return self.generation() != self.seen
+
+    def close(self):
+        """
+        Closes the lock file, releasing the lock.
+        """
+        os.close(self.fd)
+
+    @contextmanager
+    def __hold(self, operation):
+        """
+        Holds the lock, calling flock() on the first hold of the
+        calling thread only.
+
+        Args:
+            operation (int): LOCK_SH or LOCK_EX, None without fcntl.
+        """
+        with self.mutex:
+            if not self.depth and operation:
+                fcntl.flock(self.fd, operation)
+            self.depth += 1
+            try:
+                yield
+            finally:
+                self.depth -= 1
+                if not self.depth and operation:
+                    fcntl.flock(self.fd, fcntl.LOCK_UN)
@@ -0,0 +1,160 @@
+#!/usr/bin/python3
+"""
+Module: flusher.py
+
+Write-behind saves of the storage.
+
+In write-behind mode, save() only tells the flusher how many
+changes are pending. A background thread writes them at most
+every interval, counted from the first pending change, or as
+soon as enough changes are pending, so a burst of updates is
+written once. At most one interval of changes is lost if the
+process is killed; a clean exit writes them all.
+
+Classes:
+- Flusher: Runs the deferred saves in a background thread.
+"""
+
+import atexit
+import threading
+import time
+
+
+class Flusher:
+    """
+    Calls a flush function in a background thread, some time
+    after changes are reported.
+    """
+
+    def __init__(self, flush, interval=1.0, max_changes=1000):
+        """
+        Initializes the flusher, whose thread starts with the
+        first reported change. The pending changes are flushed
+        when the interpreter exits.
+
+        Args:
+            flush (callable): Writes the pending changes.
+            interval (float): Longest time, in seconds, a change
+            waits to be flushed.
+            max_changes (int): Number of pending changes that
+            triggers a flush without waiting.
+        """
+        self.flush = flush
+        self.interval = interval
+        self.max_changes = max_changes
+        self.pending = 0
+        self.since = None
+        self.flushes = 0
+        self.error = None
+        self.closed = False
+        self.condition = threading.Condition()
+        self.__thread = None
+        atexit.register(self.close)
+
+    def request(self, changes):
+        """
+        Reports the number of changes waiting to be flushed.
+
+        Args:
+            changes (int): Number of pending changes.
+        """
+        with self.condition:
+            if self.closed:
+                self.pending = 0
+                self.flush()
+                return
+            self.pending = max(changes, 1)
+            if self.since is None:
+                self.since = time.monotonic()
+            if self.__thread is None or not self.__thread.is_alive():
+                self.__thread = threading.Thread(
+                    target=self.__run, name="hbnb-flusher", daemon=True
+                )
+                self.__thread.start()
+            self.condition.notify()
+
+    def flush_now(self):
+        """
+        Flushes the pending changes in the calling thread, if any.
+
+        Raises:
+            Exception: What the flush function raised, in which case
+            the changes are still pending.
+        """
+        with self.condition:
+            if not self.pending:
+                return
+            self.pending = 0
+            self.since = None
+        self.__flush(True)
+
+    def close(self):
+        """
+        Stops the thread and flushes the pending changes. Later
+        reports flush at once, in the calling thread.
+
+        Raises:
+            Exception: What the flush function raised, in which case
+            the changes are still pending. At exit, the interpreter
+            prints it, since the changes are then lost.
+        """
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        thread = self.__thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+        self.flush_now()
+
+    def __run(self):
+        """
+        Waits for pending changes and flushes them when they are
+        old enough or numerous enough.
+        """
+        condition = self.condition
+        with condition:
+            while True:
+                while not self.pending and not self.closed:
+                    condition.wait()
+                if self.closed:
+                    return
+                while self.pending and not self.closed and \
+                        self.pending < self.max_changes:
+                    left = self.since + self.interval - time.monotonic()
+                    if left <= 0:
+                        break
+                    condition.wait(left)
+                if self.closed:
+                    return
+                if not self.pending:
+                    continue
+                self.pending = 0
+                self.since = None
+                condition.release()
+                try:
+                    self.__flush()
+                finally:
+                    condition.acquire()
+
+    def __flush(self, raise_error=False):
+        """
+        Calls the flush function. If it fails, the changes are
+        reported again so that the next flush retries them.
+
+        Args:
+            raise_error (bool): Whether to raise the error of the
+            flush function instead of only keeping it in error.
+        """
+        try:
+            self.flush()
+        except Exception as error:
+            self.error = error
+            with self.condition:
+                self.pending = max(self.pending, 1)
+                if self.since is None:
+                    self.since = time.monotonic()
+            if raise_error:
+                raise
+            return
+        self.flushes += 1
+        self.error = None
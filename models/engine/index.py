@@ -0,0 +1,1030 @@
+#!/usr/bin/python3
+"""
+Module: index.py
+
+Secondary indexes kept by the storage engines next to
+their dictionary of objects.
+
+The indexes hold storage keys only, never the objects, so
+they can be maintained from the keys of not yet decoded
+objects in lazy mode.
+
+Classes:
+- ClassIndex: Keys of the stored objects grouped by class.
+- AttributeIndex: Hash index of one attribute of one class.
+- RangeIndex: Sorted index of one numeric attribute of one class.
+- GeoIndex: Grid index of the coordinates of the objects of one class.
+- TextIndex: Inverted index of the words of text attributes of one class.
+- BitmapIndex: Bitmaps of the items of one list attribute of one class.
+- IndexSet: The class index and the attribute indexes of a storage.
+
+Functions:
+- distance_km(lat1, lon1, lat2, lon2): Great-circle distance.
+- valid_point(latitude, longitude): Tells whether coordinates are valid.
+- in_longitudes(longitude, west, east): Tells whether a longitude is
+between two others.
+- tokenize(text): Returns the words of a text, as indexed.
+"""
+
+import math
+import re
+import unicodedata
+from bisect import bisect_left, bisect_right
+
+EARTH_RADIUS_KM = 6371.0088
+# Half the circumference of the earth, the largest possible distance
+_MAX_DISTANCE_KM = math.pi * EARTH_RADIUS_KM
+_WORD = re.compile(r"\w+")
+
+
+class ClassIndex:
+    """
+    Keys of the stored objects grouped by class name, in the
+    order they were added, so that the objects of one class
+    are listed and counted without looking at the others.
+
+    The index remembers the dictionary it was built for: when
+    the storage dictionary is replaced, or its size no longer
+    matches the index, valid() tells the index must be rebuilt.
+    """
+
+    def __init__(self):
+        """
+        Initializes an empty index.
+        """
+        self.buckets = {}
+        self.size = 0
+        self.objects = None
+
+    def add(self, key):
+        """
+        Adds a storage key, nothing is done if it is already there.
+
+        Args:
+            key (str): Storage key "<class name>.<id>".
+        """
+        bucket = self.buckets.setdefault(key.partition('.')[0], {})
+        if key not in bucket:
+            bucket[key] = None
+            self.size += 1
+
+    def discard(self, key):
+        """
+        Removes a storage key, nothing is done if it is missing.
+
+        Args:
+            key (str): Storage key "<class name>.<id>".
+        """
+        bucket = self.buckets.get(key.partition('.')[0])
+        if bucket is not None and key in bucket:
+            del bucket[key]
+            self.size -= 1
+
+    def keys(self, class_name):
+        """
+        Returns the keys of the objects of a class.
+
+        Args:
+            class_name (str): Name of the class.
+
+        Returns:
+            list: The storage keys, in the order they were added.
+        """
+        return list(self.buckets.get(class_name, ()))
+
+    def count(self, class_name):
+        """
+        Returns the number of objects of a class.
+
+        Args:
+            class_name (str): Name of the class.
+        """
+        return len(self.buckets.get(class_name, ()))
+
+    def valid(self, objects):
+        """
+        Tells whether the index still describes a dictionary.
+
+        Args:
+            objects (dict): The dictionary of stored objects.
+        """
+        return self.objects is objects and self.size == len(objects)
+
+    def rebuild(self, objects):
+        """
+        Indexes every key of a dictionary from scratch.
+
+        Args:
+            objects (dict): The dictionary of stored objects.
+        """
+        self.buckets = {}
+        self.size = 0
+        self.objects = objects
+        for key in dict.keys(objects):
+            self.add(key)
+
+
+class AttributeIndex:
+    """
+    Hash index of the objects of one class by the value of one
+    of their attributes, such as a foreign key.
+
+    Values that cannot be hashed, like lists, are not indexed.
+
+    The objects found for a value can be cached with cache(),
+    until a key is added to, moved out of or removed from the
+    bucket of that value.
+    """
+
+    def __init__(self, class_name, attribute):
+        """
+        Initializes an empty index.
+
+        Args:
+            class_name (str): Name of the indexed class.
+            attribute (str): Name of the indexed attribute.
+        """
+        self.class_name = class_name
+        self.attribute = attribute
+        self.attributes = (attribute,)
+        self.buckets = {}
+        self.values = {}
+        self.results = {}
+
+    def add(self, key, obj):
+        """
+        Indexes the current value of an object, moving its key
+        out of the bucket of its previous value.
+
+        Args:
+            key (str): Storage key of the object.
+            obj (BaseModel): The object.
+        """
+        value = getattr(obj, self.attribute, None)
+        try:
+            hash(value)
+        except TypeError:
+            value = None
+        self.results.pop(value, None)
+        if key in self.values:
+            if self.values[key] == value:
+                return
+            self.discard(key)
+        if value is None:
+            return
+        self.buckets.setdefault(value, {})[key] = None
+        self.values[key] = value
+
+    def discard(self, key):
+        """
+        Removes a key, nothing is done if it is missing.
+
+        Args:
+            key (str): Storage key of the object.
+        """
+        if key not in self.values:
+            return
+        value = self.values.pop(key)
+        self.results.pop(value, None)
+        bucket = self.buckets[value]
+        del bucket[key]
+        if not bucket:
+            del self.buckets[value]
+
+    def keys(self, value):
+        """
+        Returns the keys of the objects whose attribute equals a value.
+
+        Args:
+            value: The value looked up.
+
+        Returns:
+            list: The storage keys, in the order they were indexed.
+        """
+        try:
+            return list(self.buckets.get(value, ()))
+        except TypeError:
+            return []
+
+    def count(self, value):
+        """
+        Returns the number of objects whose attribute equals a value.
+
+        Args:
+            value: The value looked up.
+        """
+        try:
+            return len(self.buckets.get(value, ()))
+        except TypeError:
+            return 0
+
+    def cached(self, value):
+        """
+        Returns the objects cached for a value, or None.
+
+        Args:
+            value: The value looked up.
+        """
+        try:
+            return self.results.get(value)
+        except TypeError:
+            return None
+
+    def cache(self, value, found):
+        """
+        Caches the objects found for a value.
+
+        Args:
+            value: The value looked up.
+            found (dict): The objects by key.
+        """
+        try:
+            self.results[value] = found
+        except TypeError:
+            pass
+
+
+class RangeIndex:
+    """
+    Sorted index of the objects of one class by the value of one
+    numeric attribute, for range scans and ordered iteration in
+    O(log N + k) through bisect.
+
+    The (value, key) entries are kept sorted, along with a parallel
+    list of the values alone to bisect on. Values that are not
+    numbers are not indexed.
+    """
+
+    def __init__(self, class_name, attribute):
+        """
+        Initializes an empty index.
+
+        Args:
+            class_name (str): Name of the indexed class.
+            attribute (str): Name of the indexed attribute.
+        """
+        self.class_name = class_name
+        self.attribute = attribute
+        self.attributes = (attribute,)
+        self.entries = []
+        self.sorted_values = []
+        self.values = {}
+
+    def add(self, key, obj):
+        """
+        Indexes the current value of an object, moving its entry
+        if the value changed.
+
+        Args:
+            key (str): Storage key of the object.
+            obj (BaseModel): The object.
+        """
+        value = getattr(obj, self.attribute, None)
+        if isinstance(value, bool) or \
+                not isinstance(value, (int, float)) or value != value:
+            value = None
+        if key in self.values:
+            if self.values[key] == value:
+                return
+            self.discard(key)
+        if value is None:
+            return
+        pos = bisect_left(self.entries, (value, key))
+        self.entries.insert(pos, (value, key))
+        self.sorted_values.insert(pos, value)
+        self.values[key] = value
+
+    def discard(self, key):
+        """
+        Removes a key, nothing is done if it is missing.
+
+        Args:
+            key (str): Storage key of the object.
+        """
+        if key not in self.values:
+            return
+        value = self.values.pop(key)
+        pos = bisect_left(self.entries, (value, key))
+        del self.entries[pos]
+        del self.sorted_values[pos]
+
+    def bounds(self, low=None, high=None, low_inclusive=True,
+               high_inclusive=True):
+        """
+        Returns the positions of the first entry in a range of values
+        and of the entry following the last one.
+
+        Args:
+            low: Lowest value, None for no lower bound.
+            high: Highest value, None for no upper bound.
+            low_inclusive (bool): Whether low itself is in the range.
+            high_inclusive (bool): Whether high itself is in the range.
+        """
+        values = self.sorted_values
+        start, end = 0, len(values)
+        if low is not None:
+            start = (bisect_left if low_inclusive else bisect_right)(
+                values, low)
+        if high is not None:
+            end = (bisect_right if high_inclusive else bisect_left)(
+                values, high)
+        return start, max(start, end)
+
+    def count(self, low=None, high=None, low_inclusive=True,
+              high_inclusive=True):
+        """
+        Returns the number of objects whose value is in a range.
+        The arguments are those of bounds().
+        """
+        start, end = self.bounds(low, high, low_inclusive, high_inclusive)
+        return end - start
+
+    def range(self, low=None, high=None, low_inclusive=True,
+              high_inclusive=True, reverse=False):
+        """
+        Yields the keys of the objects whose value is in a range,
+        by increasing value, or decreasing if reverse is True.
+        The other arguments are those of bounds().
+        """
+        start, end = self.bounds(low, high, low_inclusive, high_inclusive)
+        positions = range(start, end)
+        if reverse:
+            positions = reversed(positions)
+        entries = self.entries
+        for pos in positions:
+            yield entries[pos][1]
+
+
+class GeoIndex:
+    """
+    Grid index of the objects of one class by their latitude and
+    longitude, in degrees. Each object is put in the cell of the
+    grid holding its coordinates, so a bounding box or a circle
+    only looks at the objects of the cells it overlaps.
+
+    Coordinates that are not numbers, or out of range, are
+    not indexed.
+    """
+
+    def __init__(self, class_name, latitude="latitude",
+                 longitude="longitude", cell_size=0.5):
+        """
+        Initializes an empty index.
+
+        Args:
+            class_name (str): Name of the indexed class.
+            latitude (str): Name of the latitude attribute.
+            longitude (str): Name of the longitude attribute.
+            cell_size (float): Side of the grid cells, in degrees.
+        """
+        self.class_name = class_name
+        self.attributes = (latitude, longitude)
+        self.cell_size = cell_size
+        self.cells = {}
+        self.values = {}
+
+    def add(self, key, obj):
+        """
+        Indexes the current coordinates of an object, moving it to
+        another cell if they changed.
+
+        Args:
+            key (str): Storage key of the object.
+            obj (BaseModel): The object.
+        """
+        point = tuple(getattr(obj, name, None) for name in self.attributes)
+        if not valid_point(*point):
+            point = None
+        if key in self.values:
+            if self.values[key] == point:
+                return
+            self.discard(key)
+        if point is None:
+            return
+        self.cells.setdefault(self.__cell(*point), {})[key] = None
+        self.values[key] = point
+
+    def discard(self, key):
+        """
+        Removes a key, nothing is done if it is missing.
+
+        Args:
+            key (str): Storage key of the object.
+        """
+        if key not in self.values:
+            return
+        cell = self.__cell(*self.values.pop(key))
+        bucket = self.cells[cell]
+        del bucket[key]
+        if not bucket:
+            del self.cells[cell]
+
+    def box(self, south, west, north, east):
+        """
+        Returns the keys of the objects inside a bounding box, such
+        as a map viewport. The box crosses the antimeridian when
+        west is greater than east.
+
+        Args:
+            south (float): Lowest latitude.
+            west (float): Westmost longitude.
+            north (float): Highest latitude.
+            east (float): Eastmost longitude.
+
+        Returns:
+            list: The storage keys.
+        """
+        values = self.values
+        keys = []
+        for bucket in self.__buckets(south, west, north, east):
+            for key in bucket:
+                latitude, longitude = values[key]
+                if south <= latitude <= north and \
+                        in_longitudes(longitude, west, east):
+                    keys.append(key)
+        return keys
+
+    def radius(self, latitude, longitude, radius_km, min_km=None):
+        """
+        Returns the objects within a distance of a point, closest
+        first.
+
+        Args:
+            latitude (float): Latitude of the point.
+            longitude (float): Longitude of the point.
+            radius_km (float): Largest distance, in kilometers.
+            min_km (float): Only returns the objects farther than this.
+
+        Returns:
+            list: (distance in km, key) pairs.
+        """
+        values = self.values
+        found = []
+        for bucket in self.__buckets(*_circle_box(latitude, longitude,
+                                                  radius_km)):
+            for key in bucket:
+                distance = distance_km(latitude, longitude, *values[key])
+                if distance <= radius_km and \
+                        (min_km is None or distance > min_km):
+                    found.append((distance, key))
+        found.sort()
+        return found
+
+    def nearest(self, latitude, longitude):
+        """
+        Yields the objects closest to a point first, looking in
+        circles of doubling radius, so that taking the first k
+        only reads the cells around the point.
+
+        Args:
+            latitude (float): Latitude of the point.
+            longitude (float): Longitude of the point.
+
+        Yields:
+            tuple: (distance in km, key) pairs.
+        """
+        inner = None
+        radius_km = self.cell_size * 111.0
+        while True:
+            yield from self.radius(latitude, longitude, radius_km, inner)
+            if radius_km >= _MAX_DISTANCE_KM:
+                return
+            inner = radius_km
+            radius_km *= 2
+
+    def estimate(self, south, west, north, east):
+        """
+        Returns the number of objects in the cells overlapping a
+        bounding box, which is at least the number of objects
+        inside the box. The arguments are those of box().
+        """
+        return sum(
+            len(bucket) for bucket in self.__buckets(south, west, north,
+                                                     east)
+        )
+
+    def estimate_radius(self, latitude, longitude, radius_km):
+        """
+        Returns the number of objects in the cells overlapping a
+        circle. The arguments are those of radius().
+        """
+        return self.estimate(*_circle_box(latitude, longitude, radius_km))
+
+    def __cell(self, latitude, longitude):
+        """
+        Returns the (row, column) of the cell holding a point.
+        """
+        return (math.floor(latitude / self.cell_size),
+                math.floor(longitude / self.cell_size))
+
+    def __buckets(self, south, west, north, east):
+        """
+        Yields the buckets of the non-empty cells overlapping a
+        bounding box, going through the non-empty cells instead
+        of the box when there are fewer of them.
+        """
+        size = self.cell_size
+        rows = range(math.floor(max(south, -90.0) / size),
+                     math.floor(min(north, 90.0) / size) + 1)
+        if west <= east:
+            columns = [range(math.floor(west / size),
+                             math.floor(east / size) + 1)]
+        else:
+            columns = [range(math.floor(west / size),
+                             math.floor(180.0 / size) + 1),
+                       range(math.floor(-180.0 / size),
+                             math.floor(east / size) + 1)]
+        cells = self.cells
+        if len(rows) * sum(len(c) for c in columns) > len(cells):
+            for (row, column), bucket in cells.items():
+                if row in rows and any(column in c for c in columns):
+                    yield bucket
+            return
+        for row in rows:
+            for span in columns:
+                for column in span:
+                    bucket = cells.get((row, column))
+                    if bucket is not None:
+                        yield bucket
+
+
+class TextIndex:
+    """
+    Inverted index of the words of one or more text attributes
+    of the objects of one class, ranking the objects matching
+    a search with BM25.
+
+    Each word maps to the number of times it appears in each
+    object, and the number of words of each object is kept, so
+    that an object is re-indexed on its own when it changes.
+    """
+
+    def __init__(self, class_name, attributes, k1=1.2, b=0.75):
+        """
+        Initializes an empty index.
+
+        Args:
+            class_name (str): Name of the indexed class.
+            attributes (tuple): Names of the indexed attributes.
+            k1 (float): BM25 term frequency saturation.
+            b (float): BM25 document length normalization.
+        """
+        self.class_name = class_name
+        self.attributes = tuple(attributes)
+        self.k1 = k1
+        self.b = b
+        self.postings = {}
+        self.terms = {}
+        self.lengths = {}
+        self.total_length = 0
+
+    def add(self, key, obj):
+        """
+        Indexes the current text of an object, replacing its
+        previous words.
+
+        Args:
+            key (str): Storage key of the object.
+            obj (BaseModel): The object.
+        """
+        counts = {}
+        for name in self.attributes:
+            value = getattr(obj, name, None)
+            if isinstance(value, str):
+                for term in tokenize(value):
+                    counts[term] = counts.get(term, 0) + 1
+        if key in self.terms:
+            if self.terms[key] == counts:
+                return
+            self.discard(key)
+        if not counts:
+            return
+        for term, count in counts.items():
+            self.postings.setdefault(term, {})[key] = count
+        self.terms[key] = counts
+        self.lengths[key] = sum(counts.values())
+        self.total_length += self.lengths[key]
+
+    def discard(self, key):
+        """
+        Removes a key, nothing is done if it is missing.
+
+        Args:
+            key (str): Storage key of the object.
+        """
+        counts = self.terms.pop(key, None)
+        if counts is None:
+            return
+        for term in counts:
+            posting = self.postings[term]
+            del posting[key]
+            if not posting:
+                del self.postings[term]
+        self.total_length -= self.lengths.pop(key)
+
+    def search(self, text):
+        """
+        Returns the objects containing at least one word of a text,
+        the most relevant first.
+
+        Args:
+            text (str): The words searched.
+
+        Returns:
+            list: (BM25 score, key) pairs.
+        """
+        total = len(self.terms)
+        if not total:
+            return []
+        average = self.total_length / total
+        k1, b = self.k1, self.b
+        lengths = self.lengths
+        scores = {}
+        for term in set(tokenize(text)):
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            idf = math.log(
+                1 + (total - len(posting) + 0.5) / (len(posting) + 0.5))
+            for key, count in posting.items():
+                norm = k1 * (1 - b + b * lengths[key] / average)
+                scores[key] = scores.get(key, 0.0) + \
+                    idf * count * (k1 + 1) / (count + norm)
+        found = [(score, key) for key, score in scores.items()]
+        found.sort(key=lambda pair: pair[0], reverse=True)
+        return found
+
+    def count(self, text):
+        """
+        Returns the number of objects containing at least one
+        word of a text.
+
+        Args:
+            text (str): The words searched.
+        """
+        keys = set()
+        for term in set(tokenize(text)):
+            keys.update(self.postings.get(term, ()))
+        return len(keys)
+
+
+class BitmapIndex:
+    """
+    Bitmap index of the items of one list attribute of the objects
+    of one class, such as the amenity_ids of the places.
+
+    Each indexed object gets a small ordinal, reused once the
+    object is removed, and each item a bitmap (a Python int)
+    whose bits are the ordinals of the objects holding it. The
+    objects holding several items are then a bitwise AND, and
+    counted without listing them.
+
+    The attribute must be replaced to be re-indexed: a list
+    changed in place keeps its old bits.
+    """
+
+    def __init__(self, class_name, attribute):
+        """
+        Initializes an empty index.
+
+        Args:
+            class_name (str): Name of the indexed class.
+            attribute (str): Name of the indexed list attribute.
+        """
+        self.class_name = class_name
+        self.attribute = attribute
+        self.attributes = (attribute,)
+        self.bitmaps = {}
+        self.ordinals = {}
+        self.keys = []
+        self.free = []
+        self.values = {}
+
+    def add(self, key, obj):
+        """
+        Indexes the current items of an object, replacing its
+        previous ones.
+
+        Args:
+            key (str): Storage key of the object.
+            obj (BaseModel): The object.
+        """
+        items = frozenset()
+        value = getattr(obj, self.attribute, None)
+        if isinstance(value, (list, tuple, set, frozenset)):
+            try:
+                items = frozenset(value)
+            except TypeError:
+                pass
+        if key in self.values:
+            if self.values[key] == items:
+                return
+            self.discard(key)
+        if not items:
+            return
+        if self.free:
+            ordinal = self.free.pop()
+            self.keys[ordinal] = key
+        else:
+            ordinal = len(self.keys)
+            self.keys.append(key)
+        bit = 1 << ordinal
+        bitmaps = self.bitmaps
+        for item in items:
+            bitmaps[item] = bitmaps.get(item, 0) | bit
+        self.ordinals[key] = ordinal
+        self.values[key] = items
+
+    def discard(self, key):
+        """
+        Removes a key, nothing is done if it is missing.
+
+        Args:
+            key (str): Storage key of the object.
+        """
+        if key not in self.values:
+            return
+        items = self.values.pop(key)
+        ordinal = self.ordinals.pop(key)
+        mask = ~(1 << ordinal)
+        bitmaps = self.bitmaps
+        for item in items:
+            bits = bitmaps[item] & mask
+            if bits:
+                bitmaps[item] = bits
+            else:
+                del bitmaps[item]
+        self.keys[ordinal] = None
+        self.free.append(ordinal)
+
+    def bits(self, items):
+        """
+        Returns the bitmap of the objects holding every item.
+
+        Args:
+            items (iterable): The items, at least one.
+        """
+        bits = None
+        for item in items:
+            bitmap = self.bitmaps.get(item, 0)
+            bits = bitmap if bits is None else bits & bitmap
+            if not bits:
+                return 0
+        return bits or 0
+
+    def all_of(self, items):
+        """
+        Returns the keys of the objects holding every item.
+
+        Args:
+            items (iterable): The items, at least one.
+
+        Returns:
+            list: The storage keys, by ordinal.
+        """
+        keys = self.keys
+        found = []
+        bits = self.bits(items)
+        while bits:
+            low = bits & -bits
+            found.append(keys[low.bit_length() - 1])
+            bits ^= low
+        return found
+
+    def count(self, items):
+        """
+        Returns the number of objects holding every item.
+
+        Args:
+            items (iterable): The items, at least one.
+        """
+        return _popcount(self.bits(items))
+
+    def facets(self, selected=()):
+        """
+        Returns, for each item, the number of objects holding it
+        along with every selected item, such as the number of
+        places next to each amenity checkbox.
+
+        Args:
+            selected (iterable): Items already selected.
+
+        Returns:
+            dict: Number of objects by item.
+        """
+        selected = list(selected)
+        if not selected:
+            return {item: _popcount(bitmap)
+                    for item, bitmap in self.bitmaps.items()}
+        bits = self.bits(selected)
+        return {item: _popcount(bitmap & bits)
+                for item, bitmap in self.bitmaps.items()}
+
+
+class IndexSet:
+    """
+    The indexes of a storage: its class index, always there,
+    and the attribute indexes, built the first time they are
+    used and kept up to date afterwards.
+
+    Every index has the same interface: add(key, obj) indexes
+    or re-indexes an object, discard(key) forgets it, and its
+    attributes tuple names the attributes it depends on.
+    """
+
+    def __init__(self):
+        """
+        Initializes an empty set of indexes.
+        """
+        self.classes = ClassIndex()
+        self.indexes = {}
+        self.by_class = {}
+
+    def check(self, objects):
+        """
+        Rebuilds the class index and drops the attribute indexes
+        when the dictionary of objects was replaced or changed
+        behind the storage's back.
+
+        Args:
+            objects (dict): The dictionary of stored objects.
+        """
+        if not self.classes.valid(objects):
+            self.classes.rebuild(objects)
+            self.indexes.clear()
+            self.by_class.clear()
+
+    def add(self, key, obj=None):
+        """
+        Indexes a stored object.
+
+        Args:
+            key (str): Storage key of the object.
+            obj (BaseModel): The object, or None if it is not decoded
+            yet, in which case the attribute indexes of its class are
+            dropped and built again on their next use.
+        """
+        self.classes.add(key)
+        indexes = self.by_class.get(key.partition('.')[0])
+        if not indexes:
+            return
+        if obj is None:
+            self.drop(key.partition('.')[0])
+            return
+        for index in indexes:
+            index.add(key, obj)
+
+    def discard(self, key):
+        """
+        Forgets a stored object.
+
+        Args:
+            key (str): Storage key of the object.
+        """
+        self.classes.discard(key)
+        for index in self.by_class.get(key.partition('.')[0], ()):
+            index.discard(key)
+
+    def touch(self, obj, name):
+        """
+        Re-indexes a stored object after one of its attributes
+        was set. Objects that are not stored are left out.
+
+        Args:
+            obj (BaseModel): The changed object.
+            name (str): Name of the attribute that was set.
+        """
+        indexes = self.by_class.get(obj.__class__.__name__)
+        if not indexes:
+            return
+        key = "{}.{}".format(obj.__class__.__name__, getattr(obj, "id", ""))
+        objects = self.classes.objects
+        if objects is None or dict.get(objects, key) is not obj:
+            return
+        for index in indexes:
+            if name in index.attributes:
+                index.add(key, obj)
+
+    def get(self, name, factory, objects):
+        """
+        Returns an attribute index, building it from the objects
+        of its class if it does not exist yet.
+
+        Args:
+            name (tuple): Identifies the index, starting with
+            the name of the indexed class.
+            factory (callable): Returns a new empty index.
+            objects (dict): The dictionary of stored objects.
+        """
+        self.check(objects)
+        index = self.indexes.get(name)
+        if index is None:
+            index = factory()
+            for key in self.classes.keys(name[0]):
+                obj = objects.get(key)
+                if obj is not None:
+                    index.add(key, obj)
+            self.indexes[name] = index
+            self.by_class.setdefault(name[0], []).append(index)
+        return index
+
+    def drop(self, class_name):
+        """
+        Drops the attribute indexes of a class.
+
+        Args:
+            class_name (str): Name of the class.
+        """
+        for index in self.by_class.pop(class_name, ()):
+            for name, other in list(self.indexes.items()):
+                if other is index:
+                    del self.indexes[name]
+
+
+def distance_km(lat1, lon1, lat2, lon2):
+    """
+    Returns the great-circle distance between two points, in
+    kilometers, with the haversine formula.
+
+    Args:
+        lat1 (float): Latitude of the first point, in degrees.
+        lon1 (float): Longitude of the first point, in degrees.
+        lat2 (float): Latitude of the second point, in degrees.
+        lon2 (float): Longitude of the second point, in degrees.
+    """
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    half = (math.sin((phi2 - phi1) / 2) ** 2 +
+            math.cos(phi1) * math.cos(phi2) *
+            math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(half)))
+
+
+def _popcount(bits):
+    """
+    Returns the number of bits set in a non-negative int.
+    """
+    return bin(bits).count("1")
+
+
+def valid_point(latitude, longitude):
+    """
+    Tells whether a latitude and a longitude are numbers in range.
+    """
+    for value, limit in ((latitude, 90.0), (longitude, 180.0)):
+        if isinstance(value, bool) or \
+                not isinstance(value, (int, float)) or \
+                not -limit <= value <= limit:
+            return False
+    return True
+
+
+def in_longitudes(longitude, west, east):
+    """
+    Tells whether a longitude is between west and east, going
+    eastwards, across the antimeridian if west > east.
+    """
+    if west <= east:
+        return west <= longitude <= east
+    return longitude >= west or longitude <= east
+
+
+def _circle_box(latitude, longitude, radius_km):
+    """
+    Returns the (south, west, north, east) bounding box of a circle.
+    """
+    angle = radius_km / EARTH_RADIUS_KM
+    south = latitude - math.degrees(angle)
+    north = latitude + math.degrees(angle)
+    if south <= -90.0 or north >= 90.0 or \
+            math.sin(angle) >= math.cos(math.radians(latitude)):
+        # The circle holds a pole, or goes round the earth
+        return max(south, -90.0), -180.0, min(north, 90.0), 180.0
+    spread = math.degrees(
+        math.asin(math.sin(angle) / math.cos(math.radians(latitude))))
+    west = longitude - spread
+    east = longitude + spread
+    if west < -180.0:
+        west += 360.0
+    if east > 180.0:
+        east -= 360.0
+    if west <= east and (longitude - spread < -180.0 or
+                         longitude + spread > 180.0):
+        return max(south, -90.0), -180.0, min(north, 90.0), 180.0
+    return south, west, north, east
+
+
+def tokenize(text):
+    """
+    Returns the words of a text, in lower case and without accents,
+    so that "Océan" and "ocean" are the same word.
+
+    Args:
+        text (str): The text.
+
+    Returns:
+        list: The words, in order.
+    """
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return _WORD.findall(text)
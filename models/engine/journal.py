@@ -0,0 +1,172 @@
+#!/usr/bin/python3
+"""
+Module: journal.py
+
+Defines the append-only change log used by FileStorage
+in journal mode.
+
+Instead of rewriting the whole JSON file on every save,
+journal mode appends one line per created, updated or
+deleted object. reload() replays those lines on top of
+the last snapshot.
+
+Once the log is big enough it is sealed (renamed to
+"<log>.sealed") so that a Compactor can fold it into the
+snapshot while new changes go to a fresh log.
+
+With compression, each append is written as its own compressed
+stream at the end of the log.
+
+Classes:
+- Journal: Appends and replays storage change records.
+
+Record format (one JSON document per line):
+- {"op": "put", "key": "<class>.<id>", "obj": {...to_dict()...}}
+- {"op": "del", "key": "<class>.<id>"}
+"""
+
+import json
+import os
+from models.engine.compression import DECOMPRESSION_ERRORS, get_compression
+from models.engine.durability import sync_file
+
+
+class Journal:
+    """
+    Append-only log of storage changes.
+    """
+
+    def __init__(self, path, compression=None):
+        """
+        Initializes the journal.
+
+        Args:
+            path (str): Path of the log file.
+            compression (Compression): Compression of the log,
+            none by default.
+        """
+        self.path = path
+        self.sealed_path = path + ".sealed"
+        self.compression = compression or get_compression("none")
+        self.records = 0
+
+    def append(self, puts, deletes, sync=False):
+        """
+        Appends change records to the log.
+
+        The file is opened for each append so that a log
+        rotated or removed by someone else is never written
+        through a stale file handle.
+
+        Args:
+            puts (dict): Serialized objects by key.
+            deletes (iterable): Keys of the deleted objects.
+            sync (bool): Flushes the log to the disk before returning.
+        """
+        lines = []
+        for key in deletes:
+            lines.append(json.dumps({"op": "del", "key": key}))
+        for key, value in puts.items():
+            lines.append(json.dumps({"op": "put", "key": key, "obj": value}))
+        if not lines:
+            return
+        data = ("\n".join(lines) + "\n").encode("utf-8")
+        with self.compression.open(self.path, "ab") as file:
+            file.write(data)
+        if sync:
+            sync_file(self.path)
+        self.records += len(lines)
+
+    def replay(self):
+        """
+        Reads the change records back in the order they were written,
+        the sealed segment first and then the active log.
+
+        Yields:
+            tuple: (op, key, obj) where obj is None for deletions.
+        """
+        self.records = 0
+        if os.path.isfile(self.sealed_path):
+            yield from self.read(self.sealed_path)
+        for record in self.read(self.path):
+            self.records += 1
+            yield record
+
+    def read(self, path):
+        """
+        Reads the change records of one log file.
+        A line torn by a crash in the middle of an append is skipped,
+        as is a compressed stream cut by a crash.
+
+        Args:
+            path (str): Path of the log file.
+
+        Yields:
+            tuple: (op, key, obj) where obj is None for deletions.
+        """
+        if not os.path.isfile(path):
+            return
+        with self.compression.open(path, "rb") as file:
+            for line in self.__lines(file):
+                try:
+                    record = json.loads(line)
+                    op, key = record["op"], record["key"]
+                except (ValueError, KeyError, TypeError):
+                    continue
+                yield op, key, record.get("obj")
+
+    @staticmethod
+    def __lines(file):
+        """
+        Yields the lines of a log file, stopping at a truncated
+        or corrupt compressed stream.
+        """
+        while True:
+            try:
+                line = file.readline()
+            except DECOMPRESSION_ERRORS:
+                return
+            if not line:
+                return
+            yield line
+
+    def exists(self):
+        """
+        Tells whether the log file exists.
+        """
+        return os.path.isfile(self.path)
+
+    def size(self):
+        """
+        Returns the size in bytes of the active log.
+        """
+        try:
+            return os.path.getsize(self.path)
+        except OSError:
+            return 0
+
+    def seal(self):
+        """
+        Renames the active log to the sealed segment so that
+        the next append starts a new log.
+
+        Returns:
+            bool: False if there was nothing to seal or if a sealed
+            segment is still waiting to be compacted.
+        """
+        if os.path.isfile(self.sealed_path) or not self.exists():
+            return False
+        os.replace(self.path, self.sealed_path)
+        self.records = 0
+        return True
+
+    def remove(self):
+        """
+        Deletes the log files once their content is in the snapshot.
+        """
+        for path in (self.path, self.sealed_path):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        self.records = 0
@@ -0,0 +1,218 @@
+#!/usr/bin/python3
+"""
+Module: lazy.py
+
+Support for the lazy mode of FileStorage, where reload()
+only indexes where each object lies in the data file and
+an object is decoded the first time it is looked up.
+
+Large files are memory-mapped, so the members are sliced
+out of the OS page cache, shared by every process reading
+the same file, instead of being read() into private buffers.
+
+The offsets of a file without an index are found by the
+scan() method of its codec.
+
+Classes:
+- Stub: Byte range of a not yet decoded object.
+- LazyObjects: Dictionary of objects decoding stubs on access.
+- Snapshot: Read access to the byte ranges of a data file.
+
+Functions:
+- read_index(path, file): Reads the offset index of a data file.
+- write_index(path, file, offsets): Writes the offset index.
+"""
+
+import atexit
+import json
+import mmap
+import os
+
+
+class Stub:
+    """
+    Byte range of the record of a not yet decoded object
+    in the data file.
+    """
+
+    __slots__ = ("start", "end")
+
+    def __init__(self, start, end):
+        """
+        Initializes the stub.
+
+        Args:
+            start (int): Offset of the first byte of the record.
+            end (int): Offset following the last byte of the record.
+        """
+        self.start = start
+        self.end = end
+
+
+class LazyObjects(dict):
+    """
+    Dictionary of stored objects whose values can be stubs.
+
+    Looking a key up decodes its stub through the loader, which
+    stores the instance in place of the stub. Keys and membership
+    tests never decode anything.
+    """
+
+    def __init__(self, loader, *args):
+        """
+        Initializes the dictionary.
+
+        Args:
+            loader (callable): loader(key, stub) stores and returns the
+            instance of a stub, or raises KeyError if it is broken.
+            *args: Initial content, as for dict().
+        """
+        super().__init__(*args)
+        self.loader = loader
+
+    def __getitem__(self, key):
+        """
+        Returns the instance stored under a key, decoding it if needed.
+        """
+        value = super().__getitem__(key)
+        if type(value) is Stub:
+            value = self.loader(key, value)
+        return value
+
+    def get(self, key, default=None):
+        """
+        Returns the instance stored under a key, or default.
+        """
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def items(self):
+        """
+        Returns the (key, instance) pairs, decoding every stub.
+        """
+        pairs = []
+        for key in list(self.keys()):
+            value = self.get(key)
+            if value is not None:
+                pairs.append((key, value))
+        return pairs
+
+    def values(self):
+        """
+        Returns the instances, decoding every stub.
+        """
+        return [value for key, value in self.items()]
+
+    def copy(self):
+        """
+        Returns a shallow copy that keeps the stubs as they are.
+        """
+        return LazyObjects(self.loader, dict.items(self))
+
+    def stubs(self):
+        """
+        Returns the number of objects not decoded yet.
+        """
+        return sum(1 for value in dict.values(self) if type(value) is Stub)
+
+
+class Snapshot:
+    """
+    Read access to the byte ranges of a data file, through
+    a memory map when the file is big enough.
+
+    The file stays open, so the ranges remain valid even
+    after the file is replaced on disk, until it is closed,
+    at the latest when the interpreter exits.
+    """
+
+    def __init__(self, path, mmap_bytes):
+        """
+        Opens the file.
+
+        Args:
+            path (str): Path to the data file.
+            mmap_bytes (int): Size from which the file is mapped.
+        """
+        self.file = open(path, "rb")
+        self.mapped = None
+        size = os.fstat(self.file.fileno()).st_size
+        if size and size >= mmap_bytes:
+            try:
+                self.mapped = mmap.mmap(
+                    self.file.fileno(), 0, access=mmap.ACCESS_READ
+                )
+            except (OSError, ValueError):
+                self.mapped = None
+        atexit.register(self.close)
+
+    def read(self, start, end):
+        """
+        Returns the bytes of a range of the file.
+
+        Args:
+            start (int): Offset of the first byte.
+            end (int): Offset following the last byte.
+
+        Returns:
+            bytes: The content of the range.
+        """
+        if self.mapped is not None:
+            return self.mapped[start:end]
+        self.file.seek(start)
+        return self.file.read(end - start)
+
+    def close(self):
+        """
+        Unmaps and closes the file.
+        """
+        atexit.unregister(self.close)
+        if self.mapped is not None:
+            self.mapped.close()
+            self.mapped = None
+        self.file.close()
+
+
+def read_index(path, file):
+    """
+    Reads the offset index written along a data file.
+
+    Args:
+        path (str): Path to the index file.
+        file (file): The data file, opened in binary mode.
+
+    Returns:
+        dict: (start, end) byte range by key, or None if the index
+        is missing or was not written for this version of the file.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as index_file:
+            index = json.load(index_file)
+        stat = os.fstat(file.fileno())
+        if index["size"] != stat.st_size or \
+                index["mtime_ns"] != stat.st_mtime_ns:
+            return None
+        return index["offsets"]
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def write_index(path, file, offsets):
+    """
+    Writes the offset index of a data file.
+
+    Args:
+        path (str): Path to the index file.
+        file (file): The data file, opened in binary mode.
+        offsets (dict): (start, end) byte range by key.
+    """
+    stat = os.fstat(file.fileno())
+    index = {
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "offsets": offsets,
+    }
+    with open(path, "w", encoding="utf-8") as index_file:
+        json.dump(index, index_file)
@@ -0,0 +1,649 @@
+#!/usr/bin/python3
+"""
+Module: query.py
+
+Queries over the objects of one class of a storage engine:
+
+    storage.query(Place).filter(city_id=city.id,
+                                price_by_night__lt=100,
+                                max_guest__gte=4) \
+        .order_by("price_by_night").limit(20).all()
+
+Before running, a small planner picks how to find the
+candidate objects: by key for an id, through a hash index
+for an equality on an indexed attribute, through a range
+index for bounds on a numeric attribute, or by scanning the
+class index. It keeps the path expected to yield the fewest
+candidates, and the other conditions are checked on those
+candidates only. explain() shows the chosen plan.
+
+A range index also yields its keys sorted: a query ordered by
+a range indexed attribute reads them in order, and stops at
+its limit instead of sorting every candidate.
+
+near() and within() restrict a query to a circle or a bounding
+box, read from the grid of a geo index when the class has one:
+
+    storage.query(Place).near(48.85, 2.35, 5).limit(10).all()
+
+Objects near a point come closest first, unless the query
+is ordered otherwise.
+
+Conditions on the items of a list attribute with a bitmap index,
+such as amenity_ids__all=[wifi.id, pool.id], are answered with a
+bitwise AND of the bitmaps of the items.
+
+search() restricts a query to the objects whose text attributes
+contain the words of a text, read from a full-text index and
+ranked by BM25, the most relevant first:
+
+    storage.query(Place).search("ocean view").limit(10).all()
+
+Classes:
+- Query: Builds and runs a query.
+- Plan: How a query finds its objects.
+
+Constants:
+- HASH_INDEXES: Attributes of each class with a hash index
+available to the planner.
+- RANGE_INDEXES: Numeric attributes of each class with a range
+index available to the planner.
+- GEO_INDEXES: Latitude and longitude attributes of each class
+with a geo index available to the planner.
+- TEXT_INDEXES: Text attributes of each class with a full-text
+index, which search() reads.
+- BITMAP_INDEXES: List attributes of each class with a bitmap
+index available to the planner.
+"""
+
+import heapq
+import operator
+from models.engine.index import distance_km, in_longitudes, valid_point
+
+HASH_INDEXES = {
+    "City": ("state_id",),
+    "Place": ("city_id", "user_id"),
+    "Review": ("place_id", "user_id"),
+}
+
+RANGE_INDEXES = {
+    "Place": ("price_by_night", "number_rooms", "number_bathrooms",
+              "max_guest"),
+}
+
+GEO_INDEXES = {
+    "Place": ("latitude", "longitude"),
+}
+
+TEXT_INDEXES = {
+    "City": ("name",),
+    "Place": ("name", "description"),
+    "Review": ("text",),
+    "State": ("name",),
+}
+
+BITMAP_INDEXES = {
+    "Place": ("amenity_ids",),
+}
+
+# Operators a range index can answer
+_BOUNDS = ("eq", "lt", "lte", "gt", "gte")
+
+_OPERATORS = {
+    "eq": ("=", operator.eq),
+    "ne": ("!=", operator.ne),
+    "lt": ("<", operator.lt),
+    "lte": ("<=", operator.le),
+    "gt": (">", operator.gt),
+    "gte": (">=", operator.ge),
+    "in": ("in", lambda value, values: value in values),
+    "contains": ("contains", operator.contains),
+    "all": ("contains all", lambda value, values: all(
+        item in value for item in values)),
+}
+
+
+class Plan:
+    """
+    How a query finds its objects.
+
+    Attributes:
+        access (str): "key", "hash", "range", "geo", "text", "bitmap"
+        or "scan".
+        description (str): What is read, for explain().
+        estimate (int): Expected number of candidate objects.
+        keys (callable): Returns the keys of the candidates.
+        conditions (list): Conditions left to check on the candidates.
+        ordered (bool): Whether the keys come in the order of the query.
+    """
+
+    def __init__(self, access, description, estimate, keys, conditions,
+                 ordered=False):
+        """
+        Initializes the plan.
+        """
+        self.access = access
+        self.description = description
+        self.estimate = estimate
+        self.keys = keys
+        self.conditions = conditions
+        self.ordered = ordered
+
+
+class Query:
+    """
+    Query over the objects of one class. filter(), order_by()
+    and limit() return a new query, so a query can be refined
+    without changing the one it comes from.
+    """
+
+    def __init__(self, storage, cls):
+        """
+        Initializes a query matching every object of a class.
+
+        Args:
+            storage: The storage engine holding the objects.
+            cls (type or str): The class of the objects.
+        """
+        self.storage = storage
+        self.class_name = cls if isinstance(cls, str) else cls.__name__
+        self.conditions = []
+        self.ordering = None
+        self.max_rows = None
+        self.area = None
+        self.text = None
+
+    def filter(self, **conditions):
+        """
+        Returns the query restricted to the objects matching
+        every condition.
+
+        Args:
+            **conditions: attribute=value for an equality, or
+            attribute__<op>=value where op is one of eq, ne, lt,
+            lte, gt, gte, in, contains and all (contains every
+            item of a list).
+
+        Raises:
+            ValueError: If an operator is unknown.
+        """
+        query = self.__copy()
+        for name, value in conditions.items():
+            attribute, _, op = name.partition("__")
+            op = op or "eq"
+            if op not in _OPERATORS:
+                raise ValueError("Unknown operator: {}".format(op))
+            query.conditions.append((attribute, op, value))
+        return query
+
+    def order_by(self, attribute):
+        """
+        Returns the query sorted by an attribute,
+        in descending order if its name starts with "-".
+
+        Args:
+            attribute (str): Name of the attribute.
+        """
+        query = self.__copy()
+        query.ordering = (attribute.lstrip("-"), attribute.startswith("-"))
+        return query
+
+    def near(self, latitude, longitude, radius_km=None):
+        """
+        Returns the query restricted to the objects within a
+        distance of a point, closest first. Without a radius,
+        every object is kept, so near(...).limit(k) returns the
+        k nearest objects.
+
+        Args:
+            latitude (float): Latitude of the point, in degrees.
+            longitude (float): Longitude of the point, in degrees.
+            radius_km (float): Largest distance, in kilometers.
+        """
+        query = self.__copy()
+        query.area = ("near", (latitude, longitude, radius_km))
+        return query
+
+    def within(self, south, west, north, east):
+        """
+        Returns the query restricted to the objects inside a
+        bounding box, which crosses the antimeridian when west
+        is greater than east.
+
+        Args:
+            south (float): Lowest latitude.
+            west (float): Westmost longitude.
+            north (float): Highest latitude.
+            east (float): Eastmost longitude.
+        """
+        query = self.__copy()
+        query.area = ("box", (south, west, north, east))
+        return query
+
+    def search(self, text):
+        """
+        Returns the query restricted to the objects containing
+        at least one word of a text, the most relevant first.
+
+        Args:
+            text (str): The words searched.
+
+        Raises:
+            ValueError: If the class has no text index.
+        """
+        if self.class_name not in TEXT_INDEXES:
+            raise ValueError(
+                "No text index on {}".format(self.class_name))
+        query = self.__copy()
+        query.text = text
+        return query
+
+    def limit(self, count):
+        """
+        Returns the query limited to its first objects.
+
+        Args:
+            count (int): Maximum number of objects.
+        """
+        query = self.__copy()
+        query.max_rows = count
+        return query
+
+    def plan(self):
+        """
+        Returns the cheapest way to find the objects of the query.
+        """
+        storage = self.storage
+        class_name = self.class_name
+        if self.text is not None:
+            # Only the text index can answer a search
+            return self.__text_plan()
+        best = Plan(
+            "scan", "class index {}".format(class_name),
+            storage.count(class_name),
+            lambda: storage.all(class_name).keys(), list(self.conditions)
+        )
+        for condition in self.conditions:
+            attribute, op, value = condition
+            if op != "eq":
+                continue
+            others = [other for other in self.conditions
+                      if other is not condition]
+            if attribute == "id":
+                key = "{}.{}".format(class_name, value)
+                plan = Plan("key", "key {}".format(key), 1,
+                            lambda key=key: (key,), others)
+            elif attribute in HASH_INDEXES.get(class_name, ()):
+                index = storage.index(class_name, attribute)
+                plan = Plan(
+                    "hash", "hash index {}.{} = {!r}".format(
+                        class_name, attribute, value),
+                    index.count(value),
+                    lambda index=index, value=value: index.keys(value),
+                    others
+                )
+            else:
+                continue
+            if plan.estimate < best.estimate:
+                best = plan
+        for attribute in RANGE_INDEXES.get(class_name, ()):
+            plan = self.__range_plan(attribute)
+            if plan is None:
+                continue
+            if plan.estimate < best.estimate or (
+                    plan.estimate == best.estimate and
+                    plan.ordered and not best.ordered):
+                best = plan
+        for attribute in BITMAP_INDEXES.get(class_name, ()):
+            plan = self.__bitmap_plan(attribute)
+            if plan is not None and plan.estimate < best.estimate:
+                best = plan
+        plan = self.__geo_plan()
+        if plan is not None and (
+                plan.estimate < best.estimate or
+                plan.estimate == best.estimate and plan.ordered):
+            best = plan
+        return best
+
+    def explain(self):
+        """
+        Returns a description of how the query runs.
+        """
+        plan = self.plan()
+        lines = [
+            "query {}".format(self.class_name),
+            "  access: {} (~{} candidates)".format(
+                plan.description, plan.estimate),
+        ]
+        filters = [
+            "{} {} {!r}".format(attribute, _OPERATORS[op][0], value)
+            for attribute, op, value in plan.conditions
+        ]
+        if self.area is not None and plan.access != "geo":
+            filters.append(self.__describe_area())
+        if filters:
+            lines.append("  filter: {}".format(", ".join(filters)))
+        if self.ordering is not None:
+            attribute, descending = self.ordering
+            lines.append("  order: {} {}".format(
+                attribute, "desc" if descending else "asc"))
+        elif self.text is not None:
+            lines.append("  order: relevance desc")
+        elif self.area is not None and self.area[0] == "near":
+            lines.append("  order: distance asc")
+        if self.max_rows is not None:
+            lines.append("  limit: {}".format(self.max_rows))
+        return "\n".join(lines)
+
+    def all(self):
+        """
+        Runs the query.
+
+        Returns:
+            list: The matching objects.
+        """
+        plan = self.plan()
+        checks = [
+            (attribute, _OPERATORS[op][1], value)
+            for attribute, op, value in plan.conditions
+        ]
+        inside = None
+        if self.area is not None and plan.access != "geo":
+            inside = self.__area_test()
+        by_distance = self.ordering is None and self.text is None and \
+            self.area is not None and self.area[0] == "near"
+        # Without an order, or with the keys already in order,
+        # the first matches are the result
+        in_order = (self.ordering is None and not by_distance) or \
+            plan.ordered
+        stop = self.max_rows if in_order else None
+        rows = []
+        if stop == 0:
+            return rows
+        # Other threads must not change the indexes being read,
+        # and the objects are read as they are, not copied
+        with self.storage.reading() as objs:
+            keys = plan.keys()
+            if not plan.ordered:
+                keys = list(keys)
+            for key in keys:
+                obj = objs.get(key)
+                if obj is None or not self.__match(obj, checks) or \
+                        (inside is not None and not inside(obj)):
+                    continue
+                rows.append(obj)
+                if stop is not None and len(rows) >= stop:
+                    break
+
+        if by_distance and not in_order:
+            latitude, longitude = self.area[1][:2]
+            names = GEO_INDEXES.get(self.class_name,
+                                    ("latitude", "longitude"))
+            descending = False
+
+            def sort_key(obj):
+                return distance_km(latitude, longitude,
+                                   *(getattr(obj, name) for name in names))
+        elif not in_order:
+            attribute, descending = self.ordering
+            # Objects without the attribute come last, in either
+            # order, and values of different types are grouped by
+            # type instead of being compared
+            missing = [obj for obj in rows
+                       if getattr(obj, attribute, None) is None]
+            if missing:
+                rows = [obj for obj in rows
+                        if getattr(obj, attribute, None) is not None]
+
+            def sort_key(obj):
+                value = getattr(obj, attribute)
+                if isinstance(value, (int, float)) and \
+                        not isinstance(value, bool):
+                    return ("", value)
+                return (type(value).__name__, value)
+
+            if self.max_rows is not None:
+                pick = heapq.nlargest if descending else heapq.nsmallest
+                rows = pick(self.max_rows, rows, key=sort_key)
+                rows += missing[:self.max_rows - len(rows)]
+            else:
+                rows.sort(key=sort_key, reverse=descending)
+                rows += missing
+        return rows
+
+    def first(self):
+        """
+        Returns the first matching object, or None.
+        """
+        rows = self.limit(1).all()
+        return rows[0] if rows else None
+
+    def count(self):
+        """
+        Returns the number of matching objects.
+        """
+        return len(self.all())
+
+    def __iter__(self):
+        """
+        Iterates over the matching objects.
+        """
+        return iter(self.all())
+
+    def __range_plan(self, attribute):
+        """
+        Returns the plan reading the range index of an attribute,
+        bounded by the numeric conditions on it, or None if the
+        index is of no use to the query.
+
+        Without bounds, the index is only used to read the objects
+        in the order of the query, and only when every object of
+        the class has a number to sort on.
+        """
+        low = high = None
+        used = []
+        for condition in self.conditions:
+            name, op, value = condition
+            if name != attribute or op not in _BOUNDS or \
+                    isinstance(value, bool) or \
+                    not isinstance(value, (int, float)) or value != value:
+                continue
+            used.append(condition)
+            if op in ("eq", "gt", "gte"):
+                bound = (value, op != "gt")
+                if low is None or bound[0] > low[0] or \
+                        (bound[0] == low[0] and not bound[1]):
+                    low = bound
+            if op in ("eq", "lt", "lte"):
+                bound = (value, op != "lt")
+                if high is None or bound[0] < high[0] or \
+                        (bound[0] == high[0] and not bound[1]):
+                    high = bound
+        ordered = self.ordering is not None and \
+            self.ordering[0] == attribute
+        if not used and not ordered:
+            return None
+
+        storage = self.storage
+        class_name = self.class_name
+        index = storage.index(class_name, attribute, "range")
+        if not used and len(index.values) != storage.count(class_name):
+            return None
+        descending = ordered and self.ordering[1]
+        bounds = (
+            None if low is None else low[0],
+            None if high is None else high[0],
+            low is None or low[1],
+            high is None or high[1],
+        )
+        others = [other for other in self.conditions if other not in used]
+        estimate = index.count(*bounds)
+        if ordered and not others and self.max_rows is not None:
+            estimate = min(estimate, self.max_rows)
+
+        description = "range index {}.{}".format(class_name, attribute)
+        limits = []
+        if low is not None:
+            limits.append("{} {!r}".format(">=" if low[1] else ">", low[0]))
+        if high is not None:
+            limits.append("{} {!r}".format("<=" if high[1] else "<",
+                                           high[0]))
+        if limits:
+            description += " " + " and ".join(limits)
+        if ordered:
+            description += ", {} order".format(
+                "descending" if descending else "ascending")
+        return Plan(
+            "range", description, estimate,
+            lambda: index.range(*bounds, reverse=descending),
+            others, ordered
+        )
+
+    def __bitmap_plan(self, attribute):
+        """
+        Returns the plan reading the bitmap index of a list attribute
+        for the items it must contain, or None if there are none.
+        """
+        items = []
+        used = []
+        for condition in self.conditions:
+            name, op, value = condition
+            if name != attribute or op not in ("contains", "all"):
+                continue
+            values = [value] if op == "contains" else value
+            try:
+                if not values or isinstance(values, str):
+                    continue
+                values = list(values)
+                set(values)
+            except TypeError:
+                continue
+            items.extend(values)
+            used.append(condition)
+        if not items:
+            return None
+        index = self.storage.index(self.class_name, attribute, "bitmap")
+        return Plan(
+            "bitmap", "bitmap index {}.{} contains {}".format(
+                self.class_name, attribute,
+                ", ".join(repr(item) for item in items)),
+            index.count(items),
+            lambda: index.all_of(items),
+            [other for other in self.conditions if other not in used]
+        )
+
+    def __text_plan(self):
+        """
+        Returns the plan reading the text index of the class.
+        """
+        names = TEXT_INDEXES[self.class_name]
+        index = self.storage.index(self.class_name, names, "text")
+        text = self.text
+        return Plan(
+            "text", "text index {}.{} {!r}".format(
+                self.class_name, ",".join(names), text),
+            index.count(text),
+            lambda: [key for score, key in index.search(text)],
+            list(self.conditions), self.ordering is None
+        )
+
+    def __geo_plan(self):
+        """
+        Returns the plan reading the geo index of the class for
+        the area of the query, or None if there is no area or
+        no geo index.
+        """
+        names = GEO_INDEXES.get(self.class_name)
+        if self.area is None or names is None:
+            return None
+        storage = self.storage
+        index = storage.index(self.class_name, names, "geo")
+        kind, args = self.area
+        ordered = self.ordering is None
+        description = "geo index {} {}".format(
+            self.class_name, self.__describe_area())
+        if kind == "box":
+            return Plan("geo", description, index.estimate(*args),
+                        lambda: index.box(*args), list(self.conditions),
+                        ordered)
+
+        latitude, longitude, radius_km = args
+        if ordered:
+            description += ", nearest first"
+        if radius_km is None:
+            estimate = len(index.values)
+            if ordered and not self.conditions and \
+                    self.max_rows is not None:
+                estimate = min(estimate, self.max_rows)
+
+            def keys():
+                for distance, key in index.nearest(latitude, longitude):
+                    yield key
+        else:
+            estimate = index.estimate_radius(*args)
+
+            def keys():
+                return [key for distance, key
+                        in index.radius(*args)]
+        return Plan("geo", description, estimate, keys,
+                    list(self.conditions), ordered)
+
+    def __area_test(self):
+        """
+        Returns the function telling whether an object is in the
+        area of the query, for the plans not reading a geo index.
+        """
+        names = GEO_INDEXES.get(self.class_name, ("latitude", "longitude"))
+        kind, args = self.area
+
+        def inside(obj):
+            point = [getattr(obj, name, None) for name in names]
+            if not valid_point(*point):
+                return False
+            if kind == "box":
+                south, west, north, east = args
+                return south <= point[0] <= north and \
+                    in_longitudes(point[1], west, east)
+            latitude, longitude, radius_km = args
+            return radius_km is None or \
+                distance_km(latitude, longitude, *point) <= radius_km
+        return inside
+
+    def __describe_area(self):
+        """
+        Returns the area of the query, for explain().
+        """
+        kind, args = self.area
+        if kind == "box":
+            return "within ({!r}, {!r}, {!r}, {!r})".format(*args)
+        latitude, longitude, radius_km = args
+        if radius_km is None:
+            return "near ({!r}, {!r})".format(latitude, longitude)
+        return "within {!r} km of ({!r}, {!r})".format(
+            radius_km, latitude, longitude)
+
+    @staticmethod
+    def __match(obj, checks):
+        """
+        Tells whether an object passes every check. An attribute
+        that cannot be compared to the value does not match.
+        """
+        for attribute, test, value in checks:
+            try:
+                if not test(getattr(obj, attribute, None), value):
+                    return False
+            except TypeError:
+                return False
+        return True
+
+    def __copy(self):
+        """
+        Returns a copy of the query.
+        """
+        query = Query(self.storage, self.class_name)
+        query.conditions = list(self.conditions)
+        query.ordering = self.ordering
+        query.max_rows = self.max_rows
+        query.area = self.area
+        query.text = self.text
+        return query
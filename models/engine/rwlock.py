@@ -0,0 +1,171 @@
+#!/usr/bin/python3
+"""
+Module: rwlock.py
+
+Reader-writer lock of the storage.
+
+Any number of threads can read the stored objects together,
+while a thread changing them holds the lock alone. A waiting
+writer goes before the readers that come after it, so that a
+steady flow of readers cannot starve it.
+
+Classes:
+- RWLock: The reader-writer lock.
+"""
+
+import threading
+
+
+class RWLock:
+    """
+    Lock held by many readers or by one writer.
+
+    Both sides are reentrant: a reader can read again, even when
+    a writer is waiting, and a writer can write or read again. A
+    reader cannot become a writer, since two readers doing so at
+    the same time would wait for each other forever.
+    """
+
+    def __init__(self):
+        """
+        Initializes the lock, held by nobody.
+        """
+        self.mutex = threading.Lock()
+        self.condition = threading.Condition(self.mutex)
+        self.readers = 0
+        self.writer = None
+        self.depth = 0
+        self.waiting = 0
+        self.blocked = 0
+        self.local = _Reads()
+        self.__reader = _Hold(self.acquire_read, self.release_read)
+        self.__writer = _Hold(self.acquire_write, self.release_write)
+
+    def read(self):
+        """
+        Returns a context manager holding the lock as a reader.
+        """
+        return self.__reader
+
+    def write(self):
+        """
+        Returns a context manager holding the lock as the writer.
+        """
+        return self.__writer
+
+    def acquire_read(self):
+        """
+        Waits until no writer holds or waits for the lock, then
+        holds it as a reader. A thread already reading or writing
+        gets it at once.
+        """
+        local = self.local
+        reads = local.reads
+        if reads or self.writer == threading.get_ident():
+            if not reads:
+                # Read within a write, not counted as a reader
+                local.counted = False
+            local.reads = reads + 1
+            return
+        with self.mutex:
+            if self.writer is not None or self.waiting:
+                self.blocked += 1
+                try:
+                    while self.writer is not None or self.waiting:
+                        self.condition.wait()
+                finally:
+                    self.blocked -= 1
+            self.readers += 1
+        local.reads = 1
+        local.counted = True
+
+    def release_read(self):
+        """
+        Releases the lock held as a reader.
+        """
+        local = self.local
+        local.reads -= 1
+        if local.reads or not local.counted:
+            return
+        with self.mutex:
+            self.readers -= 1
+            if not self.readers and self.waiting:
+                self.condition.notify_all()
+
+    def acquire_write(self):
+        """
+        Waits until nobody else holds the lock, then holds it
+        as the writer.
+
+        Raises:
+            RuntimeError: If the thread is reading.
+        """
+        me = threading.get_ident()
+        if self.writer == me:
+            self.depth += 1
+            return
+        if self.local.reads:
+            raise RuntimeError("Cannot write while reading")
+        with self.mutex:
+            if self.writer is not None or self.readers:
+                self.waiting += 1
+                try:
+                    while self.writer is not None or self.readers:
+                        self.condition.wait()
+                finally:
+                    self.waiting -= 1
+            self.writer = me
+            self.depth = 1
+
+    def release_write(self):
+        """
+        Releases the lock held as the writer.
+        """
+        self.depth -= 1
+        if self.depth:
+            return
+        with self.mutex:
+            self.writer = None
+            if self.waiting or self.blocked:
+                self.condition.notify_all()
+
+
+class _Reads(threading.local):
+    """
+    Read holds of the current thread.
+    """
+
+    reads = 0
+    counted = False
+
+
+class _Hold:
+    """
+    Context manager holding one side of the lock, cheaper than
+    a generator for the many short holds of the storage.
+    """
+
+    __slots__ = ("acquire", "release")
+
+    def __init__(self, acquire, release):
+        """
+        Initializes the context manager.
+
+        Args:
+            acquire (callable): Takes the lock.
+            release (callable): Releases the lock.
+        """
+        self.acquire = acquire
+        self.release = release
+
+    def __enter__(self):
+        """
+        Takes the lock.
+        """
+        self.acquire()
+
+    def __exit__(self, *exc_info):
+        """
+        Releases the lock.
+        """
+        self.release()
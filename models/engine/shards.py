@@ -0,0 +1,115 @@
+#!/usr/bin/python3
+"""
+Module: shards.py
+
+Helpers for the sharded layout of FileStorage, where each
+class is stored in its own files instead of one shared
+file.json:
+
+    <file_path>.d/<class name>.<partition>.<json|bin>[.gz|.xz|.bz2]
+
+Within a class, objects are spread over the partitions by
+a stable hash of their id, so that saving a changed object
+only rewrites the file of its partition.
+
+Functions:
+- shard_name(key, partitions, extension): Name of the shard file
+of a key.
+- read_shard(path, codec_name, compression_name): Decodes one
+shard file.
+- read_shards(paths, codec_name, compression_name, workers): Decodes
+shard files in parallel.
+"""
+
+import multiprocessing
+import os
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from models.engine.codec import get_codec
+from models.engine.compression import DECOMPRESSION_ERRORS, get_compression
+
+
+def shard_name(key, partitions, extension=".json"):
+    """
+    Returns the name of the shard file holding a key.
+
+    Args:
+        key (str): Storage key "<class name>.<id>".
+        partitions (int): Number of partitions per class.
+        extension (str): Extension of the codec of the shards.
+
+    Returns:
+        str: The shard file name.
+    """
+    class_name, _, obj_id = key.partition('.')
+    if partitions <= 1:
+        return "{}.0{}".format(class_name, extension)
+    part = zlib.crc32(obj_id.encode("utf-8")) % partitions
+    return "{}.{}{}".format(class_name, part, extension)
+
+
+def read_shard(path, codec_name="json", compression_name="none"):
+    """
+    Decodes one shard file, skipping the malformed records.
+
+    Args:
+        path (str): Path to the shard file.
+        codec_name (str): Name of the codec of the shard.
+        compression_name (str): Name of the compression of the shard.
+
+    Returns:
+        dict: The serialized objects by key.
+    """
+    codec = get_codec(codec_name)
+    with get_compression(compression_name).open(path, "rb") as file:
+        return dict(codec.iter_records(file))
+
+
+def read_shards(paths, codec_name="json", compression_name="none",
+                workers=None):
+    """
+    Decodes shard files, in a process pool when there is more
+    than one shard and more than one worker.
+
+    The pool is never started from a worker process, nor when
+    the platform cannot provide one, in which case the shards
+    are decoded one after the other.
+
+    Args:
+        paths (list): Paths to the shard files.
+        codec_name (str): Name of the codec of the shards.
+        compression_name (str): Name of the compression of the shards.
+        workers (int): Largest number of processes, the number of
+        CPUs by default. 1 decodes the shards in the calling process.
+
+    Yields:
+        tuple: (path, dict of serialized objects by key) or
+        (path, None) if the shard could not be decoded.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(len(paths), workers)
+    if workers > 1 and multiprocessing.parent_process() is None:
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [
+                    pool.submit(read_shard, path, codec_name,
+                                compression_name)
+                    for path in paths
+                ]
+                results = []
+                for path, future in zip(paths, futures):
+                    try:
+                        results.append((path, future.result()))
+                    except (ValueError,) + DECOMPRESSION_ERRORS:
+                        results.append((path, None))
+            yield from results
+            return
+        except (OSError, ImportError, RuntimeError):
+            pass
+
+    for path in paths:
+        try:
+            yield path, read_shard(path, codec_name, compression_name)
+        except (ValueError,) + DECOMPRESSION_ERRORS:
+            yield path, None
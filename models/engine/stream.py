@@ -0,0 +1,261 @@
+#!/usr/bin/python3
+"""
+Module: stream.py
+
+Incremental encoding and decoding of the storage JSON files.
+
+The files hold one JSON object whose members are the stored
+objects: {"<class>.<id>": {...}, ...}. iter_members() reads
+the file by chunks and yields each member as soon as it is
+decoded, so the whole document is never held in memory.
+
+A member that cannot be decoded is skipped: the decoder
+resumes at the next member boundary ('}, "<class>.<id>": {')
+instead of giving up on the rest of the file.
+
+MemberWriter does the opposite, writing the members one at
+a time through a buffered binary file.
+
+Classes:
+- MemberWriter: Writes the members of a JSON file one at a time.
+
+Functions:
+- encode_member(key, value): Encodes one member of a JSON file.
+- iter_members(file, chunk_size, strict, offsets): Yields the
+members of a JSON file.
+"""
+
+import json
+import re
+
+CHUNK_SIZE = 1 << 16
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_BOUNDARY = re.compile(r"\}[ \t\n\r]*,[ \t\n\r]*(?=\"[A-Za-z_]\w*\.)")
+
+
+def encode_member(key, value):
+    """
+    Encodes one "key": {value} member of a JSON file.
+
+    Args:
+        key (str): Storage key of the object.
+        value (dict): Serialized object.
+
+    Returns:
+        bytes: The ASCII encoded JSON member.
+    """
+    return (json.dumps(key) + ": " + json.dumps(value)).encode("ascii")
+
+
+class MemberWriter:
+    """
+    Writes a JSON object to a binary file one member at a time.
+
+    Usage:
+        with open(path, "wb") as file, MemberWriter(file) as writer:
+            writer.write(encode_member(key, value))
+    """
+
+    def __init__(self, file):
+        """
+        Initializes the writer.
+
+        Args:
+            file (file): Binary file opened for writing.
+        """
+        self.file = file
+        self.count = 0
+        self.offset = 0
+
+    def __enter__(self):
+        """
+        Opens the JSON object.
+        """
+        self.offset += self.file.write(b"{")
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """
+        Closes the JSON object.
+        """
+        self.file.write(b"}")
+        return False
+
+    def write(self, member):
+        """
+        Writes one encoded member.
+
+        Args:
+            member (bytes): Member made by encode_member().
+
+        Returns:
+            int: Offset of the member from the start of the file.
+        """
+        if self.count:
+            self.offset += self.file.write(b", ")
+        start = self.offset
+        self.offset += self.file.write(member)
+        self.count += 1
+        return start
+
+
+class _Reader:
+    """
+    Buffer over a text file read by chunks.
+    """
+
+    def __init__(self, file, chunk_size):
+        """
+        Initializes the buffer.
+
+        Args:
+            file (file): Text file opened for reading.
+            chunk_size (int): Number of characters read at a time.
+        """
+        self.file = file
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.base = 0
+        self.eof = False
+
+    def fill(self):
+        """
+        Drops the consumed characters and reads the next chunk.
+
+        Returns:
+            bool: False at the end of the file.
+        """
+        if self.eof:
+            return False
+        chunk = self.file.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.base += self.pos
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def tell(self):
+        """
+        Returns the position in the file of the current character.
+        """
+        return self.base + self.pos
+
+    def peek(self):
+        """
+        Skips whitespace and returns the next character,
+        or "" at the end of the file.
+        """
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                return ""
+
+    def decode(self, decoder):
+        """
+        Decodes the JSON value at the current position,
+        reading more of the file when the value is cut by
+        the end of the buffer.
+
+        Args:
+            decoder (json.JSONDecoder): The decoder to use.
+
+        Returns:
+            The decoded value.
+
+        Raises:
+            ValueError: If the value is malformed.
+        """
+        while True:
+            try:
+                value, end = decoder.raw_decode(self.buf, self.pos)
+                self.pos = end
+                return value
+            except ValueError as err:
+                # A later member boundary means the value is complete
+                # but broken: no need to read any further
+                if _BOUNDARY.search(self.buf, err.pos) or not self.fill():
+                    raise
+
+    def resync(self):
+        """
+        Moves to the next member boundary.
+
+        Returns:
+            bool: False if there is no other member.
+        """
+        while True:
+            match = _BOUNDARY.search(self.buf, self.pos)
+            if match:
+                self.pos = match.end()
+                return True
+            # Keep the tail in case a boundary is cut in half
+            self.pos = max(self.pos, len(self.buf) - 16, 0)
+            if not self.fill():
+                return False
+
+
+def iter_members(file, chunk_size=CHUNK_SIZE, strict=False, offsets=False):
+    """
+    Yields the members of the JSON object stored in a file,
+    one at a time.
+
+    Args:
+        file (file): Text file opened for reading.
+        chunk_size (int): Number of characters read at a time.
+        strict (bool): Raise instead of skipping malformed members.
+        offsets (bool): Also yield where each member lies in the file.
+
+    Yields:
+        tuple: (key, value) of each well-formed member, followed by
+        the positions of its first and past its last character when
+        offsets is True.
+
+    Raises:
+        ValueError: In strict mode, if the document is malformed.
+    """
+    decoder = json.JSONDecoder()
+    reader = _Reader(file, chunk_size)
+    if reader.peek() != "{":
+        if strict and reader.peek() != "":
+            raise ValueError("Expecting '{'")
+        return
+    reader.pos += 1
+    if reader.peek() == "}":
+        return
+
+    while True:
+        try:
+            reader.peek()
+            start = reader.tell()
+            key = reader.decode(decoder)
+            if not isinstance(key, str) or reader.peek() != ":":
+                raise ValueError("Expecting member name")
+            reader.pos += 1
+            reader.peek()
+            value = reader.decode(decoder)
+        except ValueError:
+            if strict:
+                raise
+            if not reader.resync():
+                return
+            continue
+
+        if offsets:
+            yield key, value, start, reader.tell()
+        else:
+            yield key, value
+
+        separator = reader.peek()
+        if separator == ",":
+            reader.pos += 1
+        elif separator == "}":
+            return
+        elif strict:
+            raise ValueError("Expecting ',' delimiter")
+        elif separator == "" or not reader.resync():
+            return
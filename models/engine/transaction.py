@@ -0,0 +1,105 @@
+#!/usr/bin/python3
+"""
+Module: transaction.py
+
+Undo log of the storage transactions.
+
+While a transaction is open, the storage defers its saves and
+records how to undo each change made to its objects: the
+object a new() replaced, the object a delete() removed, and
+the attributes an object had before its first change. A
+commit saves once; a rollback replays the log backwards, in
+memory, without reading the storage file again.
+
+Classes:
+- UndoLog: The changes of the open transaction.
+"""
+
+from models.engine.lazy import Stub
+
+
+class UndoLog:
+    """
+    Changes made since a transaction was opened, and the sets
+    of pending changes of the storage at that time.
+
+    The attributes of an object are copied on its first change
+    only, and shallowly: a list changed in place is not restored.
+    """
+
+    def __init__(self, dirty, deleted):
+        """
+        Opens a transaction.
+
+        Args:
+            dirty (set): Instances of the storage changed since its
+            last save, restored by a rollback.
+            deleted (set): Keys removed since its last save, restored
+            by a rollback.
+        """
+        self.depth = 1
+        self.entries = []
+        self.seen = set()
+        self.dirty = set(dirty)
+        self.deleted = set(deleted)
+
+    def new(self, key, previous):
+        """
+        Records that an object was stored under a key.
+
+        Args:
+            key (str): Storage key of the object.
+            previous (BaseModel): The object it replaced, or None.
+        """
+        self.entries.append(("new", key, previous))
+
+    def delete(self, key, obj):
+        """
+        Records that an object was removed.
+
+        Args:
+            key (str): Storage key of the object.
+            obj (BaseModel): The removed object.
+        """
+        self.entries.append(("delete", key, obj))
+
+    def touch(self, key, obj):
+        """
+        Records the attributes of an object about to change,
+        the first time it changes in the transaction.
+
+        Args:
+            key (str): Storage key of the object.
+            obj (BaseModel): The object.
+        """
+        if id(obj) in self.seen:
+            return
+        self.seen.add(id(obj))
+        # The entry keeps obj alive, so its id cannot be reused
+        self.entries.append(("touch", key, (obj, dict(obj.__dict__))))
+
+    def undo(self, objects, indexes):
+        """
+        Undoes the recorded changes, the last one first.
+
+        Args:
+            objects (dict): The stored objects by key.
+            indexes (IndexSet): The indexes of the storage.
+        """
+        for op, key, value in reversed(self.entries):
+            if op == "touch":
+                obj, attributes = value
+                obj.__dict__.clear()
+                obj.__dict__.update(attributes)
+                if dict.get(objects, key) is obj:
+                    indexes.add(key, obj)
+                continue
+            if op == "new":
+                dict.pop(objects, key, None)
+                indexes.discard(key)
+            if value is not None:
+                objects[key] = value
+                # A stub is indexed by key only, until it is decoded
+                indexes.add(key, None if type(value) is Stub else value)
+        self.entries = []
+        self.seen = set()
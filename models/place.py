@@ -8,7 +8,10 @@ The Place class represents a place available for rent
 in the AirBnB clone project.
 """
 
+import models
+from models.amenity import Amenity
 from models.base_model import BaseModel
+from models.review import Review
 
 
 class Place(BaseModel):
@@ -28,6 +31,9 @@ class Place(BaseModel):
         latitude (float): Latitude coordinate of the place.
         longitude (float): Longitude coordinate of the place.
         amenity_ids (list): List of the place amenity IDs.
+        reviews (list): The reviews of the place, read-only.
+        amenities (list): The amenities of the place. Setting it
+        to an Amenity adds the amenity to the place.
     """
 
     city_id = ""
@@ -41,3 +47,44 @@ class Place(BaseModel):
     latitude = 0.0
     longitude = 0.0
     amenity_ids = []
+
+    @property
+    def reviews(self):
+        """
+        Returns the Review instances whose place_id is the id
+        of the place, found through the storage index.
+        """
+        return list(
+            models.storage.lookup(Review, "place_id", self.id).values()
+        )
+
+    @property
+    def amenities(self):
+        """
+        Returns the Amenity instances whose id is in amenity_ids,
+        looked up by key.
+        """
+        amenities = []
+        with models.storage.reading() as objs:
+            for amenity_id in self.amenity_ids:
+                amenity = objs.get("Amenity." + amenity_id)
+                if amenity is not None:
+                    amenities.append(amenity)
+        return amenities
+
+    @amenities.setter
+    def amenities(self, obj):
+        """
+        Adds the id of an Amenity to amenity_ids.
+
+        Args:
+            obj (Amenity): The amenity to add.
+
+        Raises:
+            TypeError: If obj is not an Amenity.
+        """
+        if not isinstance(obj, Amenity):
+            raise TypeError("amenities only accepts Amenity instances")
+        if obj.id not in self.amenity_ids:
+            # A new list, never the one shared by the class
+            self.amenity_ids = self.amenity_ids + [obj.id]
@@ -8,7 +8,9 @@ The State class represents states
 in the AirBnB clone project.
 """
 
+import models
 from models.base_model import BaseModel
+from models.city import City
 
 
 class State(BaseModel):
@@ -18,5 +20,14 @@ class State(BaseModel):
 
     Attributes:
         name (str): Name of the state.
+        cities (list): The cities of the state, read-only.
     """
     name = ""
+
+    @property
+    def cities(self):
+        """
+        Returns the City instances whose state_id is the id
+        of the state, found through the storage index.
+        """
+        return list(models.storage.lookup(City, "state_id", self.id).values())
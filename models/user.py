@@ -8,7 +8,9 @@ The User class represents users
 in the AirBnB clone project.
 """
 
+import models
 from models.base_model import BaseModel
+from models.place import Place
 
 
 class User(BaseModel):
@@ -21,8 +23,17 @@ class User(BaseModel):
         password (str): Password associated with the user.
         first_name (str): First name of the user.
         last_name (str): Last name of the user.
+        places (list): The places owned by the user, read-only.
     """
     email = ""
     password = ""
     first_name = ""
     last_name = ""
+
+    @property
+    def places(self):
+        """
+        Returns the Place instances whose user_id is the id
+        of the user, found through the storage index.
+        """
+        return list(models.storage.lookup(Place, "user_id", self.id).values())
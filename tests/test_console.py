@@ -2,6 +2,7 @@
 """
 Unittests for console.py
 """
+import subprocess
 import sys
 import os
 import unittest
@@ -10,6 +11,7 @@ from io import StringIO
 from models import storage
 from models.engine.file_storage import FileStorage
 from console import HBNBCommand
+from test_models import close_storage
 
 
 class TestHBNBCommand_prompting(unittest.TestCase):
@@ -41,7 +43,8 @@ class TestHBNBCommand_help(unittest.TestCase):
     def test_help(self):
         h = ("Documented commands (type help <topic>):\n"
              "========================================\n"
-             "EOF  all  count  create  destroy  help  quit  show  update")
+             "EOF  begin   count   destroy  quit      search  update\n"
+             "all  commit  create  help     rollback  show")
         with patch("sys.stdout", new=StringIO()) as output:
             self.assertFalse(HBNBCommand().onecmd("help"))
             self.assertEqual(h, output.getvalue().strip())
@@ -72,6 +75,7 @@ class TestHBNBCommand_create(unittest.TestCase):
 
     @classmethod
     def tearDown(self):
+        close_storage()
         try:
             os.remove("file.json")
         except IOError:
@@ -154,6 +158,7 @@ class TestHBNBCommand_show(unittest.TestCase):
 
     @classmethod
     def tearDown(self):
+        close_storage()
         try:
             os.remove("file.json")
         except IOError:
@@ -407,6 +412,7 @@ class TestHBNBCommand_destroy(unittest.TestCase):
 
     @classmethod
     def tearDown(self):
+        close_storage()
         try:
             os.remove("file.json")
         except FileNotFoundError:
@@ -661,6 +667,7 @@ class TestHBNBCommand_all(unittest.TestCase):
 
     @classmethod
     def tearDown(self):
+        close_storage()
         try:
             os.remove("file.json")
         except FileNotFoundError:
@@ -807,6 +814,7 @@ class TestHBNBCommand_update(unittest.TestCase):
 
     @classmethod
     def tearDown(self):
+        close_storage()
         try:
             os.remove("file.json")
         except FileNotFoundError:
@@ -1124,6 +1132,33 @@ class TestHBNBCommand_update(unittest.TestCase):
             self.assertFalse(HBNBCommand().onecmd(testCmd))
             self.assertEqual(correct, output.getvalue().strip())
 
+    def test_update_relationship(self):
+        correct = "** attribute can't be set **"
+        for classname, attribute in (("State", "cities"),
+                                     ("Place", "reviews"),
+                                     ("Place", "amenities")):
+            with patch("sys.stdout", new=StringIO()) as output:
+                HBNBCommand().onecmd("create {}".format(classname))
+                testId = output.getvalue().strip()
+            with patch("sys.stdout", new=StringIO()) as output:
+                testCmd = "update {} {} {} 'x'".format(
+                    classname, testId, attribute)
+                self.assertFalse(HBNBCommand().onecmd(testCmd))
+                self.assertEqual(correct, output.getvalue().strip())
+            obj = storage.all()["{}.{}".format(classname, testId)]
+            self.assertEqual([], getattr(obj, attribute))
+            self.assertNotIn(attribute, obj.__dict__)
+
+    def test_update_read_only_attr(self):
+        with patch("sys.stdout", new=StringIO()) as output:
+            HBNBCommand().onecmd("create State")
+            testId = output.getvalue().strip()
+        with patch("sys.stdout", new=StringIO()) as output:
+            testCmd = "update State {} __class__ 'x'".format(testId)
+            self.assertFalse(HBNBCommand().onecmd(testCmd))
+            self.assertEqual("** attribute can't be set **",
+                             output.getvalue().strip())
+
     def test_update_valid_string_attr_space_notation(self):
         with patch("sys.stdout", new=StringIO()) as output:
             HBNBCommand().onecmd("create BaseModel")
@@ -1446,6 +1481,7 @@ class TestHBNBCommand_count(unittest.TestCase):
 
     @classmethod
     def tearDown(self):
+        close_storage()
         try:
             os.remove("file.json")
         except FileNotFoundError:
@@ -1499,5 +1535,177 @@ class TestHBNBCommand_count(unittest.TestCase):
             self.assertEqual("1", output.getvalue().strip())
 
 
+class TestHBNBCommand_search(unittest.TestCase):
+    """Unittests for testing search method of HBNB comand interpreter."""
+
+    @classmethod
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp.json")
+        except FileNotFoundError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    @classmethod
+    def tearDown(self):
+        close_storage()
+        try:
+            os.remove("file.json")
+        except FileNotFoundError:
+            pass
+        try:
+            os.rename("tmp.json", "file.json")
+        except FileNotFoundError:
+            pass
+
+    def test_search_errors(self):
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd("search"))
+            self.assertEqual("** class name missing **",
+                             output.getvalue().strip())
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd("MyModel.search(\"a\")"))
+            self.assertEqual("** class doesn't exist **",
+                             output.getvalue().strip())
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd("search Place"))
+            self.assertEqual("** search text missing **",
+                             output.getvalue().strip())
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd("User.search(\"bob\")"))
+            self.assertEqual("** class can't be searched **",
+                             output.getvalue().strip())
+
+    def test_search_object(self):
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd("create Place"))
+            view_id = output.getvalue().strip()
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd("create Place"))
+            other_id = output.getvalue().strip()
+        HBNBCommand().onecmd(
+            "update Place {} name \"Ocean view loft\"".format(view_id))
+        HBNBCommand().onecmd(
+            "update Place {} description \"A view of the city\"".format(
+                other_id))
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(
+                HBNBCommand().onecmd("Place.search(\"ocean view\")"))
+            lines = output.getvalue().strip().split("\n")
+        self.assertEqual(2, len(lines))
+        self.assertIn(view_id, lines[0])
+        self.assertIn(other_id, lines[1])
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd("search Place city"))
+            self.assertIn(other_id, output.getvalue())
+            self.assertNotIn(view_id, output.getvalue())
+
+
+class TestHBNBCommand_transaction(unittest.TestCase):
+    """Unittests for testing transactions of HBNB comand interpreter."""
+
+    @classmethod
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp.json")
+        except FileNotFoundError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    @classmethod
+    def tearDown(self):
+        if storage.in_transaction():
+            storage.rollback()
+        close_storage()
+        try:
+            os.remove("file.json")
+        except FileNotFoundError:
+            pass
+        try:
+            os.rename("tmp.json", "file.json")
+        except FileNotFoundError:
+            pass
+
+    def test_no_transaction(self):
+        for command in ("commit", "rollback"):
+            with patch("sys.stdout", new=StringIO()) as output:
+                self.assertFalse(HBNBCommand().onecmd(command))
+                self.assertEqual("** no transaction in progress **",
+                                 output.getvalue().strip())
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd("begin"))
+            self.assertFalse(HBNBCommand().onecmd("begin"))
+            self.assertEqual("** transaction already in progress **",
+                             output.getvalue().strip())
+
+    def test_commit(self):
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd("begin"))
+            self.assertFalse(HBNBCommand().onecmd("create User"))
+            user_id = output.getvalue().strip()
+            self.assertFalse(os.path.isfile("file.json"))
+            self.assertFalse(HBNBCommand().onecmd("commit"))
+        with open("file.json", "r") as f:
+            self.assertIn("User." + user_id, f.read())
+
+    def test_rollback(self):
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd("create User"))
+            user_id = output.getvalue().strip()
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd("begin"))
+            self.assertFalse(HBNBCommand().onecmd(
+                "update User {} first_name Betty".format(user_id)))
+            self.assertFalse(HBNBCommand().onecmd(
+                "destroy User {}".format(user_id)))
+            self.assertFalse(HBNBCommand().onecmd("User.count()"))
+            self.assertFalse(HBNBCommand().onecmd("rollback"))
+            self.assertFalse(HBNBCommand().onecmd(
+                "show User {}".format(user_id)))
+        lines = output.getvalue().strip().split("\n")
+        self.assertEqual("0", lines[0])
+        self.assertNotIn("Betty", lines[1])
+        self.assertIn(user_id, lines[1])
+
+
+class TestHBNBCommand_processes(unittest.TestCase):
+    """Unittests for testing consoles sharing the storage file."""
+
+    @classmethod
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp.json")
+        except FileNotFoundError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    @classmethod
+    def tearDown(self):
+        close_storage()
+        try:
+            os.remove("file.json")
+        except FileNotFoundError:
+            pass
+        try:
+            os.rename("tmp.json", "file.json")
+        except FileNotFoundError:
+            pass
+
+    def test_sees_other_console(self):
+        with patch("sys.stdout", new=StringIO()) as output:
+            self.assertFalse(HBNBCommand().onecmd("create User"))
+            user_id = output.getvalue().strip()
+        subprocess.run(
+            [sys.executable, "console.py"], check=True,
+            input="update User {} first_name Betty\n".format(user_id),
+            capture_output=True, text=True
+        )
+        command = HBNBCommand()
+        with patch("sys.stdout", new=StringIO()) as output:
+            line = command.precmd("show User {}".format(user_id))
+            self.assertFalse(command.onecmd(line))
+            self.assertIn("Betty", output.getvalue())
+
+
 if __name__ == "__main__":
     unittest.main()
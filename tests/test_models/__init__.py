@@ -1 +1,25 @@
 #!/usr/bin/python3
+"""
+Helpers shared by the unittests of the models.
+
+Functions:
+- close_storage(): Closes the storage and removes its lock file.
+"""
+import os
+
+import models
+
+
+def close_storage():
+    """
+    Closes the storage and removes the lock file its saves and
+    reloads leave next to file.json.
+
+    The lock file is closed first: removing it while the storage
+    still holds it would lock another file than the next test's.
+    """
+    models.storage.close()
+    try:
+        os.remove("file.json.lock")
+    except FileNotFoundError:
+        pass
@@ -8,6 +8,7 @@ import unittest
 from datetime import datetime
 from time import sleep
 from models.amenity import Amenity
+from . import close_storage
 
 
 class TestAmenity_instantiation(unittest.TestCase):
@@ -21,6 +22,7 @@ class TestAmenity_instantiation(unittest.TestCase):
             pass
 
     def tearDown(self):
+        close_storage()
         try:
             os.remove("file.json")
         except FileNotFoundError:
@@ -116,6 +118,7 @@ class TestAmenity_save(unittest.TestCase):
             pass
 
     def tearDown(self):
+        close_storage()
         try:
             os.remove("file.json")
         except FileNotFoundError:
@@ -167,6 +170,7 @@ class TestAmenity_to_dict(unittest.TestCase):
             pass
 
     def tearDown(self):
+        close_storage()
         try:
             os.remove("file.json")
         except FileNotFoundError:
@@ -4,7 +4,9 @@ Unittests for BaseModel
 """
 import os
 import unittest
+from models import storage
 from models.base_model import BaseModel
+from . import close_storage
 
 
 class TestBasemodel(unittest.TestCase):
@@ -25,6 +27,7 @@ class TestBasemodel(unittest.TestCase):
         """
         Tear down for temporary file path
         """
+        close_storage()
         try:
             os.remove("file.json")
         except FileNotFoundError:
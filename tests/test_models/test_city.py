@@ -8,6 +8,8 @@ import unittest
 from datetime import datetime
 from time import sleep
 from models.city import City
+from models.place import Place
+from . import close_storage
 
 
 class TestCity_instantiation(unittest.TestCase):
@@ -103,6 +105,7 @@ class TestCity_save(unittest.TestCase):
             pass
 
     def tearDown(self):
+        close_storage()
         try:
             os.remove("file.json")
         except FileNotFoundError:
@@ -193,5 +196,27 @@ class TestCity_to_dict(unittest.TestCase):
             my_city.to_dict(None)
 
 
+class TestCity_places(unittest.TestCase):
+    """
+    Unittests for testing the places relationship of the City class.
+    """
+
+    def test_places(self):
+        city = City()
+        place = Place()
+        self.assertEqual([], city.places)
+        place.city_id = city.id
+        self.assertEqual([place], city.places)
+
+    def test_places_read_only(self):
+        city = City()
+        with self.assertRaises(AttributeError):
+            city.places = ["stale"]
+        # As stored by a version without the property
+        city = City(places=["stale"])
+        self.assertEqual([], city.places)
+        self.assertNotIn("places", city.to_dict())
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,162 @@
+#!/usr/bin/python3
+"""
+Unittests for the codec module
+"""
+import io
+import os
+import json
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from models.base_model import BaseModel
+from models.engine.codec import JSONCodec, BinaryCodec
+from models.engine.codec import get_codec, detect_codec, convert
+
+
+class TestCodecs(unittest.TestCase):
+    """
+    Unittests for testing the storage codecs.
+    """
+
+    def setUp(self):
+        self.obj = BaseModel()
+        self.obj.name = "Bétty"
+        self.obj.number = 1 << 70
+        self.obj.price = 12.5
+        self.obj.amenity_ids = ["a", "b"]
+        self.obj.extra = {"free": True, "pets": None}
+        self.key = "BaseModel." + self.obj.id
+        self.value = self.obj.to_dict()
+
+    def tearDown(self):
+        for name in ("a.json", "a.bin", "b.json"):
+            try:
+                os.remove(name)
+            except FileNotFoundError:
+                pass
+
+    def test_get_codec(self):
+        self.assertIsInstance(get_codec("json"), JSONCodec)
+        self.assertIsInstance(get_codec("binary"), BinaryCodec)
+        with self.assertRaises(ValueError):
+            get_codec("xml")
+
+    def test_round_trip(self):
+        for codec in (JSONCodec(), BinaryCodec()):
+            record = codec.encode(self.key, self.value)
+            self.assertEqual((self.key, self.value), codec.decode(record))
+
+    def test_binary_is_smaller(self):
+        json_size = len(JSONCodec().encode(self.key, self.value))
+        binary_size = len(BinaryCodec().encode(self.key, self.value))
+        self.assertLess(binary_size, json_size)
+
+    def test_binary_keeps_other_strings(self):
+        codec = BinaryCodec()
+        value = {"id": "not-a-uuid", "created_at": "2017-06-14T22:31:03",
+                 "updated_at": "2017-06-14 22:31:03.285259",
+                 "upper": self.obj.id.upper()}
+        self.assertEqual(value, codec.decode(codec.encode("User.1", value))[1])
+
+    def test_binary_malformed_record(self):
+        codec = BinaryCodec()
+        record = codec.encode(self.key, self.value)
+        with self.assertRaises(ValueError):
+            codec.decode(record[:-3])
+        with self.assertRaises(ValueError):
+            codec.decode(record[:4] + b"\xff" + record[5:])
+
+    def test_iter_records(self):
+        for codec in (JSONCodec(), BinaryCodec()):
+            file = io.BytesIO()
+            with codec.writer(file) as writer:
+                self.assertEqual(
+                    writer.offset, writer.write(codec.encode("User.1", {}))
+                )
+                writer.write(codec.encode(self.key, self.value))
+            file.seek(0)
+            self.assertEqual(
+                {"User.1": {}, self.key: self.value},
+                dict(codec.iter_records(file))
+            )
+
+    def test_binary_skips_malformed_record(self):
+        codec = BinaryCodec()
+        bad = bytearray(codec.encode("User.1", {"a": 1}))
+        bad[-9] = ord("?")
+        file = io.BytesIO(
+            codec.magic + bytes(bad) + codec.encode(self.key, self.value)
+        )
+        self.assertEqual(
+            {self.key: self.value}, dict(codec.iter_records(file))
+        )
+        file.seek(0)
+        with self.assertRaises(ValueError):
+            list(codec.iter_records(file, strict=True))
+
+    def test_binary_truncated_file(self):
+        codec = BinaryCodec()
+        data = codec.magic + codec.encode("User.1", {}) + \
+            codec.encode(self.key, self.value)
+        file = io.BytesIO(data[:-2])
+        self.assertEqual(["User.1"], [k for k, v in codec.iter_records(file)])
+        file.seek(0)
+        with self.assertRaises(ValueError):
+            list(codec.iter_records(file, strict=True))
+
+    def test_scan(self):
+        for codec in (JSONCodec(), BinaryCodec()):
+            file = io.BytesIO()
+            with codec.writer(file) as writer:
+                writer.write(codec.encode("User.1", {}))
+                writer.write(codec.encode(self.key, self.value))
+            data = file.getvalue()
+            start, end = codec.scan(file)[self.key]
+            self.assertEqual(
+                (self.key, self.value), codec.decode(data[start:end])
+            )
+
+    def test_convert_and_detect(self):
+        with open("a.json", "w", encoding="utf-8") as file:
+            json.dump({self.key: self.value, "User.1": {}}, file)
+        self.assertEqual("json", detect_codec("a.json").name)
+        self.assertEqual(2, convert("a.json", "a.bin"))
+        self.assertEqual("binary", detect_codec("a.bin").name)
+        self.assertLess(os.path.getsize("a.bin"), os.path.getsize("a.json"))
+        self.assertEqual(2, convert("a.bin", "b.json"))
+        with open("b.json", "r", encoding="utf-8") as file:
+            self.assertEqual({self.key: self.value, "User.1": {}},
+                             json.load(file))
+
+    def test_convert_script(self):
+        script = os.path.abspath(os.path.join("tools", "convert.py"))
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            with open(os.path.join(tmp_dir, "file.json"), "w") as file:
+                json.dump({self.key: self.value}, file)
+            env = dict(os.environ, HBNB_TYPE_STORAGE="db",
+                       HBNB_DB_PATH=os.path.join(tmp_dir, "file.db"))
+            result = subprocess.run(
+                [sys.executable, "-W", "error", script,
+                 "file.json", "file.bin"],
+                cwd=tmp_dir, env=env, capture_output=True, text=True
+            )
+            self.assertEqual(0, result.returncode, result.stderr)
+            self.assertEqual("1 records written to file.bin\n",
+                             result.stdout)
+            self.assertEqual("binary", detect_codec(
+                os.path.join(tmp_dir, "file.bin")).name)
+            # The storage of the directory is not loaded
+            self.assertFalse(os.path.exists(os.path.join(tmp_dir, "file.db")))
+            result = subprocess.run([sys.executable, script],
+                                    capture_output=True, text=True)
+            self.assertEqual(1, result.returncode)
+            self.assertIn("Usage:", result.stdout)
+        finally:
+            shutil.rmtree(tmp_dir)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,136 @@
+#!/usr/bin/python3
+"""
+Unittests for the columns module
+"""
+import math
+import unittest
+from contextlib import contextmanager
+from datetime import datetime
+from models.engine import columns
+from models.engine.columns import ColumnStore
+
+
+class Obj:
+    """
+    Stand-in for a stored object.
+    """
+
+    def __init__(self, obj_id, **kwargs):
+        self.id = obj_id
+        self.__dict__.update(kwargs)
+
+
+class TestColumnStore(unittest.TestCase):
+    """
+    Unittests for testing the columns, with NumPy if it is installed.
+    """
+
+    def setUp(self):
+        self.store = ColumnStore("Place", ("price_by_night", "created_at"),
+                                 ("city_id",))
+        rows = (("1", 100, "a"), ("2", 50, "a"), ("3", 30, "b"),
+                ("4", None, "b"), ("5", 20, None))
+        for obj_id, price, city_id in rows:
+            self.store.add("Place." + obj_id, Obj(
+                obj_id, price_by_night=price, city_id=city_id,
+                created_at=datetime(1970, 1, 2)))
+
+    def test_aggregates(self):
+        self.assertEqual(5, len(self.store))
+        self.assertEqual(200, self.store.sum("price_by_night"))
+        self.assertEqual(50, self.store.mean("price_by_night"))
+        self.assertEqual(20, self.store.min("price_by_night"))
+        self.assertEqual(100, self.store.max("price_by_night"))
+        self.assertEqual(4, self.store.count("price_by_night"))
+        self.assertEqual(86400, self.store.max("created_at"))
+        self.assertEqual([100, 50, 30],
+                         list(self.store.column("price_by_night"))[:3])
+        with self.assertRaises(ValueError):
+            self.store.aggregate("price_by_night", "median")
+        with self.assertRaises(KeyError):
+            self.store.sum("name")
+
+    def test_empty(self):
+        store = ColumnStore("Place", ("price_by_night",), ("city_id",))
+        self.assertEqual(0, store.sum("price_by_night"))
+        self.assertTrue(math.isnan(store.mean("price_by_night")))
+        self.assertTrue(math.isnan(store.max("price_by_night")))
+        self.assertEqual({}, store.group_by("city_id"))
+        self.assertEqual([0] * 4, store.histogram("price_by_night", 4)[1])
+
+    def test_histogram(self):
+        edges, counts = self.store.histogram("price_by_night", 4)
+        self.assertEqual([20, 40, 60, 80, 100], edges)
+        self.assertEqual([2, 1, 0, 1], counts)
+        edges, counts = self.store.histogram("price_by_night", 2, (0, 60))
+        self.assertEqual([1, 2], counts)
+
+    def test_group_by(self):
+        self.assertEqual({"a": 2, "b": 2}, self.store.group_by("city_id"))
+        self.assertEqual({"a": 75, "b": 30},
+                         self.store.group_by("city_id", "price_by_night",
+                                             "mean"))
+        self.assertEqual({"a": 150, "b": 30},
+                         self.store.group_by("city_id", "price_by_night",
+                                             "sum"))
+        self.assertEqual({"a": 50, "b": 30},
+                         self.store.group_by("city_id", "price_by_night",
+                                             "min"))
+        self.assertEqual({"a": 2, "b": 1},
+                         self.store.group_by("city_id", "price_by_night",
+                                             "count"))
+        with self.assertRaises(ValueError):
+            self.store.group_by("city_id", None, "sum")
+
+    def test_update_and_discard(self):
+        self.store.add("Place.2", Obj("2", price_by_night=True,
+                                      city_id="b"))
+        self.assertEqual(150, self.store.sum("price_by_night"))
+        self.assertEqual({"a": 1, "b": 3}, self.store.group_by("city_id"))
+        self.store.discard("Place.1")
+        self.store.discard("Place.1")
+        self.assertEqual(4, len(self.store))
+        self.assertEqual(50, self.store.sum("price_by_night"))
+        self.assertEqual(0, self.store.rows["Place.5"])
+        self.assertEqual("Place.5", self.store.keys[0])
+        self.assertEqual(20, self.store.columns["price_by_night"][0])
+        self.store.discard("Place.4")
+        self.assertEqual(3, len(self.store.columns["created_at"]))
+
+    def test_reads_copies(self):
+        held = []
+
+        @contextmanager
+        def reading():
+            held.append(len(self.store))
+            yield
+
+        self.store.reading = reading
+        column = self.store.column("price_by_night")
+        self.store.sum("price_by_night")
+        self.store.histogram("price_by_night", 2)
+        self.store.group_by("city_id", "price_by_night", "mean")
+        self.store.group_by("city_id")
+        self.assertEqual([5] * 7, held)
+        # Neither the copies nor their views keep the store from growing
+        self.store.add("Place.6", Obj("6", price_by_night=10))
+        self.assertEqual(5, len(column))
+        self.assertEqual(6, len(self.store.columns["price_by_night"]))
+
+
+class TestColumnStoreArray(TestColumnStore):
+    """
+    Unittests for testing the columns without NumPy.
+    """
+
+    def setUp(self):
+        self.numpy = columns.numpy
+        columns.numpy = None
+        super().setUp()
+
+    def tearDown(self):
+        columns.numpy = self.numpy
+
+
+if __name__ == "__main__":
+    unittest.main()
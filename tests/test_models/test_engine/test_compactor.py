@@ -0,0 +1,148 @@
+#!/usr/bin/python3
+"""
+Unittests for Compactor class
+"""
+import os
+import json
+import threading
+import unittest
+from contextlib import contextmanager
+from unittest.mock import patch
+from models.engine.compactor import Compactor
+from models.engine.journal import Journal
+
+
+class TestCompactor(unittest.TestCase):
+    """
+    Unittests for testing the journal compaction.
+    """
+
+    def setUp(self):
+        self.journal = Journal("test_compactor.json.log")
+        self.compactor = Compactor("test_compactor.json", self.journal)
+        with open("test_compactor.json", "w") as f:
+            json.dump({"User.1": {"id": "1"}, "User.2": {"id": "2"}}, f)
+
+    def tearDown(self):
+        self.compactor.wait()
+        self.journal.remove()
+        for path in ("test_compactor.json",):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def folds(self):
+        return [name for name in os.listdir(".")
+                if name.startswith("test_compactor.json.") and
+                name.endswith(".fold")]
+
+    def read_snapshot(self):
+        with open("test_compactor.json", "r") as f:
+            return json.load(f)
+
+    def test_below_thresholds_does_nothing(self):
+        self.journal.append({"User.3": {"id": "3"}}, [])
+        self.assertFalse(self.compactor.maybe_compact(1 << 20, 10))
+        self.assertTrue(self.journal.exists())
+
+    def test_fold_by_record_count(self):
+        self.journal.append({"User.3": {"id": "3"}}, ["User.1"])
+        self.assertTrue(self.compactor.maybe_compact(1 << 20, 2))
+        self.compactor.wait()
+        self.assertEqual(
+            {"User.2": {"id": "2"}, "User.3": {"id": "3"}},
+            self.read_snapshot()
+        )
+        self.assertFalse(os.path.isfile(self.journal.sealed_path))
+        self.assertFalse(self.journal.exists())
+
+    def test_fold_by_size(self):
+        self.journal.append({"User.3": {"id": "3"}}, [])
+        self.assertTrue(self.compactor.maybe_compact(1, 1000))
+        self.compactor.wait()
+        self.assertIn("User.3", self.read_snapshot())
+
+    def test_appends_during_fold_go_to_new_log(self):
+        self.journal.append({"User.3": {"id": "3"}}, [])
+        self.journal.seal()
+        self.journal.append({"User.4": {"id": "4"}}, [])
+        self.compactor.fold()
+        self.assertNotIn("User.4", self.read_snapshot())
+        self.assertEqual(
+            [("put", "User.4", {"id": "4"})],
+            list(self.journal.replay())
+        )
+
+    def test_sealed_segment_left_by_crash_is_folded(self):
+        self.journal.append({"User.3": {"id": "3"}}, [])
+        self.journal.seal()
+        self.assertTrue(self.compactor.maybe_compact(1 << 20, 1000))
+        self.compactor.wait()
+        self.assertIn("User.3", self.read_snapshot())
+
+    def test_failed_fold_keeps_snapshot(self):
+        with open("test_compactor.json", "w") as f:
+            f.write("{not json")
+        self.journal.append({"User.3": {"id": "3"}}, [])
+        self.journal.seal()
+        self.compactor.fold()
+        self.assertTrue(os.path.isfile(self.journal.sealed_path))
+        self.assertEqual([], self.folds())
+
+    def test_fold_holds_files(self):
+        held = []
+
+        @contextmanager
+        def exclusive():
+            held.append(os.path.isfile(self.journal.sealed_path))
+            yield
+
+        compactor = Compactor("test_compactor.json", self.journal,
+                              exclusive=exclusive)
+        self.journal.append({"User.3": {"id": "3"}}, [])
+        self.journal.seal()
+        compactor.fold()
+        self.assertEqual([True], held)
+        self.assertIn("User.3", self.read_snapshot())
+        # Folded meanwhile by another process: nothing left to do
+        compactor.fold()
+        self.assertEqual([True, False], held)
+        self.assertEqual([], self.folds())
+
+    def test_concurrent_folds(self):
+        lock = threading.Lock()
+
+        @contextmanager
+        def exclusive():
+            with lock:
+                yield
+
+        self.journal.append({"User.3": {"id": "3"}}, ["User.1"])
+        self.journal.seal()
+        compactors = [Compactor("test_compactor.json", self.journal,
+                                exclusive=exclusive) for i in range(4)]
+        threads = [threading.Thread(target=compactor.fold)
+                   for compactor in compactors]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(
+            {"User.2": {"id": "2"}, "User.3": {"id": "3"}},
+            self.read_snapshot()
+        )
+        self.assertEqual([], self.folds())
+
+    def test_failed_swap_raises(self):
+        self.journal.append({"User.3": {"id": "3"}}, [])
+        self.journal.seal()
+        with patch("os.replace", side_effect=PermissionError):
+            with self.assertRaises(PermissionError):
+                self.compactor.fold()
+        self.assertTrue(os.path.isfile(self.journal.sealed_path))
+        self.assertEqual([], self.folds())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+#!/usr/bin/python3
+"""
+Unittests for the compression module
+"""
+import os
+import unittest
+from models.engine.compression import DECOMPRESSION_ERRORS, get_compression
+
+
+class TestCompression(unittest.TestCase):
+    """
+    Unittests for testing the compression of the storage files.
+    """
+
+    def tearDown(self):
+        for extension in ("", ".gz", ".xz", ".bz2"):
+            try:
+                os.remove("test_compression" + extension)
+            except FileNotFoundError:
+                pass
+
+    def test_get_compression(self):
+        self.assertEqual("", get_compression("none").extension)
+        self.assertEqual(".gz", get_compression("zlib").extension)
+        self.assertEqual(".xz", get_compression("lzma").extension)
+        self.assertEqual(".bz2", get_compression("bz2").extension)
+        self.assertEqual(3, get_compression("zlib", "3").level)
+        self.assertIsNone(get_compression("zlib", "").level)
+        with self.assertRaises(ValueError):
+            get_compression("zip")
+        with self.assertRaises(ValueError):
+            get_compression("zlib", "fast")
+
+    def test_round_trip(self):
+        data = b'{"User.1": {"id": "1"}}' * 1000
+        for name in ("none", "zlib", "lzma", "bz2"):
+            for level in (None, 1):
+                compression = get_compression(name, level)
+                path = "test_compression" + compression.extension
+                with compression.open(path, "wb") as f:
+                    f.write(data)
+                with compression.open(path, "rb") as f:
+                    self.assertEqual(data, f.read())
+                if name != "none":
+                    self.assertLess(os.path.getsize(path), len(data) // 10)
+
+    def test_append_streams(self):
+        for name in ("zlib", "lzma", "bz2"):
+            compression = get_compression(name)
+            path = "test_compression" + compression.extension
+            for line in (b"a\n", b"b\n", b"c\n"):
+                with compression.open(path, "ab") as f:
+                    f.write(line)
+            with compression.open(path, "rb") as f:
+                self.assertEqual([b"a\n", b"b\n", b"c\n"], f.readlines())
+
+    def test_truncated_file(self):
+        for name in ("zlib", "lzma", "bz2"):
+            compression = get_compression(name)
+            path = "test_compression" + compression.extension
+            with compression.open(path, "wb") as f:
+                f.write(os.urandom(4096))
+            with open(path, "r+b") as f:
+                f.truncate(os.path.getsize(path) // 2)
+            with self.assertRaises(DECOMPRESSION_ERRORS):
+                with compression.open(path, "rb") as f:
+                    f.read()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+#!/usr/bin/python3
+"""
+Unittests for the durability module
+"""
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from models.engine.durability import GroupCommit, get_durability, \
+    replace_file, sync_dir, sync_file
+
+
+class TestDurability(unittest.TestCase):
+    """
+    Unittests for testing the durability levels.
+    """
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, "file.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_get_durability(self):
+        for name in ("none", "atomic", "fsync"):
+            self.assertEqual(name, get_durability(name))
+        with self.assertRaises(ValueError):
+            get_durability("paranoid")
+
+    def test_replace_file(self):
+        with open(self.path, "w") as f:
+            f.write("old")
+        for level in ("atomic", "fsync"):
+            with open(self.path + ".tmp", "w") as f:
+                f.write(level)
+            replace_file(self.path + ".tmp", self.path, level)
+            self.assertFalse(os.path.exists(self.path + ".tmp"))
+            with open(self.path, "r") as f:
+                self.assertEqual(level, f.read())
+
+    def test_sync(self):
+        with open(self.path, "w") as f:
+            f.write("{}")
+        sync_file(self.path)
+        sync_dir(self.path)
+        sync_dir(os.path.join(self.tmp_dir, "missing", "file.json"))
+
+
+class TestGroupCommit(unittest.TestCase):
+    """
+    Unittests for testing the grouping of concurrent saves.
+    """
+
+    def test_sequential(self):
+        group = GroupCommit()
+        calls = []
+        for i in range(3):
+            group.run(lambda: calls.append(i))
+        self.assertEqual([0, 1, 2], calls)
+        self.assertEqual(3, group.writes)
+
+    def test_concurrent_saves_grouped(self):
+        group = GroupCommit()
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def slow_write():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+
+        leader = threading.Thread(target=group.run, args=(slow_write,))
+        leader.start()
+        self.assertTrue(started.wait(5))
+        followers = [
+            threading.Thread(target=group.run,
+                             args=(lambda: calls.append(2),))
+            for i in range(8)
+        ]
+        for thread in followers:
+            thread.start()
+        while group.requested < 9:
+            release.wait(0.01)
+        release.set()
+        leader.join()
+        for thread in followers:
+            thread.join()
+        self.assertEqual(2, group.writes)
+        self.assertEqual(2, len(calls))
+        self.assertEqual(9, group.done)
+
+    def test_failed_write_retried(self):
+        group = GroupCommit()
+
+        def failing():
+            raise OSError("disk full")
+
+        with self.assertRaises(OSError):
+            group.run(failing)
+        self.assertFalse(group.running)
+        self.assertEqual(0, group.done)
+        calls = []
+        group.run(lambda: calls.append(1))
+        self.assertEqual([1], calls)
+        self.assertEqual(2, group.done)
+
+
+if __name__ == "__main__":
+    unittest.main()
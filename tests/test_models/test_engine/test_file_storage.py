@@ -4,16 +4,29 @@ Unittests for FileStorage class
 """
 import os
 import json
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
 import models
 import unittest
+from unittest.mock import patch
 from models.base_model import BaseModel
+from models.engine.codec import get_codec
+from models.engine.compression import get_compression
+from models.engine.durability import replace_file
 from models.engine.file_storage import FileStorage
+from models.engine.lazy import LazyObjects
+from models.engine.shards import shard_name
 from models.user import User
 from models.state import State
 from models.place import Place
 from models.city import City
 from models.amenity import Amenity
 from models.review import Review
+from .. import close_storage
 
 
 class TestFileStorage_instantiation(unittest.TestCase):
@@ -50,6 +63,7 @@ class TestFileStorage_methods(unittest.TestCase):
             pass
 
     def tearDown(self):
+        close_storage()
         try:
             os.remove("file.json")
         except FileNotFoundError:
@@ -64,8 +78,183 @@ class TestFileStorage_methods(unittest.TestCase):
         self.assertEqual(dict, type(models.storage.all()))
 
     def test_all_with_arg(self):
+        self.assertIs(models.storage.all(), models.storage.all(None))
         with self.assertRaises(TypeError):
-            models.storage.all(None)
+            models.storage.all(None, None)
+
+    def test_all_cls(self):
+        my_user = User()
+        my_state = State()
+        other_state = State()
+        self.assertEqual({"User." + my_user.id: my_user},
+                         models.storage.all(User))
+        self.assertEqual(
+            {"State." + my_state.id: my_state,
+             "State." + other_state.id: other_state},
+            models.storage.all("State")
+        )
+        self.assertEqual({}, models.storage.all(City))
+
+    def test_count(self):
+        User()
+        my_state = State()
+        State()
+        self.assertEqual(3, models.storage.count())
+        self.assertEqual(2, models.storage.count(State))
+        self.assertEqual(1, models.storage.count("User"))
+        models.storage.delete(my_state)
+        self.assertEqual(1, models.storage.count(State))
+        self.assertEqual(0, models.storage.count(Review))
+
+    def test_lookup(self):
+        my_state = State()
+        my_city = City()
+        my_city.state_id = my_state.id
+        other_city = City()
+        self.assertEqual({"City." + my_city.id: my_city},
+                         models.storage.lookup(City, "state_id", my_state.id))
+        other_city.state_id = my_state.id
+        my_city.state_id = "other"
+        self.assertEqual(
+            {"City." + other_city.id: other_city},
+            models.storage.lookup("City", "state_id", my_state.id)
+        )
+        new_city = City(state_id=my_state.id)
+        self.assertIn("City." + new_city.id,
+                      models.storage.lookup(City, "state_id", my_state.id))
+        models.storage.delete(other_city)
+        self.assertEqual(
+            ["City." + new_city.id],
+            list(models.storage.lookup(City, "state_id", my_state.id))
+        )
+        self.assertEqual({}, models.storage.lookup(City, "state_id", "x"))
+
+    def test_range_index(self):
+        cheap = Place(price_by_night=10)
+        dear = Place(price_by_night=90)
+        index = models.storage.index(Place, "price_by_night", "range")
+        self.assertIs(index, models.storage.index("Place", "price_by_night",
+                                                  "range"))
+        self.assertIsNot(index, models.storage.index(Place, "price_by_night"))
+        self.assertEqual(["Place." + dear.id], list(index.range(low=50)))
+        cheap.price_by_night = 100
+        self.assertEqual(["Place." + cheap.id, "Place." + dear.id],
+                         list(index.range(low=50, reverse=True)))
+        models.storage.delete(dear)
+        self.assertEqual(1, index.count())
+        with self.assertRaises(ValueError):
+            models.storage.index(Place, "price_by_night", "btree")
+
+    def test_columns(self):
+        Place(price_by_night=100, city_id="a")
+        dear = Place(price_by_night=300, city_id="b")
+        store = models.storage.columns(Place)
+        self.assertIs(store, models.storage.columns("Place"))
+        self.assertEqual(400, store.sum("price_by_night"))
+        dear.price_by_night = 200
+        Place(price_by_night=50, city_id="a")
+        self.assertEqual({"a": 75, "b": 200},
+                         store.group_by("city_id", "price_by_night", "mean"))
+        models.storage.delete(dear)
+        self.assertEqual(150, store.sum("price_by_night"))
+        # The columns are copied while no thread adds a row
+        self.assertEqual(models.storage.reading, store.reading)
+        with self.assertRaises(ValueError):
+            models.storage.columns(User)
+
+    def test_geo_index(self):
+        place = Place(latitude=10.0, longitude=20.0)
+        index = models.storage.index(Place, ("latitude", "longitude"), "geo")
+        self.assertEqual(["Place." + place.id], index.box(9, 19, 11, 21))
+        place.longitude = 30.0
+        self.assertEqual([], index.box(9, 19, 11, 21))
+        self.assertEqual(["Place." + place.id], index.box(9, 29, 11, 31))
+        models.storage.delete(place)
+        self.assertEqual({}, index.cells)
+
+    def test_batch(self):
+        my_user = User()
+        models.storage.save()
+        with models.storage.batch() as storage:
+            self.assertIs(models.storage, storage)
+            self.assertTrue(models.storage.in_transaction())
+            my_user.first_name = "Betty"
+            my_user.save()
+            my_place = Place()
+            my_place.save()
+            with open("file.json", "r") as f:
+                self.assertNotIn("Place." + my_place.id, json.load(f))
+        self.assertFalse(models.storage.in_transaction())
+        with open("file.json", "r") as f:
+            saved = json.load(f)
+        self.assertIn("Place." + my_place.id, saved)
+        self.assertEqual("Betty", saved["User." + my_user.id]["first_name"])
+
+    def test_batch_rolls_back(self):
+        my_user = User()
+        my_user.first_name = "Betty"
+        other_user = User()
+        models.storage.save()
+        with self.assertRaises(KeyError):
+            with models.storage.batch():
+                my_user.first_name = "Holberton"
+                my_user.last_name = "School"
+                models.storage.delete(other_user)
+                City(state_id="s")
+                raise KeyError("stop")
+        self.assertFalse(models.storage.in_transaction())
+        self.assertEqual("Betty", my_user.first_name)
+        self.assertNotIn("last_name", my_user.__dict__)
+        self.assertIs(other_user,
+                      models.storage.all()["User." + other_user.id])
+        self.assertEqual(0, models.storage.count(City))
+        self.assertEqual({}, models.storage.lookup(City, "state_id", "s"))
+        models.storage.save()
+        with open("file.json", "r") as f:
+            self.assertEqual(2, len(json.load(f)))
+
+    def test_rollback(self):
+        my_place = Place(price_by_night=10)
+        index = models.storage.index(Place, "price_by_night", "range")
+        models.storage.begin()
+        models.storage.begin()
+        my_place.price_by_night = 99
+        models.storage.commit()
+        self.assertTrue(models.storage.in_transaction())
+        models.storage.save()
+        self.assertFalse(os.path.isfile("file.json"))
+        models.storage.rollback()
+        self.assertEqual(10, my_place.price_by_night)
+        self.assertEqual(["Place." + my_place.id], list(index.range(high=10)))
+        self.assertIn(my_place, FileStorage._FileStorage__dirty)
+        with self.assertRaises(ValueError):
+            models.storage.commit()
+        with self.assertRaises(ValueError):
+            models.storage.rollback()
+
+    def test_lookup_follows_reload(self):
+        my_place = Place()
+        my_place.user_id = "u1"
+        my_review = Review()
+        my_review.place_id = my_place.id
+        self.assertEqual(1, len(models.storage.lookup(Place, "user_id", "u1")))
+        models.storage.save()
+        FileStorage._FileStorage__objects = {}
+        self.assertEqual({}, models.storage.lookup(Place, "user_id", "u1"))
+        models.storage.reload()
+        reviews = models.storage.lookup(Review, "place_id", my_place.id)
+        self.assertEqual(["Review." + my_review.id], list(reviews))
+        self.assertIsNot(my_review, reviews["Review." + my_review.id])
+        self.assertEqual(1, len(models.storage.lookup(Place, "user_id", "u1")))
+
+    def test_class_index_follows_reload(self):
+        my_user = User()
+        models.storage.save()
+        FileStorage._FileStorage__objects = {}
+        self.assertEqual(0, models.storage.count(User))
+        models.storage.reload()
+        self.assertEqual(1, models.storage.count(User))
+        self.assertIn("User." + my_user.id, models.storage.all(User))
 
     def test_new(self):
         my_base_model = BaseModel()
@@ -169,6 +358,1046 @@ class TestFileStorage_methods(unittest.TestCase):
         with self.assertRaises(TypeError):
             models.storage.reload(None)
 
+    def test_reload_skips_malformed_records(self):
+        my_user = User()
+        my_state = State()
+        models.storage.save()
+        with open("file.json", "r") as f:
+            text = f.read()
+        with open("file.json", "w") as f:
+            f.write('{"Nope.1": {"id": "1"}, "User.2": {"id": 2,}, ' +
+                    text[1:])
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        self.assertIn("User." + my_user.id, models.storage.all())
+        self.assertIn("State." + my_state.id, models.storage.all())
+        self.assertNotIn("User.2", models.storage.all())
+
+    def test_reload_relationship_attributes(self):
+        # As stored by a version without the relationship properties
+        my_state = State()
+        my_city = City()
+        models.storage.save()
+        with open("file.json", "r") as f:
+            saved = json.load(f)
+        saved["State." + my_state.id]["cities"] = ["stale"]
+        saved["City." + my_city.id]["places"] = ["stale"]
+        with open("file.json", "w") as f:
+            json.dump(saved, f)
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        self.assertIn("State." + my_state.id, models.storage.all())
+        self.assertIn("City." + my_city.id, models.storage.all())
+        models.storage.save()
+        with open("file.json", "r") as f:
+            saved = json.load(f)
+        self.assertIn("State." + my_state.id, saved)
+        self.assertNotIn("cities", saved["State." + my_state.id])
+
+    def test_delete(self):
+        my_user = User()
+        models.storage.delete(my_user)
+        self.assertNotIn("User." + my_user.id, models.storage.all())
+        models.storage.delete(None)
+
+
+class TestFileStorage_dirty(unittest.TestCase):
+    """
+    Unittests for testing the dirty tracking of the FileStorage class.
+    """
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp.json")
+        except FileNotFoundError:
+            pass
+
+    def tearDown(self):
+        close_storage()
+        try:
+            os.remove("file.json")
+        except FileNotFoundError:
+            pass
+        try:
+            os.rename("tmp.json", "file.json")
+        except FileNotFoundError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def test_assignment_marks_dirty(self):
+        my_user = User()
+        models.storage.save()
+        self.assertNotIn(my_user, FileStorage._FileStorage__dirty)
+        my_user.first_name = "Betty"
+        self.assertIn(my_user, FileStorage._FileStorage__dirty)
+
+    def test_save_marks_dirty_then_clean(self):
+        my_user = User()
+        models.storage.save()
+        my_user.save()
+        self.assertNotIn(my_user, FileStorage._FileStorage__dirty)
+
+    def test_save_encodes_only_dirty_objects(self):
+        my_user = User()
+        my_state = State()
+        models.storage.save()
+        calls = []
+        to_dict = User.to_dict
+
+        def counting_to_dict(obj):
+            calls.append(obj)
+            return to_dict(obj)
+
+        User.to_dict = counting_to_dict
+        try:
+            my_state.name = "California"
+            models.storage.save()
+        finally:
+            del User.to_dict
+        self.assertEqual([], calls)
+        with open("file.json", "r") as f:
+            saved = json.load(f)
+        self.assertEqual("California", saved["State." + my_state.id]["name"])
+        self.assertIn("User." + my_user.id, saved)
+
+    def test_save_writes_valid_json(self):
+        my_user = User()
+        my_user.first_name = "Bétty"
+        models.storage.save()
+        with open("file.json", "r") as f:
+            saved = json.load(f)
+        self.assertEqual("Bétty", saved["User." + my_user.id]["first_name"])
+
+
+class TestFileStorage_journal(unittest.TestCase):
+    """
+    Unittests for testing the journal mode of the FileStorage class.
+    """
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp.json")
+        except FileNotFoundError:
+            pass
+        FileStorage._FileStorage__journal = True
+
+    def tearDown(self):
+        FileStorage._FileStorage__journal = False
+        FileStorage._FileStorage__compact_records = 10000
+        models.storage.compact()
+        close_storage()
+        for path in ("file.json", "file.json.log"):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        try:
+            os.rename("tmp.json", "file.json")
+        except FileNotFoundError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def test_save_appends_only_changes(self):
+        my_user = User()
+        my_user.save()
+        my_state = State()
+        my_state.save()
+        self.assertFalse(os.path.isfile("file.json"))
+        with open("file.json.log", "r") as f:
+            lines = f.readlines()
+        self.assertEqual(2, len(lines))
+        self.assertIn("User." + my_user.id, lines[0])
+        self.assertIn("State." + my_state.id, lines[1])
+
+    def test_fold_finished_at_exit(self):
+        tmp_dir = tempfile.mkdtemp()
+        env = dict(os.environ, PYTHONPATH=os.getcwd(),
+                   HBNB_STORAGE_JOURNAL="1", HBNB_STORAGE_COMPACT_RECORDS="5")
+        try:
+            subprocess.run(
+                [sys.executable, "-c",
+                 "from models.user import User\n"
+                 "for i in range(12):\n"
+                 "    User().save()\n"],
+                cwd=tmp_dir, env=env, check=True
+            )
+            names = sorted(os.listdir(tmp_dir))
+            self.assertNotIn("file.json.log.sealed", names)
+            self.assertEqual([], [name for name in names
+                                  if name.endswith((".fold", ".tmp"))])
+            with open(os.path.join(tmp_dir, "file.json"), "r") as f:
+                saved = json.load(f)
+            logged = []
+            if "file.json.log" in names:
+                with open(os.path.join(tmp_dir, "file.json.log"), "r") as f:
+                    logged = f.readlines()
+            self.assertEqual(12, len(saved) + len(logged))
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    def test_change_after_delete(self):
+        my_state = State()
+        my_state.save()
+        models.storage.delete(my_state)
+        my_state.name = "California"
+        models.storage.save()
+        with open("file.json.log", "r") as f:
+            self.assertEqual(2, len(f.readlines()))
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        self.assertNotIn("State." + my_state.id, models.storage.all())
+
+    def test_reload_replays_log(self):
+        my_user = User()
+        my_user.first_name = "Betty"
+        my_user.save()
+        my_state = State()
+        my_state.save()
+        models.storage.delete(my_state)
+        models.storage.save()
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        objs = models.storage.all()
+        self.assertEqual("Betty", objs["User." + my_user.id].first_name)
+        self.assertNotIn("State." + my_state.id, objs)
+
+    def test_compact(self):
+        my_user = User()
+        my_user.save()
+        models.storage.compact()
+        self.assertFalse(os.path.isfile("file.json.log"))
+        with open("file.json", "r") as f:
+            self.assertIn("User." + my_user.id, f.read())
+
+    def test_background_compaction(self):
+        FileStorage._FileStorage__compact_records = 2
+        my_users = [User(), User()]
+        models.storage.save()
+        FileStorage._FileStorage__compactor.wait()
+        my_user = User()
+        my_user.save()
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        for user in my_users + [my_user]:
+            self.assertIn("User." + user.id, models.storage.all())
+        with open("file.json", "r") as f:
+            self.assertIn("User." + my_users[0].id, f.read())
+
+    def test_snapshot_save_folds_log(self):
+        my_user = User()
+        my_user.save()
+        FileStorage._FileStorage__journal = False
+        models.storage.save()
+        self.assertFalse(os.path.isfile("file.json.log"))
+        with open("file.json", "r") as f:
+            self.assertIn("User." + my_user.id, f.read())
+
 
 if __name__ == "__main__":
     unittest.main()
+
+
+class TestFileStorage_write_behind(unittest.TestCase):
+    """
+    Unittests for testing the write-behind saves of the FileStorage class.
+    """
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp.json")
+        except FileNotFoundError:
+            pass
+        FileStorage._FileStorage__write_behind = True
+        FileStorage._FileStorage__flush_interval = 60
+
+    def tearDown(self):
+        flusher = FileStorage._FileStorage__flusher
+        if flusher is not None:
+            flusher.close()
+        FileStorage._FileStorage__flusher = None
+        FileStorage._FileStorage__write_behind = False
+        FileStorage._FileStorage__flush_interval = 1.0
+        close_storage()
+        try:
+            os.remove("file.json")
+        except FileNotFoundError:
+            pass
+        try:
+            os.rename("tmp.json", "file.json")
+        except FileNotFoundError:
+            pass
+
+    def test_save_deferred(self):
+        user = User()
+        user.save()
+        self.assertFalse(os.path.isfile("file.json"))
+        models.storage.flush()
+        with open("file.json", "r") as f:
+            self.assertIn("User." + user.id, json.load(f))
+
+    def test_flushed_in_background(self):
+        FileStorage._FileStorage__flush_interval = 0.01
+        user = User()
+        user.save()
+        flusher = FileStorage._FileStorage__flusher
+        deadline = time.monotonic() + 5
+        while not flusher.flushes and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(1, flusher.flushes)
+        with open("file.json", "r") as f:
+            self.assertIn("User." + user.id, json.load(f))
+
+    def test_transaction(self):
+        user = User()
+        with models.storage.batch():
+            user.first_name = "Betty"
+            user.save()
+        flusher = FileStorage._FileStorage__flusher
+        self.assertEqual(0, flusher.flushes)
+        models.storage.flush()
+        with open("file.json", "r") as f:
+            self.assertEqual(
+                "Betty", json.load(f)["User." + user.id]["first_name"])
+
+    def test_change_during_flush(self):
+        user = User()
+        user.save()
+        writing = threading.Event()
+        release = threading.Event()
+        changed = threading.Event()
+        encode = FileStorage._FileStorage__encode
+
+        def slow_encode(key, obj):
+            writing.set()
+            release.wait(5)
+            return encode(key, obj)
+
+        def change():
+            user.first_name = "Betty"
+            changed.set()
+
+        with patch.object(FileStorage, "_FileStorage__encode",
+                          staticmethod(slow_encode)):
+            flush = threading.Thread(target=models.storage.flush)
+            flush.start()
+            try:
+                self.assertTrue(writing.wait(5))
+                threading.Thread(target=change).start()
+                # Flagged while the flush is still writing
+                self.assertTrue(changed.wait(5))
+            finally:
+                release.set()
+                flush.join()
+        user.save()
+        models.storage.flush()
+        with open("file.json", "r") as f:
+            self.assertEqual(
+                "Betty", json.load(f)["User." + user.id]["first_name"])
+
+    def test_quit_flushes(self):
+        from console import HBNBCommand
+        user = User()
+        user.save()
+        self.assertTrue(HBNBCommand().onecmd("quit"))
+        self.assertTrue(os.path.isfile("file.json"))
+
+
+class TestFileStorage_durability(unittest.TestCase):
+    """
+    Unittests for testing the durability levels of the FileStorage class.
+    """
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp.json")
+        except FileNotFoundError:
+            pass
+
+    def tearDown(self):
+        FileStorage._FileStorage__durability = "atomic"
+        FileStorage._FileStorage__journal = False
+        close_storage()
+        for path in ("file.json", "file.json.log", "file.json.tmp"):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        try:
+            os.rename("tmp.json", "file.json")
+        except FileNotFoundError:
+            pass
+
+    def saved(self):
+        with open("file.json", "r") as f:
+            return json.load(f)
+
+    def test_levels(self):
+        for level in ("none", "atomic", "fsync"):
+            FileStorage._FileStorage__durability = level
+            user = User()
+            user.save()
+            self.assertIn("User." + user.id, self.saved())
+            self.assertFalse(os.path.exists("file.json.tmp"))
+
+    def test_concurrent_saves_grouped(self):
+        places = [Place() for i in range(8)]
+        models.storage.save()
+        group = FileStorage._FileStorage__group
+        writes = group.writes
+
+        def slow_replace(tmp_path, path, level):
+            time.sleep(0.02)
+            replace_file(tmp_path, path, level)
+
+        def save_many(place):
+            for i in range(5):
+                place.price_by_night = i
+                place.save()
+
+        threads = [threading.Thread(target=save_many, args=(place,))
+                   for place in places]
+        with patch("models.engine.file_storage.replace_file",
+                   slow_replace):
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        # Each write covers the saves of every waiting thread
+        self.assertLess(group.writes - writes, 20)
+        self.assertEqual(4, self.saved()["Place." + places[0].id]
+                         ["price_by_night"])
+
+    def test_atomic_keeps_old_file(self):
+        user = User()
+        user.save()
+        os.mkdir("file.json.tmp")
+        try:
+            with self.assertRaises(OSError):
+                User().save()
+        finally:
+            os.rmdir("file.json.tmp")
+        self.assertIn("User." + user.id, self.saved())
+
+    def test_fsync_journal(self):
+        FileStorage._FileStorage__durability = "fsync"
+        FileStorage._FileStorage__journal = True
+        user = User()
+        user.save()
+        with open("file.json.log", "r") as f:
+            self.assertIn(user.id, f.read())
+        models.storage.compact()
+
+
+class TestFileStorage_threads(unittest.TestCase):
+    """
+    Unittests for testing the FileStorage class used by many threads.
+    """
+
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+        # Switches threads often, for the races to show up
+        self.interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+
+    def tearDown(self):
+        sys.setswitchinterval(self.interval)
+        FileStorage._FileStorage__objects = {}
+
+    def test_snapshot(self):
+        my_user = User()
+        objs = models.storage.all()
+        self.assertIs(objs, models.storage.all())
+        my_state = State()
+        self.assertNotIn("State." + my_state.id, objs)
+        self.assertIn("State." + my_state.id, models.storage.all())
+        models.storage.delete(my_user)
+        self.assertIn("User." + my_user.id, objs)
+
+    def test_read_while_writing(self):
+        for i in range(50):
+            Place(city_id=str(i % 5), price_by_night=i)
+        errors = []
+        done = threading.Event()
+
+        def write():
+            try:
+                places = []
+                for i in range(2000):
+                    place = Place(city_id=str(i % 5), price_by_night=i)
+                    place.price_by_night = i + 1
+                    places.append(place)
+                for place in places:
+                    models.storage.delete(place)
+            except Exception as error:
+                errors.append(error)
+            finally:
+                done.set()
+
+        def read():
+            try:
+                while not done.is_set():
+                    for obj in models.storage.all().values():
+                        obj.id
+                    models.storage.all(Place)
+                    models.storage.lookup(Place, "city_id", "1")
+                    models.storage.query(Place).filter(
+                        price_by_night__lt=20).all()
+            except Exception as error:
+                errors.append(error)
+
+        threads = [threading.Thread(target=write)] + \
+            [threading.Thread(target=read) for i in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(30)
+        self.assertEqual([], errors)
+        self.assertEqual(50, models.storage.count(Place))
+        self.assertEqual(10, len(models.storage.lookup(Place, "city_id",
+                                                       "1")))
+
+
+class TestFileStorage_processes(unittest.TestCase):
+    """
+    Unittests for testing the FileStorage class shared by many processes.
+    """
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp.json")
+        except FileNotFoundError:
+            pass
+        FileStorage._FileStorage__objects = {}
+        self.my_user = User()
+        self.my_user.first_name = "Betty"
+        self.my_state = State()
+        models.storage.save()
+
+    def tearDown(self):
+        FileStorage._FileStorage__lazy = False
+        close_storage()
+        for path in ("file.json", "file.json.idx"):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        try:
+            os.rename("tmp.json", "file.json")
+        except FileNotFoundError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def other_process(self, code, **env):
+        """
+        Runs code in another process using the same files, with
+        more environment variables, and returns what it printed.
+        """
+        code = "from models import storage\n" \
+            "from models.city import City\n" + code
+        return subprocess.run(
+            [sys.executable, "-c", code], check=True,
+            env=dict(os.environ, **env), capture_output=True, text=True
+        ).stdout.strip()
+
+    def saved(self):
+        with open("file.json", "r") as f:
+            return json.load(f)
+
+    def test_changed(self):
+        self.assertFalse(models.storage.changed())
+        self.assertEqual(0, models.storage.refresh())
+        self.other_process("City().save()")
+        self.assertTrue(models.storage.changed())
+        models.storage.save()
+        self.assertFalse(models.storage.changed())
+
+    def test_lock_file_created_by_save(self):
+        close_storage()
+        models.storage.reload()
+        self.assertFalse(models.storage.changed())
+        self.assertFalse(os.path.isfile("file.json.lock"))
+        self.other_process("City().save()")
+        # Saved by the other process since the reload
+        self.assertTrue(models.storage.changed())
+        self.assertEqual(1, models.storage.refresh())
+        self.assertTrue(os.path.isfile("file.json.lock"))
+
+    def test_save_merges(self):
+        city_id = self.other_process(
+            "user = storage.all()['User.{}']\n"
+            "user.first_name = 'Holberton'\n"
+            "user.save()\n"
+            "city = City()\n"
+            "city.save()\n"
+            "print(city.id)".format(self.my_user.id)
+        )
+        my_place = Place()
+        models.storage.save()
+        saved = self.saved()
+        self.assertEqual("Holberton",
+                         saved["User." + self.my_user.id]["first_name"])
+        self.assertIn("City." + city_id, saved)
+        self.assertIn("Place." + my_place.id, saved)
+        self.assertIn("State." + self.my_state.id, saved)
+        self.assertIn("City." + city_id, models.storage.all())
+
+    def test_refresh(self):
+        city_id = self.other_process(
+            "storage.delete(storage.all()['State.{}'])\n"
+            "city = City()\n"
+            "city.save()\n"
+            "print(city.id)".format(self.my_state.id)
+        )
+        objs = models.storage.all()
+        self.assertEqual(2, models.storage.refresh())
+        self.assertFalse(models.storage.changed())
+        self.assertNotIn("State." + self.my_state.id, models.storage.all())
+        self.assertIn("City." + city_id, models.storage.all())
+        self.assertIn("State." + self.my_state.id, objs)
+        self.assertEqual(1, models.storage.count(City))
+        # The unchanged instances are kept, not decoded again
+        self.assertIs(self.my_user,
+                      models.storage.all()["User." + self.my_user.id])
+
+    def test_refresh_keeps_local_changes(self):
+        self.my_user.first_name = "Local"
+        self.other_process(
+            "user = storage.all()['User.{}']\n"
+            "user.first_name = 'Remote'\n"
+            "user.save()".format(self.my_user.id)
+        )
+        self.assertEqual(0, models.storage.refresh())
+        self.assertEqual("Local", self.my_user.first_name)
+        models.storage.save()
+        self.assertEqual("Local",
+                         self.saved()["User." + self.my_user.id]["first_name"])
+
+    def test_refresh_journal(self):
+        FileStorage._FileStorage__journal = True
+        try:
+            city_id = self.other_process(
+                "city = City()\n"
+                "city.save()\n"
+                "print(city.id)", HBNB_STORAGE_JOURNAL="1"
+            )
+            my_place = Place()
+            models.storage.save()
+            self.assertTrue(models.storage.changed())
+            self.assertEqual(1, models.storage.refresh())
+            self.assertIn("City." + city_id, models.storage.all())
+            self.assertIn("Place." + my_place.id, models.storage.all())
+        finally:
+            FileStorage._FileStorage__journal = False
+            try:
+                os.remove("file.json.log")
+            except FileNotFoundError:
+                pass
+
+    def test_refresh_lazy(self):
+        FileStorage._FileStorage__lazy = True
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        self.other_process(
+            "user = storage.all()['User.{}']\n"
+            "user.first_name = 'Holberton'\n"
+            "user.save()\n"
+            "City().save()".format(self.my_user.id)
+        )
+        self.assertEqual(2, models.storage.refresh())
+        objs = FileStorage._FileStorage__objects
+        self.assertIsInstance(objs, LazyObjects)
+        self.assertEqual(3, len(objs))
+        user = models.storage.all()["User." + self.my_user.id]
+        self.assertEqual("Holberton", user.first_name)
+        self.assertEqual(1, len(models.storage.all(City)))
+        self.assertIn("State." + self.my_state.id, models.storage.all())
+
+
+class TestFileStorage_shards(unittest.TestCase):
+    """
+    Unittests for testing the sharded layout of the FileStorage class.
+    """
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp.json")
+        except FileNotFoundError:
+            pass
+        FileStorage._FileStorage__shards = 2
+
+    def tearDown(self):
+        FileStorage._FileStorage__shards = 0
+        shutil.rmtree("file.json.d", ignore_errors=True)
+        close_storage()
+        try:
+            os.rename("tmp.json", "file.json")
+        except FileNotFoundError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def test_save_writes_one_file_per_class_partition(self):
+        my_user = User()
+        my_state = State()
+        models.storage.save()
+        self.assertFalse(os.path.isfile("file.json"))
+        names = os.listdir("file.json.d")
+        self.assertIn(shard_name("User." + my_user.id, 2), names)
+        self.assertIn(shard_name("State." + my_state.id, 2), names)
+
+    def test_save_rewrites_only_changed_shards(self):
+        my_user = User()
+        my_state = State()
+        models.storage.save()
+        user_path = os.path.join(
+            "file.json.d", shard_name("User." + my_user.id, 2)
+        )
+        state_path = os.path.join(
+            "file.json.d", shard_name("State." + my_state.id, 2)
+        )
+        os.utime(user_path, ns=(0, 0))
+        os.utime(state_path, ns=(0, 0))
+        my_state.name = "California"
+        models.storage.save()
+        self.assertEqual(0, os.stat(user_path).st_mtime_ns)
+        self.assertNotEqual(0, os.stat(state_path).st_mtime_ns)
+
+    def test_reload(self):
+        my_user = User()
+        my_place = Place()
+        models.storage.save()
+        models.storage.delete(my_place)
+        models.storage.save()
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        self.assertIn("User." + my_user.id, models.storage.all())
+        self.assertNotIn("Place." + my_place.id, models.storage.all())
+
+    def test_reload_with_workers(self):
+        my_user = User()
+        my_state = State()
+        models.storage.save()
+        # Decodes the shards in a process pool, even with one CPU,
+        # already for the first load of the storage
+        code = "import os\n" \
+            "os.cpu_count = lambda: 4\n" \
+            "from models.engine import shards\n" \
+            "pools = []\n" \
+            "class Pool(shards.ProcessPoolExecutor):\n" \
+            "    def __init__(self, *args, **kwargs):\n" \
+            "        pools.append(self)\n" \
+            "        super().__init__(*args, **kwargs)\n" \
+            "shards.ProcessPoolExecutor = Pool\n" \
+            "from models import storage\n" \
+            "print(len(pools), len(storage.all()))\n" \
+            "storage.reload()\n" \
+            "print(len(pools), len(storage.all()))"
+        env = dict(os.environ, HBNB_STORAGE_SHARDS="2")
+        output = subprocess.run(
+            [sys.executable, "-c", code], env=env, check=True,
+            capture_output=True, text=True, timeout=60
+        ).stdout
+        self.assertEqual("1 2\n2 2\n", output)
+
+
+class TestFileStorage_lazy(unittest.TestCase):
+    """
+    Unittests for testing the lazy mode of the FileStorage class.
+    """
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp.json")
+        except FileNotFoundError:
+            pass
+        FileStorage._FileStorage__lazy = True
+        self.my_user = User()
+        self.my_user.first_name = "Betty"
+        self.my_place = Place()
+        models.storage.save()
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+
+    def tearDown(self):
+        FileStorage._FileStorage__lazy = False
+        close_storage()
+        for path in ("file.json", "file.json.idx"):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        try:
+            os.rename("tmp.json", "file.json")
+        except FileNotFoundError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def test_reload_decodes_nothing(self):
+        objs = models.storage.all()
+        self.assertIsInstance(objs, LazyObjects)
+        self.assertIn("User." + self.my_user.id, objs)
+        self.assertEqual(2, objs.stubs())
+
+    def test_lookup_decodes_one(self):
+        objs = models.storage.all()
+        my_user = objs["User." + self.my_user.id]
+        self.assertEqual("Betty", my_user.first_name)
+        self.assertIs(my_user, objs["User." + self.my_user.id])
+        self.assertEqual(1, objs.stubs())
+
+    def test_save_keeps_stubs(self):
+        objs = models.storage.all()
+        objs["User." + self.my_user.id].first_name = "Holberton"
+        my_state = State()
+        models.storage.save()
+        self.assertEqual(1, objs.stubs())
+        my_place = objs["Place." + self.my_place.id]
+        self.assertEqual(self.my_place.id, my_place.id)
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        objs = models.storage.all()
+        self.assertEqual(3, objs.stubs())
+        self.assertEqual(
+            "Holberton", objs["User." + self.my_user.id].first_name
+        )
+        self.assertIn("State." + my_state.id, objs)
+
+    def test_reload_without_index(self):
+        os.remove("file.json.idx")
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        objs = models.storage.all()
+        self.assertEqual(2, objs.stubs())
+        self.assertEqual("Betty", objs["User." + self.my_user.id].first_name)
+
+    def test_mapped_file(self):
+        FileStorage._FileStorage__mmap_bytes = 0
+        try:
+            FileStorage._FileStorage__objects = {}
+            models.storage.reload()
+            snapshot = FileStorage._FileStorage__snapshot
+            self.assertIsNotNone(snapshot.mapped)
+            objs = models.storage.all()
+            self.assertEqual(
+                "Betty", objs["User." + self.my_user.id].first_name
+            )
+            models.storage.save()
+            self.assertTrue(snapshot.file.closed)
+            self.assertEqual(
+                self.my_place.id, objs["Place." + self.my_place.id].id
+            )
+        finally:
+            FileStorage._FileStorage__mmap_bytes = 1 << 20
+
+    def test_close_closes_snapshot(self):
+        FileStorage._FileStorage__mmap_bytes = 0
+        try:
+            FileStorage._FileStorage__objects = {}
+            models.storage.reload()
+            view = models.storage.all()
+            snapshot = FileStorage._FileStorage__snapshot
+            models.storage.close()
+            self.assertTrue(snapshot.file.closed)
+            self.assertIsNone(snapshot.mapped)
+            self.assertIsNone(FileStorage._FileStorage__snapshot)
+            # Decoded before the file was closed
+            self.assertEqual(0, FileStorage._FileStorage__objects.stubs())
+            self.assertEqual(
+                "Betty", view["User." + self.my_user.id].first_name
+            )
+        finally:
+            FileStorage._FileStorage__mmap_bytes = 1 << 20
+
+    def test_all_cls_decodes_one_class(self):
+        # The stubs of the storage, all() returning a copy
+        objs = FileStorage._FileStorage__objects
+        self.assertEqual(1, models.storage.count(Place))
+        self.assertEqual(2, objs.stubs())
+        self.assertEqual(
+            ["Place." + self.my_place.id], list(models.storage.all(Place))
+        )
+        self.assertEqual(1, objs.stubs())
+
+    def test_delete_stub(self):
+        objs = models.storage.all()
+        models.storage.delete(objs["Place." + self.my_place.id])
+        models.storage.save()
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        self.assertNotIn("Place." + self.my_place.id, models.storage.all())
+
+
+class TestFileStorage_binary(unittest.TestCase):
+    """
+    Unittests for testing the binary codec of the FileStorage class.
+    """
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp.json")
+        except FileNotFoundError:
+            pass
+        FileStorage._FileStorage__codec = get_codec("binary")
+        FileStorage._FileStorage__objects = {}
+        self.my_user = User()
+        self.my_user.first_name = "Bétty"
+        self.my_place = Place()
+        self.my_place.latitude = 37.77
+        models.storage.save()
+
+    def tearDown(self):
+        FileStorage._FileStorage__codec = get_codec("json")
+        FileStorage._FileStorage__lazy = False
+        FileStorage._FileStorage__journal = False
+        close_storage()
+        for path in ("file.bin", "file.bin.idx", "file.json.log"):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        try:
+            os.rename("tmp.json", "file.json")
+        except FileNotFoundError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def test_save_binary(self):
+        self.assertTrue(os.path.isfile("file.bin"))
+        self.assertFalse(os.path.isfile("file.json"))
+        with open("file.bin", "rb") as file:
+            self.assertEqual(b"HBNB", file.read(4))
+
+    def test_reload_binary(self):
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        objs = models.storage.all()
+        my_user = objs["User." + self.my_user.id]
+        self.assertEqual("Bétty", my_user.first_name)
+        self.assertEqual(self.my_user.created_at, my_user.created_at)
+        self.assertEqual(37.77, objs["Place." + self.my_place.id].latitude)
+
+    def test_lazy_binary(self):
+        FileStorage._FileStorage__lazy = True
+        models.storage.save()
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        objs = models.storage.all()
+        self.assertEqual(2, objs.stubs())
+        self.assertEqual("Bétty", objs["User." + self.my_user.id].first_name)
+        os.remove("file.bin.idx")
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        objs = models.storage.all()
+        self.assertEqual(
+            self.my_place.id, objs["Place." + self.my_place.id].id
+        )
+
+    def test_journal_binary(self):
+        FileStorage._FileStorage__journal = True
+        my_state = State()
+        models.storage.save()
+        models.storage.compact()
+        self.assertFalse(os.path.isfile("file.json.log"))
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        self.assertIn("State." + my_state.id, models.storage.all())
+        self.assertIn("User." + self.my_user.id, models.storage.all())
+
+
+class TestFileStorage_compressed(unittest.TestCase):
+    """
+    Unittests for testing the compression of the FileStorage class.
+    """
+
+    def setUp(self):
+        try:
+            os.rename("file.json", "tmp.json")
+        except FileNotFoundError:
+            pass
+        FileStorage._FileStorage__objects = {}
+        self.my_user = User()
+        self.my_user.first_name = "Betty"
+        self.my_place = Place()
+
+    def tearDown(self):
+        FileStorage._FileStorage__compression = get_compression("none")
+        FileStorage._FileStorage__codec = get_codec("json")
+        FileStorage._FileStorage__lazy = False
+        FileStorage._FileStorage__journal = False
+        FileStorage._FileStorage__shards = 0
+        models.storage.close()
+        for name in os.listdir("."):
+            if name.startswith(("file.json.", "file.bin")):
+                try:
+                    os.remove(name)
+                except IsADirectoryError:
+                    shutil.rmtree(name)
+        try:
+            os.rename("tmp.json", "file.json")
+        except FileNotFoundError:
+            pass
+        FileStorage._FileStorage__objects = {}
+
+    def reload(self):
+        FileStorage._FileStorage__objects = {}
+        models.storage.reload()
+        return models.storage.all()
+
+    def test_save_and_reload(self):
+        for name, extension in (("zlib", ".gz"), ("lzma", ".xz"),
+                                ("bz2", ".bz2")):
+            compression = get_compression(name, 1)
+            FileStorage._FileStorage__compression = compression
+            models.storage.save()
+            self.assertTrue(os.path.isfile("file.json" + extension))
+            self.assertFalse(os.path.isfile("file.json"))
+            objs = self.reload()
+            self.assertEqual(
+                "Betty", objs["User." + self.my_user.id].first_name
+            )
+            self.assertIn("Place." + self.my_place.id, objs)
+
+    def test_binary_codec(self):
+        FileStorage._FileStorage__codec = get_codec("binary")
+        FileStorage._FileStorage__compression = get_compression("zlib")
+        models.storage.save()
+        self.assertTrue(os.path.isfile("file.bin.gz"))
+        self.assertIn("User." + self.my_user.id, self.reload())
+
+    def test_truncated_snapshot(self):
+        FileStorage._FileStorage__compression = get_compression("zlib")
+        for i in range(1000):
+            User()
+        models.storage.save()
+        size = os.path.getsize("file.json.gz")
+        with open("file.json.gz", "r+b") as f:
+            f.truncate(size // 2)
+        objs = self.reload()
+        self.assertLess(0, len(objs))
+        self.assertGreater(1002, len(objs))
+
+    def test_journal(self):
+        FileStorage._FileStorage__compression = get_compression("bz2")
+        FileStorage._FileStorage__journal = True
+        models.storage.save()
+        self.assertTrue(os.path.isfile("file.json.log.bz2"))
+        self.assertIn("User." + self.my_user.id, self.reload())
+        models.storage.compact()
+        self.assertFalse(os.path.isfile("file.json.log.bz2"))
+        self.assertTrue(os.path.isfile("file.json.bz2"))
+        self.assertIn("Place." + self.my_place.id, self.reload())
+
+    def test_shards(self):
+        FileStorage._FileStorage__compression = get_compression("lzma")
+        FileStorage._FileStorage__shards = 2
+        models.storage.save()
+        names = os.listdir("file.json.d")
+        self.assertTrue(all(name.endswith(".json.xz") for name in names))
+        self.assertIn("User." + self.my_user.id, self.reload())
+
+    def test_lazy_mode_not_used(self):
+        FileStorage._FileStorage__compression = get_compression("zlib")
+        FileStorage._FileStorage__lazy = True
+        models.storage.save()
+        objs = self.reload()
+        self.assertNotIsInstance(objs, LazyObjects)
+        self.assertIn("User." + self.my_user.id, objs)
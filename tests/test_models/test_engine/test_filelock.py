@@ -0,0 +1,97 @@
+#!/usr/bin/python3
+"""
+Unittests for the filelock module
+"""
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from models.engine.filelock import FileLock, fcntl
+
+
+class TestFileLock(unittest.TestCase):
+    """
+    Unittests for testing the lock shared by the processes.
+    """
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, "file.json.lock")
+        self.lock = FileLock(self.path)
+
+    def tearDown(self):
+        self.lock.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_generation(self):
+        self.assertTrue(os.path.isfile(self.path))
+        self.assertEqual(0, self.lock.generation())
+        self.assertFalse(self.lock.changed())
+        for generation in range(1, 12):
+            with self.lock.exclusive():
+                self.assertEqual(generation, self.lock.bump())
+        self.assertEqual(11, self.lock.generation())
+        self.assertFalse(self.lock.changed())
+
+    def test_changed_by_other(self):
+        other = FileLock(self.path)
+        try:
+            self.assertEqual(0, other.seen)
+            with other.exclusive():
+                other.bump()
+            self.assertTrue(self.lock.changed())
+            self.assertFalse(other.changed())
+            self.lock.seen = self.lock.generation()
+            self.assertFalse(self.lock.changed())
+            self.assertEqual(1, FileLock(self.path).seen)
+        finally:
+            other.close()
+
+    def test_garbage(self):
+        with open(self.path, "w") as f:
+            f.write("nope")
+        self.assertEqual(0, self.lock.generation())
+        with self.lock.exclusive():
+            self.assertEqual(1, self.lock.bump())
+
+    def test_reentrant(self):
+        with self.lock.exclusive():
+            with self.lock.shared():
+                with self.lock.exclusive():
+                    self.assertEqual(3, self.lock.depth)
+        self.assertEqual(0, self.lock.depth)
+
+    def test_threads_wait(self):
+        events = []
+        with self.lock.exclusive():
+            thread = threading.Thread(target=self.hold, args=(events,))
+            thread.start()
+            thread.join(0.1)
+            self.assertEqual([], events)
+        thread.join()
+        self.assertEqual(["held"], events)
+
+    def hold(self, events):
+        with self.lock.shared():
+            events.append("held")
+
+    @unittest.skipIf(fcntl is None, "no fcntl")
+    def test_other_process_waits(self):
+        # Locks of another open file conflict like another process's
+        fd = os.open(self.path, os.O_RDWR)
+        try:
+            with self.lock.shared():
+                fcntl.flock(fd, fcntl.LOCK_SH | fcntl.LOCK_NB)
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            with self.lock.exclusive():
+                with self.assertRaises(BlockingIOError):
+                    fcntl.flock(fd, fcntl.LOCK_SH | fcntl.LOCK_NB)
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        finally:
+            os.close(fd)
+
+
+if __name__ == "__main__":
+    unittest.main()
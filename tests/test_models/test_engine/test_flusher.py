@@ -0,0 +1,93 @@
+#!/usr/bin/python3
+"""
+Unittests for the flusher module
+"""
+import threading
+import unittest
+from models.engine.flusher import Flusher
+
+
+class TestFlusher(unittest.TestCase):
+    """
+    Unittests for testing the write-behind flusher.
+    """
+
+    def setUp(self):
+        self.calls = 0
+        self.fail = False
+        self.flushed = threading.Event()
+
+    def flush(self):
+        self.calls += 1
+        self.flushed.set()
+        if self.fail:
+            raise OSError("disk full")
+
+    def test_burst_flushed_once(self):
+        flusher = Flusher(self.flush, interval=0.05)
+        for i in range(100):
+            flusher.request(i + 1)
+        self.assertEqual(0, self.calls)
+        self.assertTrue(self.flushed.wait(5))
+        flusher.close()
+        self.assertEqual(1, self.calls)
+        self.assertEqual(1, flusher.flushes)
+        self.assertEqual(0, flusher.pending)
+
+    def test_max_changes(self):
+        flusher = Flusher(self.flush, interval=60, max_changes=10)
+        flusher.request(5)
+        self.assertFalse(self.flushed.wait(0.1))
+        flusher.request(10)
+        self.assertTrue(self.flushed.wait(5))
+        flusher.close()
+        self.assertEqual(1, self.calls)
+
+    def test_flush_now(self):
+        flusher = Flusher(self.flush, interval=60)
+        flusher.flush_now()
+        self.assertEqual(0, self.calls)
+        flusher.request(1)
+        flusher.flush_now()
+        self.assertEqual(1, self.calls)
+        flusher.close()
+        self.assertEqual(1, self.calls)
+
+    def test_close(self):
+        flusher = Flusher(self.flush, interval=60)
+        flusher.request(3)
+        flusher.close()
+        self.assertEqual(1, self.calls)
+        flusher.request(1)
+        self.assertEqual(2, self.calls)
+
+    def test_error_retried(self):
+        self.fail = True
+        flusher = Flusher(self.flush, interval=60)
+        flusher.request(1)
+        with self.assertRaises(OSError):
+            flusher.flush_now()
+        self.assertIsInstance(flusher.error, OSError)
+        self.assertEqual(1, flusher.pending)
+        self.fail = False
+        flusher.flush_now()
+        self.assertIsNone(flusher.error)
+        self.assertEqual(0, flusher.pending)
+        self.assertEqual(2, self.calls)
+        flusher.close()
+
+    def test_close_raises_error(self):
+        self.fail = True
+        flusher = Flusher(self.flush, interval=60)
+        flusher.request(1)
+        with self.assertRaises(OSError):
+            flusher.close()
+        self.assertEqual(1, flusher.pending)
+        self.fail = False
+        flusher.close()
+        self.assertEqual(0, flusher.pending)
+        self.assertEqual(2, self.calls)
+
+
+if __name__ == "__main__":
+    unittest.main()
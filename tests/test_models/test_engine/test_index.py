@@ -0,0 +1,355 @@
+#!/usr/bin/python3
+"""
+Unittests for the index module
+"""
+import unittest
+from models.engine.index import AttributeIndex, BitmapIndex, ClassIndex, \
+    GeoIndex, IndexSet, RangeIndex, TextIndex, distance_km, tokenize
+
+
+class TestClassIndex(unittest.TestCase):
+    """
+    Unittests for testing the index of keys by class.
+    """
+
+    def setUp(self):
+        self.objects = {"User.1": None, "State.1": None, "User.2": None}
+        self.index = ClassIndex()
+        self.index.rebuild(self.objects)
+
+    def test_rebuild(self):
+        self.assertEqual(["User.1", "User.2"], self.index.keys("User"))
+        self.assertEqual(1, self.index.count("State"))
+        self.assertEqual(0, self.index.count("City"))
+        self.assertEqual([], self.index.keys("City"))
+        self.assertTrue(self.index.valid(self.objects))
+
+    def test_add_and_discard(self):
+        self.index.add("User.3")
+        self.index.add("User.3")
+        self.assertEqual(3, self.index.count("User"))
+        self.assertEqual(4, self.index.size)
+        self.index.discard("User.1")
+        self.index.discard("User.1")
+        self.index.discard("City.1")
+        self.assertEqual(["User.2", "User.3"], self.index.keys("User"))
+        self.assertEqual(3, self.index.size)
+
+    def test_valid(self):
+        self.assertFalse(self.index.valid(dict(self.objects)))
+        self.objects["City.1"] = None
+        self.assertFalse(self.index.valid(self.objects))
+        self.index.add("City.1")
+        self.assertTrue(self.index.valid(self.objects))
+
+
+class Obj:
+    """
+    Stand-in for a stored object.
+    """
+
+    def __init__(self, obj_id, **kwargs):
+        self.id = obj_id
+        self.__dict__.update(kwargs)
+
+
+class City(Obj):
+    """
+    Stand-in for a stored city.
+    """
+
+
+class TestAttributeIndex(unittest.TestCase):
+    """
+    Unittests for testing the hash index of an attribute.
+    """
+
+    def setUp(self):
+        self.index = AttributeIndex("City", "state_id")
+
+    def test_add_and_move(self):
+        city = City("1", state_id="a")
+        self.index.add("City.1", city)
+        self.index.add("City.2", City("2", state_id="a"))
+        self.assertEqual(["City.1", "City.2"], self.index.keys("a"))
+        city.state_id = "b"
+        self.index.add("City.1", city)
+        self.assertEqual(["City.2"], self.index.keys("a"))
+        self.assertEqual(["City.1"], self.index.keys("b"))
+
+    def test_discard(self):
+        self.index.add("City.1", City("1", state_id="a"))
+        self.index.discard("City.1")
+        self.index.discard("City.1")
+        self.assertEqual([], self.index.keys("a"))
+        self.assertEqual({}, self.index.buckets)
+
+    def test_cache(self):
+        city = City("1", state_id="a")
+        self.index.add("City.1", city)
+        self.index.cache("a", {"City.1": city})
+        self.index.cache(["a"], {})
+        self.assertEqual({"City.1": city}, self.index.cached("a"))
+        self.assertIsNone(self.index.cached(["a"]))
+        self.index.add("City.2", City("2", state_id="a"))
+        self.assertIsNone(self.index.cached("a"))
+        self.index.cache("a", {})
+        self.index.discard("City.2")
+        self.assertIsNone(self.index.cached("a"))
+
+    def test_unhashable_values(self):
+        self.index.add("City.1", City("1", state_id=["a"]))
+        self.index.add("City.2", City("2"))
+        self.assertEqual({}, self.index.buckets)
+        self.assertEqual([], self.index.keys(["a"]))
+
+
+class TestRangeIndex(unittest.TestCase):
+    """
+    Unittests for testing the sorted index of a numeric attribute.
+    """
+
+    def setUp(self):
+        self.index = RangeIndex("Place", "price_by_night")
+        self.places = [Obj(str(i), price_by_night=price)
+                       for i, price in enumerate((30, 10, 20, 10, 40))]
+        for place in self.places:
+            self.index.add("Place." + place.id, place)
+
+    def test_order(self):
+        self.assertEqual(
+            ["Place.1", "Place.3", "Place.2", "Place.0", "Place.4"],
+            list(self.index.range())
+        )
+        self.assertEqual(
+            ["Place.4", "Place.0", "Place.2", "Place.3", "Place.1"],
+            list(self.index.range(reverse=True))
+        )
+
+    def test_bounds(self):
+        self.assertEqual(["Place.1", "Place.3", "Place.2"],
+                         list(self.index.range(high=20)))
+        self.assertEqual(["Place.2"],
+                         list(self.index.range(10, 30, False, False)))
+        self.assertEqual(["Place.0", "Place.4"],
+                         list(self.index.range(low=25.5)))
+        self.assertEqual(2, self.index.count(10, 10))
+        self.assertEqual(0, self.index.count(35, 15))
+        self.assertEqual(5, self.index.count())
+
+    def test_move_and_discard(self):
+        place = self.places[4]
+        place.price_by_night = 0
+        self.index.add("Place.4", place)
+        self.assertEqual("Place.4", next(self.index.range()))
+        self.index.discard("Place.4")
+        self.index.discard("Place.4")
+        self.assertEqual(4, self.index.count())
+        self.assertEqual(sorted(self.index.sorted_values),
+                         self.index.sorted_values)
+
+    def test_non_numbers(self):
+        for value in ("10", None, True, float("nan"), [1]):
+            self.index.add("Place.9", Obj("9", price_by_night=value))
+            self.assertNotIn("Place.9", self.index.values)
+        self.index.add("Place.1", Obj("1", price_by_night="free"))
+        self.assertEqual(4, self.index.count())
+
+
+class TestGeoIndex(unittest.TestCase):
+    """
+    Unittests for testing the grid index of coordinates.
+    """
+
+    def setUp(self):
+        self.index = GeoIndex("Place")
+        self.points = {
+            "Place.paris": (48.8566, 2.3522),
+            "Place.versailles": (48.8049, 2.1204),
+            "Place.london": (51.5074, -0.1278),
+            "Place.fiji": (-17.7134, 178.0650),
+            "Place.samoa": (-13.7590, -172.1046),
+        }
+        for key, (latitude, longitude) in self.points.items():
+            self.index.add(key, Obj(key, latitude=latitude,
+                                    longitude=longitude))
+
+    def test_distance(self):
+        self.assertAlmostEqual(343.5, distance_km(48.8566, 2.3522,
+                                                  51.5074, -0.1278), 0)
+        self.assertEqual(0, distance_km(1, 2, 1, 2))
+
+    def test_radius(self):
+        found = self.index.radius(48.8566, 2.3522, 50)
+        self.assertEqual(["Place.paris", "Place.versailles"],
+                         [key for distance, key in found])
+        self.assertAlmostEqual(0, found[0][0])
+        self.assertEqual([], self.index.radius(0, 0, 100))
+
+    def test_nearest(self):
+        nearest = self.index.nearest(51.0, 0.0)
+        self.assertEqual("Place.london", next(nearest)[1])
+        self.assertEqual("Place.versailles", next(nearest)[1])
+        self.assertEqual("Place.paris", next(nearest)[1])
+        keys = [key for distance, key in self.index.nearest(-15, 179)]
+        self.assertEqual(["Place.fiji", "Place.samoa"], keys[:2])
+        self.assertEqual(5, len(keys))
+
+    def test_box(self):
+        self.assertEqual(["Place.paris", "Place.versailles"],
+                         self.index.box(48, 2, 49, 3))
+        self.assertEqual(["Place.fiji", "Place.samoa"],
+                         self.index.box(-20, 170, -10, -170))
+        self.assertEqual(5, len(self.index.box(-90, -180, 90, 180)))
+        self.assertEqual(2, self.index.estimate(48, 2, 49, 3))
+
+    def test_move_and_discard(self):
+        self.index.add("Place.london", Obj("london", latitude=48.86,
+                                           longitude=2.35))
+        self.assertEqual(3, len(self.index.radius(48.8566, 2.3522, 50)))
+        self.index.discard("Place.london")
+        self.index.discard("Place.london")
+        self.assertEqual(2, len(self.index.radius(48.8566, 2.3522, 50)))
+        for latitude, longitude in ((None, 1), ("1", 1), (91, 0), (0, 181),
+                                    (True, 0)):
+            self.index.add("Place.x", Obj("x", latitude=latitude,
+                                          longitude=longitude))
+            self.assertNotIn("Place.x", self.index.values)
+
+
+class TestTextIndex(unittest.TestCase):
+    """
+    Unittests for testing the full-text index.
+    """
+
+    def setUp(self):
+        self.index = TextIndex("Place", ("name", "description"))
+        texts = {
+            "1": ("Ocean view", "A flat with a view of the ocean"),
+            "2": ("Loft", "Large loft in the city center"),
+            "3": ("Beach house", "Steps from the ocean"),
+            "4": ("Cabin", None),
+        }
+        for obj_id, (name, description) in texts.items():
+            self.index.add("Place." + obj_id,
+                           Obj(obj_id, name=name, description=description))
+
+    def test_tokenize(self):
+        self.assertEqual(["ocean", "view", "l", "ete", "42"],
+                         tokenize("Océan-VIEW, l'été 42!"))
+        self.assertEqual([], tokenize(" ... "))
+
+    def test_search(self):
+        found = self.index.search("ocean view")
+        self.assertEqual(["Place.1", "Place.3"], [key for s, key in found])
+        self.assertGreater(found[0][0], found[1][0])
+        self.assertEqual(["Place.4"],
+                         [key for s, key in self.index.search("CABIN")])
+        self.assertEqual([], self.index.search("castle"))
+        self.assertEqual(2, self.index.count("ocean view castle"))
+
+    def test_move_and_discard(self):
+        self.index.add("Place.2", Obj("2", name="Ocean loft"))
+        self.assertEqual(3, self.index.count("ocean"))
+        self.assertEqual(0, self.index.count("city"))
+        self.index.discard("Place.2")
+        self.index.discard("Place.2")
+        self.assertEqual(2, self.index.count("ocean"))
+        self.assertNotIn("loft", self.index.postings)
+        self.assertEqual(sum(self.index.lengths.values()),
+                         self.index.total_length)
+        self.index.add("Place.5", Obj("5", name=None))
+        self.assertNotIn("Place.5", self.index.terms)
+
+
+class TestBitmapIndex(unittest.TestCase):
+    """
+    Unittests for testing the bitmap index of a list attribute.
+    """
+
+    def setUp(self):
+        self.index = BitmapIndex("Place", "amenity_ids")
+        for obj_id, amenity_ids in (("1", ["wifi", "pool"]),
+                                    ("2", ["wifi"]),
+                                    ("3", ["wifi", "pool", "gym"]),
+                                    ("4", [])):
+            self.index.add("Place." + obj_id,
+                           Obj(obj_id, amenity_ids=amenity_ids))
+
+    def test_all_of(self):
+        self.assertEqual(["Place.1", "Place.2", "Place.3"],
+                         self.index.all_of(["wifi"]))
+        self.assertEqual(["Place.1", "Place.3"],
+                         self.index.all_of(["pool", "wifi"]))
+        self.assertEqual([], self.index.all_of(["gym", "spa"]))
+        self.assertEqual(1, self.index.count(["gym", "pool", "wifi"]))
+        self.assertNotIn("Place.4", self.index.values)
+
+    def test_facets(self):
+        self.assertEqual({"wifi": 3, "pool": 2, "gym": 1},
+                         self.index.facets())
+        self.assertEqual({"wifi": 2, "pool": 2, "gym": 1},
+                         self.index.facets(["pool"]))
+
+    def test_move_and_discard(self):
+        self.index.add("Place.2", Obj("2", amenity_ids=["gym"]))
+        self.assertEqual(["Place.2", "Place.3"], self.index.all_of(["gym"]))
+        self.index.discard("Place.1")
+        self.index.discard("Place.1")
+        self.assertEqual(["Place.3"], self.index.all_of(["pool"]))
+        self.index.add("Place.5", Obj("5", amenity_ids=("spa",)))
+        self.assertEqual(0, self.index.ordinals["Place.5"])
+        self.index.add("Place.6", Obj("6", amenity_ids=[["spa"]]))
+        self.index.add("Place.3", Obj("3", amenity_ids="wifi"))
+        self.assertEqual({"gym": 1, "spa": 1}, self.index.facets())
+
+
+class TestIndexSet(unittest.TestCase):
+    """
+    Unittests for testing the set of indexes of a storage.
+    """
+
+    def setUp(self):
+        self.city = City("1", state_id="a")
+        self.objects = {"City.1": self.city}
+        self.indexes = IndexSet()
+        self.index = self.indexes.get(
+            ("City", "state_id"),
+            lambda: AttributeIndex("City", "state_id"), self.objects
+        )
+
+    def test_get_builds_once(self):
+        self.assertEqual(["City.1"], self.index.keys("a"))
+        self.assertIs(self.index, self.indexes.get(
+            ("City", "state_id"), None, self.objects
+        ))
+
+    def test_add_touch_discard(self):
+        other = City("2", state_id="a")
+        self.objects["City.2"] = other
+        self.indexes.add("City.2", other)
+        self.assertEqual(["City.1", "City.2"], self.index.keys("a"))
+        other.state_id = "b"
+        self.indexes.touch(other, "name")
+        self.assertEqual(["City.1", "City.2"], self.index.keys("a"))
+        self.indexes.touch(other, "state_id")
+        self.assertEqual(["City.2"], self.index.keys("b"))
+        self.indexes.touch(City("3", state_id="b"), "state_id")
+        self.assertEqual(["City.2"], self.index.keys("b"))
+        del self.objects["City.2"]
+        self.indexes.discard("City.2")
+        self.assertEqual([], self.index.keys("b"))
+
+    def test_stub_drops_class_indexes(self):
+        self.objects["City.2"] = None
+        self.indexes.add("City.2")
+        self.assertEqual({}, self.indexes.indexes)
+
+    def test_replaced_objects(self):
+        self.indexes.check({})
+        self.assertEqual({}, self.indexes.indexes)
+        self.assertEqual(0, self.indexes.classes.count("City"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+#!/usr/bin/python3
+"""
+Unittests for Journal class
+"""
+import os
+import unittest
+from models.engine.compression import get_compression
+from models.engine.journal import Journal
+
+
+class TestJournal(unittest.TestCase):
+    """
+    Unittests for testing the append-only change log.
+    """
+
+    def setUp(self):
+        self.journal = Journal("test_journal.log")
+
+    def tearDown(self):
+        self.journal.remove()
+
+    def test_replay_missing_file(self):
+        self.assertFalse(self.journal.exists())
+        self.assertEqual([], list(self.journal.replay()))
+
+    def test_append_and_replay_in_order(self):
+        self.journal.append({"User.1": {"id": "1"}}, [])
+        self.journal.append({}, ["User.1"])
+        self.assertEqual(
+            [("put", "User.1", {"id": "1"}), ("del", "User.1", None)],
+            list(self.journal.replay())
+        )
+
+    def test_append_nothing_creates_no_file(self):
+        self.journal.append({}, [])
+        self.assertFalse(self.journal.exists())
+
+    def test_replay_skips_torn_line(self):
+        self.journal.append({"User.1": {"id": "1"}}, [])
+        with open("test_journal.log", "a") as f:
+            f.write('{"op": "put", "key": "Us')
+        self.assertEqual(1, len(list(self.journal.replay())))
+
+    def test_remove(self):
+        self.journal.append({"User.1": {"id": "1"}}, [])
+        self.journal.remove()
+        self.assertFalse(os.path.isfile("test_journal.log"))
+
+
+class TestJournal_compressed(unittest.TestCase):
+    """
+    Unittests for testing the compressed change log.
+    """
+
+    def setUp(self):
+        self.journals = [
+            Journal("test_journal.log" + compression.extension, compression)
+            for compression in map(get_compression, ("zlib", "lzma", "bz2"))
+        ]
+
+    def tearDown(self):
+        for journal in self.journals:
+            journal.remove()
+
+    def test_append_and_replay_in_order(self):
+        for journal in self.journals:
+            journal.append({"User.1": {"id": "1"}}, [])
+            journal.append({}, ["User.1"])
+            self.assertEqual(
+                [("put", "User.1", {"id": "1"}), ("del", "User.1", None)],
+                list(journal.replay())
+            )
+            with open(journal.path, "rb") as f:
+                self.assertFalse(f.read().startswith(b"{"))
+
+    def test_replay_skips_torn_stream(self):
+        for journal in self.journals:
+            journal.append({"User.1": {"id": "1"}}, [])
+            size = journal.size()
+            journal.append({"User.2": {"id": "2"}}, [])
+            with open(journal.path, "r+b") as f:
+                f.truncate(size + 8)
+            self.assertEqual(
+                [("put", "User.1", {"id": "1"})], list(journal.replay())
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,161 @@
+#!/usr/bin/python3
+"""
+Unittests for the lazy module
+"""
+import os
+import json
+import subprocess
+import sys
+import unittest
+from models.engine.lazy import LazyObjects, Snapshot, Stub
+from models.engine.codec import JSONCodec
+from models.engine.lazy import read_index, write_index
+
+
+class TestLazyObjects(unittest.TestCase):
+    """
+    Unittests for testing the dictionary of lazily decoded objects.
+    """
+
+    def setUp(self):
+        self.loaded = []
+
+        def loader(key, stub):
+            if stub.start < 0:
+                dict.pop(self.objs, key)
+                raise KeyError(key)
+            self.loaded.append(key)
+            self.objs[key] = "object " + key
+            return self.objs[key]
+
+        self.objs = LazyObjects(loader, {"User.0": "user"})
+        self.objs["User.1"] = Stub(0, 10)
+        dict.__setitem__(self.objs, "User.2", Stub(10, 20))
+        dict.__setitem__(self.objs, "User.3", Stub(-1, 0))
+
+    def test_is_dict(self):
+        self.assertIsInstance(self.objs, dict)
+
+    def test_membership_decodes_nothing(self):
+        self.assertIn("User.1", self.objs)
+        self.assertEqual(4, len(self.objs))
+        self.assertEqual(3, self.objs.stubs())
+        self.assertEqual([], self.loaded)
+
+    def test_getitem_decodes_one(self):
+        self.assertEqual("object User.1", self.objs["User.1"])
+        self.assertEqual("object User.1", self.objs["User.1"])
+        self.assertEqual(["User.1"], self.loaded)
+        self.assertEqual("user", self.objs["User.0"])
+
+    def test_broken_stub(self):
+        self.assertIsNone(self.objs.get("User.3"))
+        self.assertNotIn("User.3", self.objs)
+        with self.assertRaises(KeyError):
+            self.objs["User.4"]
+
+    def test_values_decode_everything(self):
+        self.assertEqual(3, len(self.objs.values()))
+        self.assertEqual(0, self.objs.stubs())
+
+    def test_copy_keeps_stubs(self):
+        copy = self.objs.copy()
+        self.assertIsInstance(copy, LazyObjects)
+        self.assertEqual(3, copy.stubs())
+
+
+class TestOffsetIndex(unittest.TestCase):
+    """
+    Unittests for testing the offset index of a JSON file.
+    """
+
+    def setUp(self):
+        with open("test_lazy.json", "w", encoding="utf-8") as f:
+            json.dump({"User.1": {"name": "Bétty"}, "User.2": {}}, f,
+                      ensure_ascii=False)
+        self.file = open("test_lazy.json", "rb")
+
+    def tearDown(self):
+        self.file.close()
+        for path in ("test_lazy.json", "test_lazy.json.idx"):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def test_scan_offsets_are_byte_offsets(self):
+        offsets = JSONCodec().scan(self.file)
+        with open("test_lazy.json", "rb") as file:
+            data = file.read()
+        start, end = offsets["User.1"]
+        self.assertEqual(
+            {"User.1": {"name": "Bétty"}},
+            json.loads(b"{" + data[start:end] + b"}")
+        )
+        start, end = offsets["User.2"]
+        self.assertEqual(b'"User.2": {}', data[start:end])
+
+    def test_index_round_trip(self):
+        self.assertIsNone(read_index("test_lazy.json.idx", self.file))
+        offsets = JSONCodec().scan(self.file)
+        write_index("test_lazy.json.idx", self.file, offsets)
+        self.assertEqual(
+            {key: list(value) for key, value in offsets.items()},
+            read_index("test_lazy.json.idx", self.file)
+        )
+
+    def test_stale_index(self):
+        write_index("test_lazy.json.idx", self.file, {})
+        with open("test_lazy.json", "a") as f:
+            f.write(" ")
+        self.assertIsNone(read_index("test_lazy.json.idx", self.file))
+
+
+class TestSnapshot(unittest.TestCase):
+    """
+    Unittests for testing the read access to a JSON file.
+    """
+
+    def setUp(self):
+        with open("test_snapshot.json", "wb") as f:
+            f.write(b'{"User.1": {}}')
+
+    def tearDown(self):
+        os.remove("test_snapshot.json")
+
+    def test_read_small_file(self):
+        snapshot = Snapshot("test_snapshot.json", 1 << 20)
+        self.assertIsNone(snapshot.mapped)
+        self.assertEqual(b'"User.1": {}', snapshot.read(1, 13))
+        snapshot.close()
+
+    def test_read_mapped_file(self):
+        snapshot = Snapshot("test_snapshot.json", 0)
+        self.assertIsNotNone(snapshot.mapped)
+        self.assertEqual(b'"User.1": {}', snapshot.read(1, 13))
+        snapshot.close()
+        self.assertTrue(snapshot.file.closed)
+
+    def test_read_after_replace(self):
+        snapshot = Snapshot("test_snapshot.json", 0)
+        with open("test_snapshot.json.tmp", "wb") as f:
+            f.write(b"{}")
+        os.replace("test_snapshot.json.tmp", "test_snapshot.json")
+        self.assertEqual(b'"User.1": {}', snapshot.read(1, 13))
+        snapshot.close()
+
+    def test_closed_at_exit(self):
+        # The exit handlers run last registered first
+        code = "import atexit\n" \
+            "from models.engine.lazy import Snapshot\n" \
+            "atexit.register(lambda: print(snapshot.file.closed))\n" \
+            "snapshot = Snapshot('test_snapshot.json', 0)"
+        output = subprocess.run(
+            [sys.executable, "-c", code], check=True,
+            capture_output=True, text=True, timeout=60
+        ).stdout
+        self.assertEqual("True\n", output)
+
+
+if __name__ == "__main__":
+    unittest.main()
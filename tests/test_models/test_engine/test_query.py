@@ -0,0 +1,295 @@
+#!/usr/bin/python3
+"""
+Unittests for the query module
+"""
+import models
+import unittest
+from models.engine.file_storage import FileStorage
+from models.engine.query import Query
+from models.city import City
+from models.place import Place
+from models.user import User
+
+
+class TestQuery(unittest.TestCase):
+    """
+    Unittests for testing queries over the storage.
+    """
+
+    def setUp(self):
+        FileStorage._FileStorage__objects = {}
+        self.city = City()
+        self.other_city = City()
+        self.places = []
+        for i in range(10):
+            place = Place()
+            place.city_id = self.city.id if i < 6 else self.other_city.id
+            place.price_by_night = 50 * (i % 5)
+            place.max_guest = i
+            place.name = "Place {}".format(i)
+            self.places.append(place)
+
+    def tearDown(self):
+        FileStorage._FileStorage__objects = {}
+
+    def test_query(self):
+        query = models.storage.query(Place)
+        self.assertIsInstance(query, Query)
+        self.assertEqual(self.places, query.all())
+        self.assertEqual(10, query.count())
+        self.assertEqual(self.places, list(query))
+        self.assertEqual([], models.storage.query(User).all())
+
+    def test_filter(self):
+        query = models.storage.query(Place).filter(
+            city_id=self.city.id, price_by_night__lt=100, max_guest__gte=1
+        )
+        self.assertCountEqual(
+            [self.places[1], self.places[5]], query.all()
+        )
+
+    def test_operators(self):
+        query = models.storage.query("Place")
+        self.assertEqual(
+            self.places[8:], query.filter(max_guest__gt=7).all()
+        )
+        self.assertEqual(
+            self.places[:2], query.filter(max_guest__lte=1).all()
+        )
+        self.assertEqual(
+            8, query.filter(price_by_night__ne=0).count()
+        )
+        self.assertEqual(
+            [self.places[2], self.places[3]],
+            query.filter(max_guest__in=(2, 3)).all()
+        )
+        self.assertEqual(
+            [self.places[4]], query.filter(name__contains="4").all()
+        )
+        self.assertEqual([], query.filter(name__lt=3).all())
+        with self.assertRaises(ValueError):
+            query.filter(name__like="Place")
+
+    def test_order_by_and_limit(self):
+        query = models.storage.query(Place).filter(city_id=self.city.id)
+        prices = [p.price_by_night for p in query.order_by("price_by_night")]
+        self.assertEqual([0, 0, 50, 100, 150, 200], prices)
+        cheapest = query.order_by("price_by_night").limit(3).all()
+        self.assertEqual([0, 0, 50], [p.price_by_night for p in cheapest])
+        dearest = query.order_by("-max_guest").limit(2).all()
+        self.assertEqual([self.places[5], self.places[4]], dearest)
+        self.assertEqual(self.places[:2], query.limit(2).all())
+        self.assertEqual([], query.limit(0).all())
+        self.assertIs(self.places[0], query.first())
+        self.assertIsNone(query.filter(max_guest=99).first())
+
+    def test_order_by_partial_attribute(self):
+        query = models.storage.query(Place).filter(city_id=self.city.id)
+        self.places[1].rating = 4.5
+        self.places[3].rating = 3
+        self.places[4].rating = "good"
+        self.places[5].rating = None
+        rated = [self.places[3], self.places[1], self.places[4]]
+        self.assertEqual(rated, query.order_by("rating").all()[:3])
+        self.assertEqual(rated[:2], query.order_by("rating").limit(2).all())
+        self.assertEqual(rated[::-1], query.order_by("-rating").all()[:3])
+        unrated = query.order_by("-rating").limit(5).all()[3:]
+        self.assertEqual(2, len(unrated))
+        for place in unrated:
+            self.assertIsNone(getattr(place, "rating", None))
+
+    def test_queries_are_immutable(self):
+        query = models.storage.query(Place)
+        query.filter(max_guest=1).order_by("name").limit(1)
+        self.assertEqual(10, query.count())
+
+    def test_plan(self):
+        query = models.storage.query(Place)
+        self.assertEqual("scan", query.plan().access)
+        self.assertEqual(10, query.plan().estimate)
+        plan = query.filter(city_id=self.other_city.id,
+                            name="Place 7").plan()
+        self.assertEqual("hash", plan.access)
+        self.assertEqual(4, plan.estimate)
+        self.assertEqual([("name", "eq", "Place 7")], plan.conditions)
+        plan = query.filter(city_id=self.city.id,
+                            id=self.places[0].id).plan()
+        self.assertEqual("key", plan.access)
+        self.assertEqual([self.places[0]], query.filter(
+            city_id=self.city.id, id=self.places[0].id).all())
+        self.assertEqual([], query.filter(id="nope").all())
+        self.assertEqual("scan", query.filter(name="Place 1").plan().access)
+
+    def test_range_plan(self):
+        query = models.storage.query(Place)
+        plan = query.filter(city_id=self.city.id, max_guest__gte=2,
+                            max_guest__lt=5, max_guest__gt=1).plan()
+        self.assertEqual("range", plan.access)
+        self.assertEqual(3, plan.estimate)
+        self.assertEqual([("city_id", "eq", self.city.id)], plan.conditions)
+        self.assertEqual(self.places[2:5], query.filter(
+            max_guest__gte=2, max_guest__lt=5, max_guest__gt=1).all())
+        plan = query.filter(price_by_night=50, max_guest__lte=8).plan()
+        self.assertEqual("range", plan.access)
+        self.assertEqual(2, plan.estimate)
+        self.assertEqual([("max_guest", "lte", 8)], plan.conditions)
+        self.assertEqual("scan", query.filter(max_guest__lt="5").plan().access)
+        self.assertEqual(
+            self.places[1:3],
+            query.filter(max_guest__gt=0.5, max_guest__lte=2.0).all()
+        )
+        self.assertEqual([], query.filter(max_guest__gt=9).all())
+        self.assertEqual([], query.filter(max_guest__gt=5,
+                                          max_guest__lt=3).all())
+
+    def test_ordered_range_plan(self):
+        query = models.storage.query(Place).order_by("-max_guest")
+        plan = query.limit(3).plan()
+        self.assertEqual("range", plan.access)
+        self.assertTrue(plan.ordered)
+        self.assertEqual(3, plan.estimate)
+        self.assertEqual(self.places[9:6:-1], query.limit(3).all())
+        self.assertEqual(self.places[::-1], query.all())
+        cheapest = models.storage.query(Place).filter(
+            price_by_night__gte=50
+        ).order_by("price_by_night").limit(3).all()
+        self.assertEqual([50, 50, 100],
+                         [p.price_by_night for p in cheapest])
+        self.places[9].max_guest = -1
+        self.assertIs(self.places[9], query.all()[-1])
+        self.places[9].max_guest = None
+        self.assertFalse(query.limit(3).plan().ordered)
+        self.assertEqual("scan", query.limit(3).plan().access)
+
+    def test_near(self):
+        for i, place in enumerate(self.places):
+            place.latitude = 48.0 + i / 10
+            place.longitude = 2.0
+        query = models.storage.query(Place).near(48.0, 2.0, 25)
+        plan = query.plan()
+        self.assertEqual("geo", plan.access)
+        self.assertTrue(plan.ordered)
+        self.assertEqual(self.places[:3], query.all())
+        self.assertEqual(self.places[:2], query.limit(2).all())
+        self.assertEqual([self.places[2], self.places[1]],
+                         query.filter(max_guest__gte=1)
+                         .order_by("-max_guest").limit(2).all())
+        nearest = models.storage.query(Place).near(48.95, 2.0).limit(2)
+        self.assertEqual(2, nearest.plan().estimate)
+        self.assertEqual([self.places[9], self.places[8]], nearest.all())
+        self.places[8].latitude = None
+        self.assertEqual([self.places[9], self.places[7]], nearest.all())
+        hashed = query.filter(city_id=self.other_city.id)
+        self.places[6].latitude = 48.05
+        self.assertEqual("hash", hashed.near(48.0, 2.0, 10).plan().access)
+        self.assertEqual([self.places[6]],
+                         hashed.near(48.0, 2.0, 10).all())
+
+    def test_within(self):
+        for i, place in enumerate(self.places):
+            place.latitude = -10.0 + i
+            place.longitude = 179.5 if i % 2 else -179.5
+        query = models.storage.query(Place).within(-10, 179, -5, -179)
+        self.assertEqual("geo", query.plan().access)
+        self.assertEqual(self.places[:6], query.all())
+        self.assertEqual(self.places[1:6:2],
+                         query.within(-10, 179, -5, 180).all())
+        self.assertEqual(
+            [self.places[3], self.places[1]],
+            query.filter(city_id=self.city.id, max_guest__in=(1, 3))
+            .order_by("-max_guest").all()
+        )
+
+    def test_search(self):
+        self.places[3].description = "Quiet room with an ocean view"
+        self.places[7].name = "Ocean front"
+        self.places[8].description = "View on the garden"
+        query = models.storage.query(Place).search("ocean view")
+        plan = query.plan()
+        self.assertEqual("text", plan.access)
+        self.assertEqual(3, plan.estimate)
+        self.assertEqual(
+            [self.places[3], self.places[7], self.places[8]], query.all())
+        self.assertEqual([self.places[3]], query.limit(1).all())
+        self.assertEqual([self.places[8], self.places[7]],
+                         query.filter(max_guest__gte=4)
+                         .order_by("-max_guest").all())
+        self.places[3].description = ""
+        self.assertEqual([self.places[7], self.places[8]], query.all())
+        with self.assertRaises(ValueError):
+            models.storage.query(User).search("bob")
+
+    def test_amenities(self):
+        for i, place in enumerate(self.places):
+            place.amenity_ids = ["wifi"] + (["pool"] if i % 3 == 0 else [])
+        query = models.storage.query(Place)
+        pool = query.filter(amenity_ids__contains="pool")
+        self.assertEqual("bitmap", pool.plan().access)
+        self.assertEqual(4, pool.plan().estimate)
+        self.assertEqual(self.places[::3], pool.all())
+        both = query.filter(amenity_ids__all=["wifi", "pool"],
+                            city_id=self.city.id)
+        self.assertEqual([("city_id", "eq", self.city.id)],
+                         both.plan().conditions)
+        self.assertEqual([self.places[0], self.places[3]], both.all())
+        self.places[3].amenity_ids = ["wifi"]
+        self.assertEqual([self.places[0]], both.all())
+        self.assertEqual([], query.filter(amenity_ids__all=["spa"]).all())
+        self.assertEqual("scan", query.filter(amenity_ids__all=[]).plan()
+                         .access)
+        self.assertEqual(10, query.filter(amenity_ids__all=[]).count())
+
+    def test_plan_follows_updates(self):
+        query = models.storage.query(Place).filter(city_id=self.city.id)
+        self.assertEqual(6, query.count())
+        self.places[0].city_id = self.other_city.id
+        Place(city_id=self.city.id)
+        self.assertEqual(6, query.plan().estimate)
+        models.storage.delete(self.places[1])
+        self.assertEqual(5, query.count())
+
+    def test_all_does_not_copy_objects(self):
+        query = models.storage.query(Place).filter(city_id=self.city.id)
+        place = Place(city_id=self.city.id)
+        self.assertEqual(7, len(query.all()))
+        models.storage.delete(place)
+        self.assertEqual(6, len(query.all()))
+        # The snapshot of all() is only made when it is asked for
+        self.assertIsNone(FileStorage._FileStorage__view)
+
+    def test_explain(self):
+        explain = models.storage.query(Place).filter(
+            city_id=self.city.id, price_by_night__lt=100, name__ne=""
+        ).order_by("-price_by_night").limit(20).explain()
+        self.assertIn("query Place", explain)
+        self.assertIn("range index Place.price_by_night < 100, "
+                      "descending order (~4 candidates)", explain)
+        self.assertIn("filter: city_id = '{}', name != ''".format(
+            self.city.id), explain)
+        self.assertIn("order: price_by_night desc", explain)
+        self.assertIn("limit: 20", explain)
+        explain = models.storage.query(Place).filter(
+            city_id=self.city.id, price_by_night__lt=200
+        ).explain()
+        self.assertIn("hash index Place.city_id = '{}' (~6 candidates)"
+                      .format(self.city.id), explain)
+        self.assertIn("filter: price_by_night < 200", explain)
+        explain = models.storage.query(Place).near(1.5, 2, 10).explain()
+        self.assertIn("geo index Place within 10 km of (1.5, 2), "
+                      "nearest first", explain)
+        self.assertIn("order: distance asc", explain)
+        self.assertIn("filter: within (1, 2, 3, 4)", models.storage.query(
+            City).within(1, 2, 3, 4).explain())
+        explain = models.storage.query(Place).search("sea").explain()
+        self.assertIn("text index Place.name,description 'sea'", explain)
+        self.assertIn("order: relevance desc", explain)
+        explain = models.storage.query(Place).filter(
+            amenity_ids__all=["a", "b"]).explain()
+        self.assertIn("bitmap index Place.amenity_ids contains 'a', 'b'",
+                      explain)
+        self.assertIn("class index City",
+                      models.storage.query(City).explain())
+
+
+if __name__ == "__main__":
+    unittest.main()
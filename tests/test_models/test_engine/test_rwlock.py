@@ -0,0 +1,89 @@
+#!/usr/bin/python3
+"""
+Unittests for the rwlock module
+"""
+import threading
+import time
+import unittest
+from models.engine.rwlock import RWLock
+
+
+class TestRWLock(unittest.TestCase):
+    """
+    Unittests for testing the reader-writer lock.
+    """
+
+    def setUp(self):
+        self.lock = RWLock()
+
+    def run_thread(self, target):
+        thread = threading.Thread(target=target, daemon=True)
+        thread.start()
+        return thread
+
+    def write(self, events):
+        with self.lock.write():
+            events.append("write")
+
+    def test_readers_share(self):
+        inside = threading.Barrier(3, timeout=5)
+
+        def read():
+            with self.lock.read():
+                inside.wait()
+
+        threads = [self.run_thread(read) for i in range(2)]
+        inside.wait()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(0, self.lock.readers)
+
+    def test_writer_waits_for_readers(self):
+        events = []
+        with self.lock.read():
+            writer = self.run_thread(lambda: self.write(events))
+            while not self.lock.waiting:
+                time.sleep(0.001)
+            events.append("read")
+        writer.join(5)
+        self.assertEqual(["read", "write"], events)
+        self.assertIsNone(self.lock.writer)
+
+    def test_waiting_writer_goes_first(self):
+        events = []
+        with self.lock.read():
+            writer = self.run_thread(lambda: self.write(events))
+            while not self.lock.waiting:
+                time.sleep(0.001)
+
+            def read():
+                with self.lock.read():
+                    events.append("read")
+
+            reader = self.run_thread(read)
+            while not self.lock.blocked:
+                time.sleep(0.001)
+            # A nested read does not wait for the writer
+            with self.lock.read():
+                pass
+        writer.join(5)
+        reader.join(5)
+        self.assertEqual(["write", "read"], events)
+
+    def test_reentrant(self):
+        with self.lock.write():
+            with self.lock.write():
+                with self.lock.read():
+                    self.assertEqual(2, self.lock.depth)
+            self.assertIsNotNone(self.lock.writer)
+        self.assertIsNone(self.lock.writer)
+        with self.lock.read():
+            with self.lock.read():
+                self.assertEqual(1, self.lock.readers)
+            with self.assertRaises(RuntimeError):
+                self.lock.acquire_write()
+        self.assertEqual(0, self.lock.readers)
+
+
+if __name__ == "__main__":
+    unittest.main()
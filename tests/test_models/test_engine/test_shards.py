@@ -0,0 +1,76 @@
+#!/usr/bin/python3
+"""
+Unittests for the shards module
+"""
+import os
+import json
+import unittest
+from models.engine.codec import get_codec
+from models.engine.shards import shard_name, read_shard, read_shards
+
+
+class TestShards(unittest.TestCase):
+    """
+    Unittests for testing the sharded layout helpers.
+    """
+
+    def tearDown(self):
+        for name in ("a.json", "b.json", "bad.json", "a.bin"):
+            try:
+                os.remove(name)
+            except FileNotFoundError:
+                pass
+
+    def test_one_shard_per_class(self):
+        self.assertEqual("User.0.json", shard_name("User.1234", 1))
+        self.assertEqual("User.0.json", shard_name("User.1234", 0))
+        self.assertEqual("User.0.bin", shard_name("User.1234", 1, ".bin"))
+
+    def test_partition_is_stable(self):
+        name = shard_name("Place.1234", 8)
+        self.assertTrue(name.startswith("Place."))
+        self.assertEqual(name, shard_name("Place.1234", 8))
+        names = {shard_name("Place.{}".format(i), 8) for i in range(100)}
+        self.assertLess(1, len(names))
+
+    def test_read_shard(self):
+        with open("a.json", "w") as f:
+            json.dump({"User.1": {"id": "1"}}, f)
+        self.assertEqual({"User.1": {"id": "1"}}, read_shard("a.json"))
+
+    def test_read_shards(self):
+        with open("a.json", "w") as f:
+            json.dump({"User.1": {"id": "1"}}, f)
+        with open("b.json", "w") as f:
+            json.dump({"City.2": {"id": "2"}}, f)
+        results = dict(read_shards(["a.json", "b.json", "missing.json"]))
+        self.assertEqual({"User.1": {"id": "1"}}, results["a.json"])
+        self.assertEqual({"City.2": {"id": "2"}}, results["b.json"])
+        self.assertIsNone(results["missing.json"])
+
+    def test_read_shards_workers(self):
+        with open("a.json", "w") as f:
+            json.dump({"User.1": {"id": "1"}}, f)
+        with open("b.json", "w") as f:
+            json.dump({"City.2": {"id": "2"}}, f)
+        for workers in (1, 2):
+            results = dict(read_shards(["a.json", "b.json"], workers=workers))
+            self.assertEqual({"User.1": {"id": "1"}}, results["a.json"])
+            self.assertEqual({"City.2": {"id": "2"}}, results["b.json"])
+
+    def test_read_shard_skips_malformed_member(self):
+        with open("bad.json", "w") as f:
+            f.write('{"User.1": {"id": 1,}, "User.2": {"id": "2"}}')
+        self.assertEqual({"User.2": {"id": "2"}}, read_shard("bad.json"))
+
+    def test_read_binary_shard(self):
+        codec = get_codec("binary")
+        with open("a.bin", "wb") as f, codec.writer(f) as writer:
+            writer.write(codec.encode("User.1", {"id": "1"}))
+        self.assertEqual(
+            {"User.1": {"id": "1"}}, read_shard("a.bin", "binary")
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
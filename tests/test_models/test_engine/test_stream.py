@@ -0,0 +1,89 @@
+#!/usr/bin/python3
+"""
+Unittests for the stream module
+"""
+import io
+import json
+import unittest
+from models.engine.stream import MemberWriter, encode_member, iter_members
+
+
+class TestIterMembers(unittest.TestCase):
+    """
+    Unittests for testing the incremental JSON decoder.
+    """
+
+    def members(self, text, **kwargs):
+        return list(iter_members(io.StringIO(text), **kwargs))
+
+    def test_empty_documents(self):
+        self.assertEqual([], self.members(""))
+        self.assertEqual([], self.members("{}"))
+        self.assertEqual([], self.members("  { }  "))
+
+    def test_members_in_order(self):
+        objs = {
+            "User.{}".format(i): {"id": str(i), "name": "é" * i}
+            for i in range(50)
+        }
+        text = json.dumps(objs)
+        for chunk_size in (1, 7, 64, 1 << 16):
+            self.assertEqual(
+                list(objs.items()),
+                self.members(text, chunk_size=chunk_size)
+            )
+
+    def test_skips_malformed_member(self):
+        text = ('{"User.1": {"id": "1"}, "User.2": {"id": 2,}, '
+                '"User.3": {"id": "3"}}')
+        for chunk_size in (5, 1 << 16):
+            self.assertEqual(
+                [("User.1", {"id": "1"}), ("User.3", {"id": "3"})],
+                self.members(text, chunk_size=chunk_size)
+            )
+
+    def test_truncated_document(self):
+        text = '{"User.1": {"id": "1"}, "User.2": {"id": "2'
+        self.assertEqual(
+            [("User.1", {"id": "1"})], self.members(text, chunk_size=4)
+        )
+
+    def test_strict_raises(self):
+        text = '{"User.1": {"id": "1"}, "User.2": {"id": 2,}}'
+        with self.assertRaises(ValueError):
+            self.members(text, strict=True)
+        with self.assertRaises(ValueError):
+            self.members("[1, 2]", strict=True)
+
+
+class TestMemberWriter(unittest.TestCase):
+    """
+    Unittests for testing the incremental JSON encoder.
+    """
+
+    def test_encode_member(self):
+        member = encode_member("User.1", {"name": "Bétty"})
+        self.assertIsInstance(member, bytes)
+        self.assertEqual(
+            {"User.1": {"name": "Bétty"}},
+            json.loads(b"{" + member + b"}")
+        )
+
+    def test_empty_object(self):
+        file = io.BytesIO()
+        with MemberWriter(file):
+            pass
+        self.assertEqual(b"{}", file.getvalue())
+
+    def test_writes_same_document_as_json_dump(self):
+        objs = {"User.{}".format(i): {"id": str(i)} for i in range(5)}
+        file = io.BytesIO()
+        with MemberWriter(file) as writer:
+            for key, value in objs.items():
+                writer.write(encode_member(key, value))
+        self.assertEqual(json.dumps(objs).encode(), file.getvalue())
+        self.assertEqual(5, writer.count)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+#!/usr/bin/python3
+"""
+Unittests for the transaction module
+"""
+import unittest
+from models.engine.index import IndexSet
+from models.engine.lazy import Stub
+from models.engine.transaction import UndoLog
+
+
+class Obj:
+    """
+    Stand-in for a stored object.
+    """
+
+    def __init__(self, obj_id, **kwargs):
+        self.id = obj_id
+        self.__dict__.update(kwargs)
+
+
+class TestUndoLog(unittest.TestCase):
+    """
+    Unittests for testing the undo log of a transaction.
+    """
+
+    def setUp(self):
+        self.kept = Obj("1", name="kept")
+        self.objects = {"Obj.1": self.kept}
+        self.indexes = IndexSet()
+        self.indexes.check(self.objects)
+        self.log = UndoLog({self.kept}, {"Obj.9"})
+
+    def test_sets_are_copied(self):
+        dirty = {self.kept}
+        log = UndoLog(dirty, set())
+        dirty.clear()
+        self.assertEqual({self.kept}, log.dirty)
+        self.assertEqual({"Obj.9"}, self.log.deleted)
+        self.assertEqual(1, log.depth)
+
+    def test_undo_new_and_delete(self):
+        new = Obj("2")
+        self.log.new("Obj.2", None)
+        self.objects["Obj.2"] = new
+        self.log.delete("Obj.1", self.kept)
+        del self.objects["Obj.1"]
+        replaced = Obj("2")
+        self.log.new("Obj.2", new)
+        self.objects["Obj.2"] = replaced
+        self.log.undo(self.objects, self.indexes)
+        self.assertEqual({"Obj.1": self.kept}, self.objects)
+        self.assertEqual(["Obj.1"], self.indexes.classes.keys("Obj"))
+        self.assertEqual([], self.log.entries)
+
+    def test_undo_touch(self):
+        self.log.touch("Obj.1", self.kept)
+        self.kept.name = "changed"
+        self.kept.price = 10
+        self.log.touch("Obj.1", self.kept)
+        self.kept.name = "changed again"
+        self.assertEqual(1, len(self.log.entries))
+        self.log.undo(self.objects, self.indexes)
+        self.assertEqual({"id": "1", "name": "kept"}, self.kept.__dict__)
+
+    def test_undo_stub(self):
+        stub = Stub(0, 10)
+        self.objects["Obj.2"] = stub
+        self.log.new("Obj.2", stub)
+        self.objects["Obj.2"] = Obj("2")
+        self.log.undo(self.objects, self.indexes)
+        self.assertIs(stub, self.objects["Obj.2"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -7,7 +7,11 @@ import models
 import unittest
 from datetime import datetime
 from time import sleep
+from models.engine.file_storage import FileStorage
 from models.place import Place
+from models.amenity import Amenity
+from models.review import Review
+from . import close_storage
 
 
 class TestPlace_instantiation(unittest.TestCase):
@@ -22,6 +26,7 @@ class TestPlace_instantiation(unittest.TestCase):
             pass
 
     def tearDown(self):
+        close_storage()
         try:
             os.remove("file.json")
         except FileNotFoundError:
@@ -174,6 +179,7 @@ class TestPlace_save(unittest.TestCase):
             pass
 
     def tearDown(self):
+        close_storage()
         try:
             os.remove("file.json")
         except FileNotFoundError:
@@ -226,6 +232,7 @@ class TestPlace_to_dict(unittest.TestCase):
             pass
 
     def tearDown(self):
+        close_storage()
         try:
             os.remove("file.json")
         except FileNotFoundError:
@@ -282,5 +289,46 @@ class TestPlace_to_dict(unittest.TestCase):
             my_place.to_dict(None)
 
 
+class TestPlace_relationships(unittest.TestCase):
+    """
+    Unittests for testing the reviews and amenities of the Place class.
+    """
+
+    def test_reviews(self):
+        place = Place()
+        review = Review()
+        review.place_id = place.id
+        Review()
+        self.assertEqual([review], place.reviews)
+        review.place_id = ""
+        self.assertEqual([], place.reviews)
+
+    def test_reviews_read_only(self):
+        with self.assertRaises(AttributeError):
+            Place().reviews = ["stale"]
+        # As stored by a version without the property
+        place = Place(reviews=["stale"])
+        self.assertEqual([], place.reviews)
+        self.assertNotIn("reviews", place.to_dict())
+
+    def test_amenities(self):
+        place = Place()
+        wifi = Amenity()
+        pool = Amenity()
+        self.assertEqual([], place.amenities)
+        place.amenities = wifi
+        place.amenities = pool
+        place.amenities = wifi
+        with self.assertRaises(TypeError):
+            place.amenities = "not an amenity"
+        self.assertEqual([wifi.id, pool.id], place.amenity_ids)
+        self.assertEqual([wifi, pool], place.amenities)
+        self.assertEqual([], Place.amenity_ids)
+        self.assertEqual([], Place().amenities)
+        models.storage.delete(pool)
+        self.assertEqual([wifi], place.amenities)
+        self.assertIsNone(FileStorage._FileStorage__view)
+
+
 if __name__ == "__main__":
     unittest.main()
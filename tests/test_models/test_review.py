@@ -8,6 +8,7 @@ import unittest
 from datetime import datetime
 from time import sleep
 from models.review import Review
+from . import close_storage
 
 
 class TestReview_instantiation(unittest.TestCase):
@@ -111,6 +112,7 @@ class TestReview_save(unittest.TestCase):
             pass
 
     def tearDown(self):
+        close_storage()
         try:
             os.remove("file.json")
         except FileNotFoundError:
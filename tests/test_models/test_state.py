@@ -8,6 +8,8 @@ import unittest
 from datetime import datetime
 from time import sleep
 from models.state import State
+from models.city import City
+from . import close_storage
 
 
 class TestState_instantiation(unittest.TestCase):
@@ -95,6 +97,7 @@ class TestState_save(unittest.TestCase):
             pass
 
     def tearDown(self):
+        close_storage()
         try:
             os.remove("file.json")
         except FileNotFoundError:
@@ -187,5 +190,39 @@ class TestState_to_dict(unittest.TestCase):
             state.to_dict(None)
 
 
+class TestState_cities(unittest.TestCase):
+    """
+    Unittests for testing the cities relationship of the State class.
+    """
+
+    def test_cities(self):
+        state = State()
+        city = City()
+        city.state_id = state.id
+        City()
+        self.assertEqual([city], state.cities)
+
+    def test_cities_follow_state_id(self):
+        state = State()
+        city = City(state_id=state.id)
+        self.assertEqual([city], state.cities)
+        city.state_id = "other"
+        self.assertEqual([], state.cities)
+        city.state_id = state.id
+        models.storage.delete(city)
+        self.assertEqual([], state.cities)
+
+    def test_cities_read_only(self):
+        state = State()
+        city = City(state_id=state.id)
+        with self.assertRaises(AttributeError):
+            state.cities = ["stale"]
+        self.assertEqual([city], state.cities)
+        self.assertNotIn("cities", state.to_dict())
+        # As stored by a version without the property
+        state = State(cities=["stale"])
+        self.assertEqual([], state.cities)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -8,6 +8,8 @@ import unittest
 from datetime import datetime
 from time import sleep
 from models.user import User
+from models.place import Place
+from . import close_storage
 
 
 class TestUser_instantiation(unittest.TestCase):
@@ -99,6 +101,7 @@ class TestUser_save(unittest.TestCase):
             pass
 
     def tearDown(self):
+        close_storage()
         try:
             os.remove("file.json")
         except IOError:
@@ -189,5 +192,29 @@ class TestUser_to_dict(unittest.TestCase):
             us.to_dict(None)
 
 
+class TestUser_places(unittest.TestCase):
+    """
+    Unittests for testing the places relationship of the User class.
+    """
+
+    def test_places(self):
+        user = User()
+        place = Place()
+        place.user_id = user.id
+        other = Place(user_id=user.id)
+        self.assertEqual([place, other], user.places)
+        models.storage.delete(place)
+        self.assertEqual([other], user.places)
+
+    def test_places_read_only(self):
+        user = User()
+        with self.assertRaises(AttributeError):
+            user.places = ["stale"]
+        # As stored by a version without the property
+        user = User(places=["stale"])
+        self.assertEqual([], user.places)
+        self.assertNotIn("places", user.to_dict())
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,45 @@
+#!/usr/bin/python3
+"""
+Module: convert.py
+
+Converts a storage file from one codec to the other, one
+record at a time. Importing the codec module does not load the
+storage of the current directory, which may well be the file
+to convert: models.storage is only loaded when first used.
+
+Functions:
+- main(argv): Runs the conversion given on the command line.
+
+Usage:
+python3 tools/convert.py <source> <destination> [json|binary]
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.engine.codec import convert  # noqa: E402
+
+
+def main(argv):
+    """
+    Converts the source file given on the command line.
+
+    Args:
+        argv (list): The command line arguments.
+
+    Returns:
+        int: The exit status.
+    """
+    if len(argv) not in (3, 4):
+        print("Usage: {} <source> <destination> [json|binary]".format(
+            argv[0]))
+        return 1
+    count = convert(*argv[1:])
+    print("{} records written to {}".format(count, argv[2]))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))